@@ -0,0 +1,370 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Break catalogs keep large numbers of breaks in a file of their own.
+
+A catalog is a JSON Lines file with one break per line:
+
+    {"type": "short", "name": "Blink your eyes", "image": "blink.png"}
+    {"type": "long", "name": "Walk for a while", "duration": 120}
+
+"type" is "short" or "long", "name" is required, and "duration", "interval",
+"image" and "plugins" are optional like in the short_breaks and long_breaks
+settings. Images are relative to the directory of the catalog. Blank lines are
+ignored.
+
+Opening a catalog reads the file once, line by line, to validate every break
+and to index where it starts. The breaks themselves are only parsed when
+BreakQueue reaches them. If the file changed in the meantime, it is indexed
+again, and if it can't be read any more, the configured breaks are used
+instead. Catalogs are used with the break_catalog setting:
+
+    python -m safeeyes.catalog validate breaks.jsonl
+    python -m safeeyes.catalog export breaks.jsonl
+    python -m safeeyes.catalog import breaks.jsonl
+"""
+
+import argparse
+import array
+import collections
+import dataclasses
+import functools
+import json
+import logging
+import os
+import sys
+import typing
+import zlib
+
+from safeeyes.model import Break, BreakType, Config
+from safeeyes.translations import translate as _
+
+# number of parsed breaks kept per tier
+CACHE_SIZE = 64
+
+KEYS = {"type", "name", "duration", "interval", "image", "plugins"}
+TYPES = {"short": BreakType.SHORT_BREAK, "long": BreakType.LONG_BREAK}
+
+
+@dataclasses.dataclass(frozen=True)
+class CatalogError:
+    """An invalid break in a catalog."""
+
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return "line {}: {}".format(self.line, self.message)
+
+
+def validate_entry(entry: typing.Any, directory: str) -> list[str]:
+    """Return the problems of a break of a catalog, if any."""
+    if not isinstance(entry, dict):
+        return ["a break must be an object"]
+    problems = []
+    unknown = set(entry) - KEYS
+    if unknown:
+        problems.append("unknown keys: " + ", ".join(sorted(unknown)))
+    if entry.get("type", "short") not in TYPES:
+        problems.append('type must be "short" or "long"')
+    name = entry.get("name")
+    if not isinstance(name, str) or not name:
+        problems.append("name is missing")
+    for key in ("duration", "interval"):
+        value = entry.get(key)
+        if value is not None and (
+            not isinstance(value, int) or isinstance(value, bool) or value <= 0
+        ):
+            problems.append("{} must be a positive number".format(key))
+    image = entry.get("image")
+    if image is not None and (
+        not isinstance(image, str) or not os.path.isfile(os.path.join(directory, image))
+    ):
+        problems.append("image not found: {}".format(image))
+    plugins = entry.get("plugins")
+    if plugins is not None and (
+        not isinstance(plugins, list)
+        or not all(isinstance(plugin, str) for plugin in plugins)
+    ):
+        problems.append("plugins must be a list of plugin ids")
+    return problems
+
+
+class Catalog:
+    """Index of the valid breaks of a catalog file."""
+
+    path: str
+    directory: str
+    # CRC32 of the whole file
+    checksum: int
+    errors: list[CatalogError]
+    # byte offsets of the lines of the valid breaks of each type
+    offsets: dict[BreakType, array.array]
+    # modification time and size of the indexed file
+    mtime_ns: int
+    size: int
+
+    def __init__(self, path: str) -> None:
+        """Read and validate the whole file, without keeping the breaks.
+
+        Raises OSError if the file can't be read.
+        """
+        self.path = os.path.abspath(path)
+        self.directory = os.path.dirname(self.path)
+        self.index()
+
+    def index(self) -> None:
+        """Read and validate the whole file again.
+
+        Raises OSError if the file can't be read.
+        """
+        self.checksum = 0
+        self.errors = []
+        self.offsets = {break_type: array.array("q") for break_type in BreakType}
+
+        offset = 0
+        with open(self.path, "rb") as catalog_file:
+            stat = os.fstat(catalog_file.fileno())
+            self.mtime_ns = stat.st_mtime_ns
+            self.size = stat.st_size
+            for number, line in enumerate(catalog_file, start=1):
+                self.checksum = zlib.crc32(line, self.checksum)
+                start = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    self.errors.append(CatalogError(number, "invalid JSON: " + str(e)))
+                    continue
+                problems = validate_entry(entry, self.directory)
+                if problems:
+                    self.errors.extend(
+                        CatalogError(number, problem) for problem in problems
+                    )
+                    continue
+                self.offsets[TYPES[entry.get("type", "short")]].append(start)
+
+    def __len__(self) -> int:
+        return sum(len(offsets) for offsets in self.offsets.values())
+
+    def breaks(
+        self,
+        break_type: BreakType,
+        interval: int,
+        duration: int,
+        fallback: typing.Sequence[Break] = (),
+    ) -> typing.Optional["CatalogBreaks"]:
+        """Return the breaks of the type, or None if there is none.
+
+        The fallback breaks are used if the file can't be read any more.
+        """
+        if not self.offsets[break_type]:
+            return None
+        return CatalogBreaks(self, break_type, interval, duration, fallback)
+
+    def read(self, offset: int) -> typing.Optional[dict[str, typing.Any]]:
+        """Read the break starting at the offset.
+
+        Returns None if the file changed since it was indexed, or can't be
+        read.
+        """
+        try:
+            with open(self.path, "rb") as catalog_file:
+                stat = os.fstat(catalog_file.fileno())
+                if stat.st_mtime_ns != self.mtime_ns or stat.st_size != self.size:
+                    return None
+                catalog_file.seek(offset)
+                return json.loads(catalog_file.readline())
+        except (OSError, ValueError):
+            return None
+
+
+class CatalogBreaks(typing.Sequence[Break]):
+    """The breaks of one type of a catalog, parsed when they are accessed.
+
+    The last CACHE_SIZE breaks are kept, so the upcoming breaks are the same
+    objects while the queue looks at them. If the file changed, it is indexed
+    again and indexes past its new end wrap around. If it can't be read, the
+    fallback breaks are used.
+    """
+
+    catalog: Catalog
+    break_type: BreakType
+    interval: int
+    duration: int
+    fallback: typing.Sequence[Break]
+
+    __cache: collections.OrderedDict[int, Break]
+
+    def __init__(
+        self,
+        catalog: Catalog,
+        break_type: BreakType,
+        interval: int,
+        duration: int,
+        fallback: typing.Sequence[Break] = (),
+    ) -> None:
+        self.catalog = catalog
+        self.break_type = break_type
+        self.interval = interval
+        self.duration = duration
+        self.fallback = fallback
+        self.__cache = collections.OrderedDict()
+
+    @property
+    def checksum(self) -> int:
+        return self.catalog.checksum
+
+    def __len__(self) -> int:
+        return len(self.catalog.offsets[self.break_type])
+
+    @typing.overload
+    def __getitem__(self, index: int) -> Break: ...
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> typing.Sequence[Break]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("break index out of range")
+        brk = self.__cache.get(index)
+        if brk is not None:
+            self.__cache.move_to_end(index)
+            return brk
+
+        offsets = self.catalog.offsets[self.break_type]
+        entry = self.catalog.read(offsets[index]) if index < len(offsets) else None
+        if entry is None:
+            entry = self.__reindex(index)
+            if entry is None:
+                return self.__fallback(index)
+        image = entry.get("image")
+        brk = Break(
+            self.break_type,
+            _(entry["name"]),
+            entry.get("interval", self.interval),
+            entry.get("duration", self.duration),
+            os.path.join(self.catalog.directory, image) if image else None,
+            entry.get("plugins"),
+        )
+        self.__cache[index] = brk
+        if len(self.__cache) > CACHE_SIZE:
+            self.__cache.popitem(last=False)
+        return brk
+
+    def __reindex(self, index: int) -> typing.Optional[dict[str, typing.Any]]:
+        """Index the changed file again and read the break at the index."""
+        logging.info(
+            "The break catalog %s changed, reading it again", self.catalog.path
+        )
+        self.__cache.clear()
+        try:
+            self.catalog.index()
+        except OSError as e:
+            logging.error("Can't read the break catalog: %s", e)
+            return None
+        offsets = self.catalog.offsets[self.break_type]
+        if not offsets:
+            return None
+        return self.catalog.read(offsets[index % len(offsets)])
+
+    def __fallback(self, index: int) -> Break:
+        """Return a break which does not come from the file."""
+        logging.warning(
+            "Using the configured breaks instead of the break catalog %s",
+            self.catalog.path,
+        )
+        if self.fallback:
+            return self.fallback[index % len(self.fallback)]
+        if self.__cache:
+            return next(reversed(self.__cache.values()))
+        return Break(self.break_type, "", self.interval, self.duration, None, None)
+
+
+@functools.lru_cache(maxsize=4)
+def _open(path: str, mtime_ns: int, size: int) -> Catalog:
+    return Catalog(path)
+
+
+def open_catalog(path: str) -> Catalog:
+    """Return the catalog at the path, reusing the index of an unchanged file.
+
+    Raises OSError if the file can't be read.
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    stat = os.stat(path)
+    return _open(path, stat.st_mtime_ns, stat.st_size)
+
+
+def export_breaks(config: Config, path: str) -> int:
+    """Write the short and long breaks of the configuration to a catalog.
+
+    Returns the number of breaks written.
+    """
+    count = 0
+    with open(path, "w") as catalog_file:
+        for break_type, key in (("short", "short_breaks"), ("long", "long_breaks")):
+            for break_config in config.get(key) or []:
+                entry = {"type": break_type}
+                entry.update(break_config)
+                catalog_file.write(json.dumps(entry) + "\n")
+                count += 1
+    return count
+
+
+def main(argv: typing.Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage break catalogs.")
+    parser.add_argument(
+        "action",
+        choices=["validate", "export", "import"],
+        help="validate a catalog, export the configured breaks into a catalog, "
+        "or validate a catalog and use it instead of the configured breaks",
+    )
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.action == "export":
+        count = export_breaks(Config.load(), args.path)
+        print("Exported {} breaks".format(count))
+        return 0
+
+    try:
+        catalog = Catalog(args.path)
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for error in catalog.errors:
+        print(error, file=sys.stderr)
+    print("{} valid breaks, {} errors".format(len(catalog), len(catalog.errors)))
+    if catalog.errors:
+        return 1
+
+    if args.action == "import":
+        config = Config.load()
+        config.set("break_catalog", catalog.path)
+        config.save()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Clocks provide the current time and the timers used by SafeEyesCore.
+
+Timer callbacks follow the GLib conventions: a callback returning True is
+called again after the same interval, a callback returning False is removed.
+
+Only GLibClock uses GLib, and it imports it on first use, so the other clocks
+run without PyGObject installed.
+"""
+
+import asyncio
+import datetime
+import heapq
+import time
+import typing
+from abc import ABC, abstractmethod
+
+
+class Clock(ABC):
+    """Source of time and timers for SafeEyesCore."""
+
+    @abstractmethod
+    def now(self) -> datetime.datetime:
+        """Return the current wall-clock time."""
+        pass
+
+    @abstractmethod
+    def monotonic(self) -> float:
+        """Return the value of a monotonic clock, in seconds."""
+        pass
+
+    @abstractmethod
+    def timeout_add_seconds(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        """Call the callback after interval seconds, and return the source id."""
+        pass
+
+    @abstractmethod
+    def timeout_add(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        """Call the callback after interval milliseconds, and return the source
+        id.
+        """
+        pass
+
+    @abstractmethod
+    def source_remove(self, source_id: int) -> None:
+        """Remove a timer before it fires."""
+        pass
+
+
+class GLibClock(Clock):
+    """Clock backed by the system time and the GLib main loop."""
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def timeout_add_seconds(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        from gi.repository import GLib
+
+        return GLib.timeout_add_seconds(interval, callback)
+
+    def timeout_add(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        from gi.repository import GLib
+
+        return GLib.timeout_add(interval, callback)
+
+    def source_remove(self, source_id: int) -> None:
+        from gi.repository import GLib
+
+        GLib.source_remove(source_id)
+
+
+class AsyncioClock(Clock):
+    """Clock backed by an asyncio event loop, for running without GLib.
+
+    The loop defaults to the running loop, so the clock is usually created
+    inside a coroutine. Like the loop, it must only be used from the thread
+    running the loop.
+    """
+
+    __loop: asyncio.AbstractEventLoop
+    __next_id: int
+    __handles: dict[int, asyncio.TimerHandle]
+
+    def __init__(self, loop: typing.Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.__loop = loop if loop is not None else asyncio.get_running_loop()
+        self.__next_id = 1
+        self.__handles = {}
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    def monotonic(self) -> float:
+        return self.__loop.time()
+
+    def timeout_add_seconds(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        return self.__add(float(interval), callback)
+
+    def timeout_add(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        return self.__add(interval / 1000, callback)
+
+    def source_remove(self, source_id: int) -> None:
+        self.__handles.pop(source_id).cancel()
+
+    def pending(self) -> int:
+        """Return the number of timers waiting to fire."""
+        return len(self.__handles)
+
+    def __add(self, interval: float, callback: typing.Callable[[], typing.Any]) -> int:
+        source_id = self.__next_id
+        self.__next_id += 1
+        self.__schedule(source_id, interval, callback)
+        return source_id
+
+    def __schedule(
+        self,
+        source_id: int,
+        interval: float,
+        callback: typing.Callable[[], typing.Any],
+    ) -> None:
+        self.__handles[source_id] = self.__loop.call_later(
+            interval, self.__fire, source_id, interval, callback
+        )
+
+    def __fire(
+        self,
+        source_id: int,
+        interval: float,
+        callback: typing.Callable[[], typing.Any],
+    ) -> None:
+        if callback() and source_id in self.__handles:
+            self.__schedule(source_id, interval, callback)
+        else:
+            self.__handles.pop(source_id, None)
+
+
+class HeapClock(Clock):
+    """Clock which keeps its timers in a heap of deadlines, without a main loop.
+
+    Nothing fires on its own: the owner calls run_due() whenever the deadline
+    returned by next_deadline() has passed. A single HeapClock can drive the
+    timers of any number of SafeEyesCore instances.
+    """
+
+    __next_id: int
+    # heap of (deadline, source id)
+    __queue: list[tuple[float, int]]
+    # source id -> (interval in seconds, callback)
+    __sources: dict[int, tuple[float, typing.Callable[[], typing.Any]]]
+
+    def __init__(self) -> None:
+        self.__next_id = 1
+        self.__queue = []
+        self.__sources = {}
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def timeout_add_seconds(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        return self.__add(float(interval), callback)
+
+    def timeout_add(
+        self, interval: int, callback: typing.Callable[[], typing.Any]
+    ) -> int:
+        return self.__add(interval / 1000, callback)
+
+    def source_remove(self, source_id: int) -> None:
+        # The entry in the queue is dropped once it comes up
+        del self.__sources[source_id]
+
+    def pending(self) -> int:
+        """Return the number of timers waiting to fire."""
+        return len(self.__sources)
+
+    def next_deadline(self) -> typing.Optional[float]:
+        """Return the monotonic deadline of the next timer, or None if there is
+        no timer.
+        """
+        while self.__queue:
+            deadline, source_id = self.__queue[0]
+            if source_id in self.__sources:
+                return deadline
+            # removed
+            heapq.heappop(self.__queue)
+        return None
+
+    def run_due(self) -> int:
+        """Fire all timers whose deadline has passed.
+
+        Returns the number of timers fired.
+        """
+        fired = 0
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > self.monotonic():
+                return fired
+            self._fire_next()
+            fired += 1
+
+    def _fire_next(self) -> None:
+        """Fire the timer at the head of the queue."""
+        _, source_id = heapq.heappop(self.__queue)
+        interval, callback = self.__sources[source_id]
+        if callback():
+            if source_id in self.__sources:
+                # Like GLib, count the next interval from the time of dispatch
+                heapq.heappush(self.__queue, (self.monotonic() + interval, source_id))
+        else:
+            self.__sources.pop(source_id, None)
+
+    def __add(self, interval: float, callback: typing.Callable[[], typing.Any]) -> int:
+        source_id = self.__next_id
+        self.__next_id += 1
+        self.__sources[source_id] = (interval, callback)
+        heapq.heappush(self.__queue, (self.monotonic() + interval, source_id))
+        return source_id
+
+
+class SimulatedClock(HeapClock):
+    """Virtual clock where time only passes when it is advanced.
+
+    Pending timers fire in the order of their deadlines while advancing, and the
+    time jumps straight to the next deadline. This runs a whole day of breaks in
+    a fraction of a second, e.g. for tests and benchmarks.
+    """
+
+    __start: datetime.datetime
+    __elapsed: float
+
+    def __init__(self, start: typing.Optional[datetime.datetime] = None) -> None:
+        super().__init__()
+        self.__start = start if start is not None else datetime.datetime.now()
+        self.__elapsed = 0.0
+
+    def now(self) -> datetime.datetime:
+        return self.__start + datetime.timedelta(seconds=self.__elapsed)
+
+    def monotonic(self) -> float:
+        return self.__elapsed
+
+    def sleep(self, seconds: float) -> None:
+        """Let time pass without firing timers, like a blocking call would."""
+        self.__elapsed += seconds
+
+    def step(self) -> bool:
+        """Jump to the next deadline and fire its timer.
+
+        Returns False if there was no timer to fire.
+        """
+        deadline = self.next_deadline()
+        if deadline is None:
+            return False
+        self.__elapsed = max(self.__elapsed, deadline)
+        self._fire_next()
+        return True
+
+    def advance(self, seconds: float) -> int:
+        """Let the given amount of time pass, firing all timers which are due.
+
+        Returns the number of timers fired.
+        """
+        end = self.__elapsed + seconds
+        fired = 0
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or deadline > end:
+                break
+            self.step()
+            fired += 1
+        self.__elapsed = max(self.__elapsed, end)
+        return fired
@@ -21,7 +21,7 @@ import datetime
 import typing
 
 from safeeyes import utility
-from safeeyes.model import BreakType, State
+from safeeyes.model import Break, BreakType, State
 
 if typing.TYPE_CHECKING:
     from safeeyes.safeeyes import SafeEyes
@@ -72,6 +72,9 @@ class API:
     def get_break_time(self, break_type=None) -> typing.Optional[datetime.datetime]:
         return self._application.safe_eyes_core.get_break_time(break_type)
 
+    def get_timeline(self, count: int) -> list[tuple[Break, datetime.datetime]]:
+        return self._application.safe_eyes_core.get_timeline(count)
+
 
 class Context(MutableMapping):
     version: str
@@ -95,10 +98,12 @@ class Context(MutableMapping):
         locale: str,
         version: str,
         session: dict[str, typing.Any],
+        desktop: typing.Optional[str] = None,
+        is_wayland: typing.Optional[bool] = None,
     ) -> None:
         self.version = version
-        self.desktop = utility.desktop_environment()
-        self.is_wayland = utility.is_wayland()
+        self.desktop = desktop if desktop is not None else utility.desktop_environment()
+        self.is_wayland = is_wayland if is_wayland is not None else utility.is_wayland()
         self.locale = locale
         self.session = session
         self.state = State.START
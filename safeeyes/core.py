@@ -20,8 +20,10 @@
 
 import datetime
 import logging
+import math
 import typing
 
+from safeeyes.clock import Clock, GLibClock
 from safeeyes.model import Break
 from safeeyes.model import BreakType
 from safeeyes.model import BreakQueue
@@ -30,16 +32,66 @@ from safeeyes.model import State
 from safeeyes.model import Config
 
 from safeeyes.context import Context
+from safeeyes.trace import DEFAULT_CAPACITY, Trace
 
-import gi
 
-gi.require_version("GLib", "2.0")
-from gi.repository import GLib
+class WakeupDrift:
+    """Statistics about how far timer wakeups land from their deadline.
+
+    Positive values mean the wakeup happened after the deadline.
+    """
+
+    count: int = 0
+    total: float = 0.0
+    worst: float = 0.0
+    last: float = 0.0
+
+    def record(self, lateness: float) -> None:
+        self.count += 1
+        self.total += lateness
+        self.last = lateness
+        if abs(lateness) > abs(self.worst):
+            self.worst = lateness
+
+    def mean(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
+
+    def __str__(self) -> str:
+        return "{} wakeups, mean {:.3f}s, worst {:.3f}s".format(
+            self.count, self.mean(), self.worst
+        )
 
 
 class SafeEyesCore:
     """Core of Safe Eyes runs the scheduler and notifies the breaks."""
 
+    # settings which define the breaks, changing them rebuilds the BreakQueue
+    BREAK_KEYS = frozenset(
+        [
+            "short_breaks",
+            "long_breaks",
+            "break_tiers",
+            "break_catalog",
+            "short_break_interval",
+            "long_break_interval",
+            "short_break_duration",
+            "long_break_duration",
+            "random_order",
+        ]
+    )
+    # settings read by initialize(), the ones which are not in BREAK_KEYS are
+    # applied by update()
+    CONFIG_KEYS = BREAK_KEYS | frozenset(
+        [
+            "pre_break_warning_time",
+            "postpone_duration",
+            "postpone_unit",
+            "monotonic_scheduler",
+        ]
+    )
+
     scheduled_next_break_time: typing.Optional[datetime.datetime] = None
     scheduled_next_break_timestamp: int = -1
     running: bool = False
@@ -47,13 +99,23 @@ class SafeEyesCore:
     postpone_duration: int = 0
     default_postpone_duration: int = 0
     pre_break_warning_time: int = 0
+    monotonic_scheduler: bool = False
     context: Context
+    clock: Clock
+    drift: WakeupDrift
+    trace: Trace
 
     _break_queue: typing.Optional[BreakQueue] = None
 
     # set while __wait_for is running
     _timeout_id: typing.Optional[int] = None
-    _callback: typing.Optional[typing.Callable[[], None]] = None
+    _callback: typing.Optional[typing.Callable[[], typing.Any]] = None
+    # set while __repeat_every is running
+    _interval: int = 0
+    # clock.monotonic() deadline of the pending wakeup
+    _deadline: typing.Optional[float] = None
+    # deadline of the wakeup that is currently being handled
+    _anchor: typing.Optional[float] = None
 
     # set while __fire_hook is running
     _firing_hook: bool = False
@@ -61,32 +123,66 @@ class SafeEyesCore:
     # set while taking a break
     _countdown: typing.Optional[int] = 0
     _taking_break: typing.Optional[Break] = None
+    # clock.monotonic() deadline of the end of the break
+    _break_deadline: typing.Optional[float] = None
 
     # set to true when a break was requested
     _take_break_now: bool = False
 
-    def __init__(self, context: Context) -> None:
-        """Create an instance of SafeEyesCore and initialize the variables."""
+    # remaining seconds of a break which was interrupted by a restart
+    _resume_countdown: typing.Optional[int] = None
+
+    def __init__(
+        self,
+        context: Context,
+        clock: typing.Optional[Clock] = None,
+        trace_capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        """Create an instance of SafeEyesCore and initialize the variables.
+
+        The clock defaults to the GLib main loop. Pass an AsyncioClock to run
+        without GLib, or a SimulatedClock to run the schedule in virtual time.
+        trace_capacity is the number of events kept for dump_trace, 0 turns
+        the trace off.
+        """
         # This event is fired before <time-to-prepare> for a break
-        self.on_pre_break = EventHook()
+        self.on_pre_break = EventHook("on_pre_break")
         # This event is fired just before the start of a break
-        self.on_start_break = EventHook()
+        self.on_start_break = EventHook("on_start_break")
         # This event is fired at the start of a break
-        self.start_break = EventHook()
+        self.start_break = EventHook("start_break")
         # This event is fired during every count down
-        self.on_count_down = EventHook()
+        self.on_count_down = EventHook("on_count_down")
         # This event is fired at the end of a break
-        self.on_stop_break = EventHook()
+        self.on_stop_break = EventHook("on_stop_break")
         # This event is fired when deciding the next break time
-        self.on_update_next_break = EventHook()
+        self.on_update_next_break = EventHook("on_update_next_break")
         self.context = context
+        self.clock = clock if clock is not None else GLibClock()
+        self.drift = WakeupDrift()
+        self.trace = Trace(trace_capacity)
+        # not saved as a checkpoint, the session may hold one to resume from
         self.context.state = State.WAITING
+        self.trace.state(self.clock.monotonic(), State.WAITING)
 
     def initialize(self, config: Config):
         """Initialize the internal properties from configuration."""
         logging.info("Initialize the core")
-        self.pre_break_warning_time = config.get("pre_break_warning_time")
         self._break_queue = BreakQueue.create(config, self.context)
+        self.update(config)
+
+    def update(self, config: Config) -> None:
+        """Apply the settings which do not define the breaks, keeping the
+        schedule and the position in the break queue.
+        """
+        pre_break_warning_time = config.get("pre_break_warning_time")
+        if (
+            self._break_queue is not None
+            and pre_break_warning_time != self.pre_break_warning_time
+        ):
+            self._break_queue.set_pre_break_warning_time(pre_break_warning_time or 0)
+        self.pre_break_warning_time = pre_break_warning_time
+        self.monotonic_scheduler = bool(config.get("monotonic_scheduler"))
         self.default_postpone_duration = int(config.get("postpone_duration"))
         self.postpone_unit = config.get("postpone_unit")
         if self.postpone_unit != "seconds":
@@ -94,8 +190,12 @@ class SafeEyesCore:
 
         self.postpone_duration = self.default_postpone_duration
 
-    def start(self, next_break_time=-1) -> None:
-        """Start Safe Eyes is it is not running already."""
+    def start(self, next_break_time=-1, resume: bool = False) -> None:
+        """Start Safe Eyes is it is not running already.
+
+        If resume is set, continue from the checkpoint in the session, e.g.
+        after a crash or a restart.
+        """
         if self._break_queue is None:
             logging.info("No breaks defined, not starting the core")
             return
@@ -104,6 +204,8 @@ class SafeEyesCore:
 
             self.running = True
             self.scheduled_next_break_timestamp = int(next_break_time)
+            if resume and self.__resume():
+                return
             self.__scheduler_job()
 
     def stop(self, is_resting=False) -> None:
@@ -112,13 +214,14 @@ class SafeEyesCore:
             return
 
         logging.info("Stop Safe Eyes core")
-        self.paused_time = datetime.datetime.now().timestamp()
+        self.paused_time = self.clock.now().timestamp()
         # Stop the break thread
         self.running = False
         if self.context.state != State.QUIT:
-            self.context.state = State.RESTING if (is_resting) else State.STOPPED
+            self.__set_state(State.RESTING if (is_resting) else State.STOPPED)
 
         self.__wakeup_scheduler()
+        logging.info("Timer drift: %s", self.drift)
 
     def skip(self) -> None:
         """User skipped the break using Skip button."""
@@ -139,14 +242,60 @@ class SafeEyesCore:
         """Returns the next break time."""
         if self._break_queue is None:
             return None
-        break_obj = self._break_queue.get_break_with_type(break_type)
-        if not break_obj or self.scheduled_next_break_time is None:
+        entry = self._break_queue.find_next(break_type)
+        if entry is None or self.scheduled_next_break_time is None:
             return None
         time = self.scheduled_next_break_time + datetime.timedelta(
-            minutes=break_obj.time - self._break_queue.get_break().time
+            seconds=self._break_queue.seconds_until(entry)
         )
         return time
 
+    def get_timeline(self, count: int) -> list[tuple[Break, datetime.datetime]]:
+        """Returns the next breaks and their times, starting with the current
+        break.
+        """
+        if self._break_queue is None or self.scheduled_next_break_time is None:
+            return []
+        return [
+            (
+                entry.break_obj,
+                self.scheduled_next_break_time
+                + datetime.timedelta(seconds=self._break_queue.seconds_until(entry)),
+            )
+            for entry in self._break_queue.get_timeline(count)
+        ]
+
+    def dump_trace(self) -> str:
+        """Returns the recent state changes, hook calls and timers, followed
+        by the time spent in each handler of the hooks.
+        """
+        lines = [self.trace.dump(self.clock.now(), self.clock.monotonic())]
+        for hook in self.hooks():
+            for stats in hook.stats():
+                lines.append(
+                    "{} {}: {} calls, {:.3f}s{}".format(
+                        hook.name,
+                        stats.name,
+                        stats.calls,
+                        stats.seconds,
+                        ", {} timeouts".format(stats.timeouts)
+                        if stats.timeouts
+                        else "",
+                    )
+                )
+        return "\n".join(lines)
+
+    def hooks(self) -> list[EventHook]:
+        """Returns the hooks fired by the core."""
+        return [
+            self.on_pre_break,
+            self.on_start_break,
+            self.start_break,
+            self.on_count_down,
+            self.on_stop_break,
+            self.on_update_next_break,
+        ]
+
     def take_break(self, break_type: typing.Optional[BreakType] = None) -> None:
         """Calling this method stops the scheduler and show the next break
         screen.
@@ -185,7 +334,7 @@ class SafeEyesCore:
             # This will only be called by methods which check this
             return
 
-        current_time = datetime.datetime.now()
+        current_time = self.clock.now()
         current_timestamp = current_time.timestamp()
 
         if self.context.state == State.RESTING and self.paused_time > -1:
@@ -199,8 +348,9 @@ class SafeEyesCore:
                     " duration",
                     paused_duration,
                 )
-                # Skip the next long break
-                self._break_queue.skip_long_break()
+                # Skip the next long break, and any longer breaks which are
+                # shorter than the pause
+                self._break_queue.skip_long_break(paused_duration)
 
         if self.context.postponed:
             # Previous break was postponed
@@ -215,12 +365,12 @@ class SafeEyesCore:
             self.scheduled_next_break_timestamp = -1
         else:
             # Use next break, convert to seconds
-            time_to_wait = self._break_queue.get_break().time * 60
+            time_to_wait = self._break_queue.get_wait_time() * 60
 
         self.scheduled_next_break_time = current_time + datetime.timedelta(
             seconds=time_to_wait
         )
-        self.context.state = State.WAITING
+        self.__set_state(State.WAITING)
         self.__fire_on_update_next_break(self.scheduled_next_break_time)
 
         # Wait for the pre break warning period
@@ -261,7 +411,7 @@ class SafeEyesCore:
         if self._break_queue is None:
             # This will only be called by methods which check this
             return
-        self.context.state = State.PRE_BREAK
+        self.__set_state(State.PRE_BREAK)
         proceed = self.__fire_hook(self.on_pre_break, self._break_queue.get_break())
         if not proceed:
             # Plugins wanted to ignore this break
@@ -310,10 +460,10 @@ class SafeEyesCore:
                 + datetime.timedelta(seconds=self.postpone_duration)
             )
             self.__fire_on_update_next_break(self.scheduled_next_break_time)
+            self.__checkpoint()
             # Wait in user thread
             self.__postpone_break()
         else:
-            self.__fire_hook(self.start_break, break_obj)
             self.__start_break()
 
     def __start_break(self) -> None:
@@ -321,14 +471,26 @@ class SafeEyesCore:
         if self._break_queue is None:
             # This will only be called by methods which check this
             return
-        self.context.state = State.BREAK
         break_obj = self._break_queue.get_break()
         self._taking_break = break_obj
         self._countdown = break_obj.duration
-
-        self.__cycle_break_countdown()
-
-    def __cycle_break_countdown(self) -> None:
+        if self._resume_countdown is not None:
+            self._countdown = min(self._countdown, self._resume_countdown)
+            self._resume_countdown = None
+        start = self.clock.monotonic() if self._anchor is None else self._anchor
+        self._break_deadline = start + self._countdown
+        self.__set_state(State.BREAK)
+        self.__fire_hook(self.start_break, break_obj)
+
+        if self.__cycle_break_countdown():
+            # A single timer source drives the countdown of the whole break
+            self.__repeat_every(1, self.__cycle_break_countdown)
+
+    def __cycle_break_countdown(self) -> bool:
+        """Count down one second of the break.
+
+        Returns whether the countdown continues.
+        """
         if self._taking_break is None or self._countdown is None:
             raise Exception("countdown running without countdown or break")
 
@@ -336,6 +498,11 @@ class SafeEyesCore:
             logging.warning("Break requested while already taking a break")
             self._take_break_now = False
 
+        if self.monotonic_scheduler and self._break_deadline is not None:
+            # Skip seconds if the ticks fell behind, so the break ends on time
+            remaining = math.ceil(self._break_deadline - self.clock.monotonic())
+            self._countdown = min(self._countdown, max(0, remaining))
+
         if (
             self._countdown > 0
             and self.running
@@ -348,13 +515,14 @@ class SafeEyesCore:
             total_break_time = self._taking_break.duration
             seconds = total_break_time - countdown
             self.__fire_hook(self.on_count_down, countdown, seconds)
-            # Sleep for 1 second
-            self.__wait_for(1, self.__cycle_break_countdown)
+            return True
         else:
             self._countdown = None
             self._taking_break = None
+            self._break_deadline = None
 
             self.__fire_stop_break()
+            return False
 
     def __fire_stop_break(self) -> None:
         # Loop terminated because of timeout (not skipped) -> Close the break alert
@@ -373,12 +541,28 @@ class SafeEyesCore:
         duration: int,
         callback: typing.Callable[[], None],
     ) -> None:
-        """Wait until someone wake up or the timeout happens."""
+        """Wait until someone wake up or the timeout happens.
+
+        With monotonic_scheduler, the deadline is counted from the deadline of
+        the wakeup currently being handled instead of from now, so the time
+        spent in hooks does not add up across the phases of a break.
+        """
         if self._callback is not None or self._timeout_id is not None:
             raise Exception("this should not be called reentrantly")
 
         self._callback = callback
-        self._timeout_id = GLib.timeout_add_seconds(duration, self.__on_wakeup)
+        now = self.clock.monotonic()
+        if self.monotonic_scheduler:
+            base = now if self._anchor is None else self._anchor
+            self._deadline = base + duration
+            interval = max(0, round((self._deadline - now) * 1000))
+            self._timeout_id = self.clock.timeout_add(interval, self.__on_wakeup)
+        else:
+            self._deadline = now + duration
+            self._timeout_id = self.clock.timeout_add_seconds(
+                duration, self.__on_wakeup
+            )
+        self.trace.arm(now, callback.__name__, self._deadline)
 
     def __on_wakeup(self) -> bool:
         if self._callback is None or self._timeout_id is None:
@@ -389,10 +573,78 @@ class SafeEyesCore:
         self._timeout_id = None
         self._callback = None
 
+        if self._deadline is not None:
+            now = self.clock.monotonic()
+            lateness = now - self._deadline
+            self.drift.record(lateness)
+            self.trace.fire(now, callback.__name__, self._deadline)
+            logging.debug("Woke up %.3fs after the deadline", lateness)
+            self._anchor = self._deadline
+            self._deadline = None
+
         callback()
 
+        self._anchor = None
+
         # This signals that the callback should only be called once
-        return GLib.SOURCE_REMOVE
+        return False
+
+    def __repeat_every(
+        self,
+        interval: int,
+        callback: typing.Callable[[], bool],
+    ) -> None:
+        """Call the callback every interval seconds using a single timer
+        source, until it returns False or someone wakes up the scheduler.
+        """
+        if self._callback is not None or self._timeout_id is not None:
+            raise Exception("this should not be called reentrantly")
+
+        self._callback = callback
+        self._interval = interval
+        now = self.clock.monotonic()
+        if self.monotonic_scheduler:
+            base = now if self._anchor is None else self._anchor
+            self._deadline = base + interval
+            self._timeout_id = self.clock.timeout_add(interval * 1000, self.__on_repeat)
+        else:
+            self._deadline = now + interval
+            self._timeout_id = self.clock.timeout_add_seconds(
+                interval, self.__on_repeat
+            )
+        self.trace.arm(now, callback.__name__, self._deadline)
+
+    def __on_repeat(self) -> bool:
+        if self._callback is None or self._timeout_id is None:
+            raise Exception("Woken up but no callback")
+
+        callback = self._callback
+        timeout_id = self._timeout_id
+        deadline = self._deadline
+
+        # The callback may schedule the next phase once it is done
+        self._timeout_id = None
+        self._callback = None
+        self._deadline = None
+
+        if deadline is not None:
+            now = self.clock.monotonic()
+            self.drift.record(now - deadline)
+            self.trace.fire(now, callback.__name__, deadline)
+            self._anchor = deadline
+
+        proceed = callback()
+
+        self._anchor = None
+
+        if not proceed:
+            return False
+
+        self._callback = callback
+        self._timeout_id = timeout_id
+        if deadline is not None:
+            self._deadline = deadline + self._interval
+        return True
 
     def __fire_hook(
         self,
@@ -405,12 +657,101 @@ class SafeEyesCore:
 
         self._firing_hook = True
 
+        start = self.clock.monotonic()
         proceed = hook.fire(*args, **kwargs)
+        self.trace.hook(start, hook.name, self.clock.monotonic() - start)
 
         self._firing_hook = False
 
         return proceed
 
+    def __set_state(self, state: State) -> None:
+        self.context.state = state
+        self.trace.state(self.clock.monotonic(), state)
+        self.__checkpoint()
+
+    def __checkpoint(self) -> None:
+        """Save the scheduling state into the session.
+
+        All times are wall-clock timestamps, so that they stay valid across
+        restarts. The position in the break queue is saved by the queue.
+        """
+        now = self.clock.now()
+        checkpoint: dict[str, typing.Any] = {
+            "state": self.context.state.name,
+            "time": now.timestamp(),
+        }
+        if self.scheduled_next_break_time is not None:
+            checkpoint["next_break"] = self.scheduled_next_break_time.timestamp()
+        if self.context.state == State.BREAK and self._break_deadline is not None:
+            remaining = self._break_deadline - self.clock.monotonic()
+            checkpoint["break_end"] = now.timestamp() + remaining
+        if self.paused_time > -1:
+            checkpoint["paused_time"] = self.paused_time
+        self.context.session["checkpoint"] = checkpoint
+
+    def __resume(self) -> bool:
+        """Continue from the checkpoint in the session.
+
+        Returns False if the scheduler should start as usual.
+        """
+        checkpoint = self.context.session.get("checkpoint")
+        if not isinstance(checkpoint, dict) or self._break_queue is None:
+            return False
+
+        now = self.clock.now().timestamp()
+        state = checkpoint.get("state")
+        next_break = checkpoint.get("next_break")
+
+        if state == State.BREAK.name and "break_end" in checkpoint:
+            break_end = checkpoint["break_end"]
+            remaining = math.ceil(break_end - now)
+            if remaining > 0:
+                logging.info("Resume the break with %d seconds left", remaining)
+                if next_break is None:
+                    # the break started after the pre-break warning
+                    next_break = (
+                        break_end
+                        - self._break_queue.get_break().duration
+                        - (self.pre_break_warning_time or 0)
+                    )
+                # postponing and the times of the next breaks count from it
+                self.scheduled_next_break_time = datetime.datetime.fromtimestamp(
+                    next_break
+                )
+                self.__fire_on_update_next_break(self.scheduled_next_break_time)
+                self._resume_countdown = remaining
+                self.__do_start_break()
+                return True
+            # The break ended while Safe Eyes was not running
+            self._break_queue.next()
+            next_break = break_end + self._break_queue.get_wait_time() * 60
+        elif state == State.RESTING.name and "paused_time" in checkpoint:
+            logging.info("Resume resting")
+            self.paused_time = checkpoint["paused_time"]
+            self.__set_state(State.RESTING)
+            return False
+        elif state not in (State.WAITING.name, State.PRE_BREAK.name):
+            return False
+
+        if next_break is None:
+            return False
+
+        if now - next_break > self._break_queue.get_break().duration:
+            # The break was missed by more than its duration, which is just as
+            # good as resting since then
+            logging.info("Missed the break while not running, resume resting")
+            self.paused_time = next_break
+            self.__set_state(State.RESTING)
+            return False
+
+        logging.info("Resume waiting for the next break")
+        self.scheduled_next_break_time = datetime.datetime.fromtimestamp(next_break)
+        self.__set_state(State.WAITING)
+        self.__fire_on_update_next_break(self.scheduled_next_break_time)
+        self.__wait_for(max(0, math.ceil(next_break - now)), self.__do_pre_break)
+        return True
+
     def __wakeup_scheduler(self) -> None:
         if (self._callback is None) != (self._timeout_id is None):
             # either both are set or none are set
@@ -426,9 +767,12 @@ class SafeEyesCore:
         if self._callback is not None and self._timeout_id is not None:
             callback = self._callback
 
-            GLib.source_remove(self._timeout_id)
+            self.clock.source_remove(self._timeout_id)
             self._timeout_id = None
             self._callback = None
+            # woken up early, the following waits are counted from now
+            self._deadline = None
+            self._anchor = None
 
             callback()
         elif self._firing_hook:
@@ -0,0 +1,276 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Headless host which runs the break schedules of many users in one process.
+
+Every session has its own Context, BreakQueue and SafeEyesCore, but all of
+them share a single HeapClock, so an idle session costs a few objects and one
+entry in the heap of deadlines. Showing the breaks is left to a Presenter,
+e.g. one forwarding the events to a thin client in the user's desktop session.
+
+The host is not thread-safe: sessions must be added, removed and controlled
+from the thread running the host, e.g. from a timer added to host.clock.
+"""
+
+import datetime
+import logging
+import threading
+import typing
+
+from safeeyes.clock import HeapClock
+from safeeyes.context import API, Context
+from safeeyes.core import SafeEyesCore
+from safeeyes.model import Break, BreakType, Config, State
+
+
+class Presenter:
+    """Shows the breaks of the sessions of a SchedulerHost.
+
+    The default implementation ignores all events.
+    """
+
+    def pre_break(self, session_id: str, break_obj: Break) -> None:
+        """The break starts after the pre-break warning time."""
+
+    def start_break(self, session_id: str, break_obj: Break) -> None:
+        """Show the break screen."""
+
+    def countdown(self, session_id: str, countdown: int, seconds: int) -> None:
+        """Update the remaining time of the break."""
+
+    def stop_break(self, session_id: str) -> None:
+        """Close the break screen."""
+
+    def update_next_break(
+        self, session_id: str, break_obj: Break, next_break_time: datetime.datetime
+    ) -> None:
+        """The next break was scheduled. The session dict was updated and may
+        be persisted.
+        """
+
+
+class SessionAPI(API):
+    """API of a single session in a SchedulerHost.
+
+    Actions which would change the state of the core are queued on the clock
+    of the host, like the API of the application queues them on the main loop.
+    """
+
+    _session: "Session"
+
+    def __init__(self, session: "Session") -> None:
+        self._session = session
+
+    def show_settings(self, activation_token: typing.Optional[str] = None) -> None:
+        logging.debug("Settings are not available in headless sessions")
+
+    def show_about(self, activation_token: typing.Optional[str] = None) -> None:
+        logging.debug("About is not available in headless sessions")
+
+    def enable_safeeyes(self, next_break_time=-1) -> None:
+        self.__call_soon(self._session.enable, next_break_time)
+
+    def disable_safeeyes(self, status=None, is_resting=False) -> None:
+        self.__call_soon(self._session.disable, status, is_resting)
+
+    def status(self) -> str:
+        return self._session.status
+
+    def quit(self) -> None:
+        self.__call_soon(self._session.host.remove_session, self._session.id)
+
+    def take_break(self, break_type: typing.Optional[BreakType] = None) -> None:
+        self.__call_soon(self._session.core.take_break, break_type)
+
+    def has_breaks(self, break_type=None) -> bool:
+        return self._session.core.has_breaks(break_type)
+
+    def postpone(self, duration=-1) -> None:
+        self._session.core.postpone(duration)
+
+    def get_break_time(self, break_type=None) -> typing.Optional[datetime.datetime]:
+        return self._session.core.get_break_time(break_type)
+
+    def get_timeline(self, count: int) -> list[tuple[Break, datetime.datetime]]:
+        return self._session.core.get_timeline(count)
+
+    def __call_soon(self, function: typing.Callable, *args) -> None:
+        def callback() -> bool:
+            function(*args)
+            return False
+
+        self._session.host.clock.timeout_add(0, callback)
+
+
+class Session:
+    """The schedule of a single user in a SchedulerHost."""
+
+    id: str
+    host: "SchedulerHost"
+    context: Context
+    core: SafeEyesCore
+    active: bool = False
+    status: str = ""
+
+    def __init__(
+        self,
+        host: "SchedulerHost",
+        session_id: str,
+        config: Config,
+        session: dict[str, typing.Any],
+    ) -> None:
+        self.id = session_id
+        self.host = host
+        self.context = Context(
+            api=SessionAPI(self),
+            locale=host.locale,
+            version=host.version,
+            session=session,
+            # the break screen is shown by the presenter, not on this machine
+            desktop="unknown",
+            is_wayland=False,
+        )
+        self.core = SafeEyesCore(self.context, host.clock, host.trace_capacity)
+        self.core.on_pre_break += self.__on_pre_break
+        self.core.start_break += self.__start_break
+        self.core.on_count_down += self.__countdown
+        self.core.on_stop_break += self.__stop_break
+        self.core.on_update_next_break += self.__update_next_break
+        self.core.initialize(config)
+
+    def enable(self, next_break_time=-1, resume: bool = False) -> None:
+        """Start the schedule if it is not running already."""
+        if not self.active and self.core.has_breaks():
+            self.active = True
+            self.status = ""
+            self.context.state = State.START
+            self.core.start(next_break_time, resume)
+
+    def disable(self, status: typing.Optional[str] = None, is_resting=False) -> None:
+        """Stop the schedule if it is running."""
+        if self.active:
+            self.active = False
+            self.core.stop(is_resting)
+            self.status = status if status is not None else "Disabled"
+
+    def __on_pre_break(self, break_obj: Break) -> bool:
+        self.host.presenter.pre_break(self.id, break_obj)
+        return True
+
+    def __start_break(self, break_obj: Break) -> bool:
+        self.host.presenter.start_break(self.id, break_obj)
+        return True
+
+    def __countdown(self, countdown: int, seconds: int) -> bool:
+        self.host.presenter.countdown(self.id, countdown, seconds)
+        return True
+
+    def __stop_break(self) -> bool:
+        self.host.presenter.stop_break(self.id)
+        return True
+
+    def __update_next_break(
+        self, break_obj: Break, next_break_time: datetime.datetime
+    ) -> bool:
+        self.status = "Next break at %s" % next_break_time.strftime("%H:%M")
+        self.host.presenter.update_next_break(self.id, break_obj, next_break_time)
+        return True
+
+
+class SchedulerHost:
+    """Runs the schedules of many sessions from a single heap of deadlines."""
+
+    clock: HeapClock
+    presenter: Presenter
+    locale: str
+    version: str
+    # number of events in the trace of each session, off by default
+    trace_capacity: int
+
+    __sessions: dict[str, Session]
+    __stopped: threading.Event
+
+    def __init__(
+        self,
+        presenter: Presenter,
+        clock: typing.Optional[HeapClock] = None,
+        locale: str = "en_US",
+        version: str = "",
+        trace_capacity: int = 0,
+    ) -> None:
+        self.presenter = presenter
+        self.clock = clock if clock is not None else HeapClock()
+        self.locale = locale
+        self.version = version
+        self.trace_capacity = trace_capacity
+        self.__sessions = {}
+        self.__stopped = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self.__sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.__sessions
+
+    def add_session(
+        self,
+        session_id: str,
+        config: Config,
+        session: typing.Optional[dict[str, typing.Any]] = None,
+        next_break_time=-1,
+    ) -> Session:
+        """Create a session and start its schedule.
+
+        The session dict is updated on every change of the state, like the
+        session file of the application. If it holds a checkpoint, the
+        schedule continues from there.
+        """
+        if session_id in self.__sessions:
+            raise Exception("session {} exists already".format(session_id))
+        new_session = Session(
+            self, session_id, config, session if session is not None else {}
+        )
+        self.__sessions[session_id] = new_session
+        new_session.enable(next_break_time, resume=True)
+        return new_session
+
+    def get_session(self, session_id: str) -> Session:
+        return self.__sessions[session_id]
+
+    def remove_session(self, session_id: str) -> None:
+        """Stop the schedule of a session and forget it."""
+        session = self.__sessions.pop(session_id, None)
+        if session is None:
+            return
+        session.context.state = State.QUIT
+        session.disable()
+
+    def run(self) -> None:
+        """Fire the timers of all sessions until stop() is called."""
+        self.__stopped.clear()
+        while not self.__stopped.is_set():
+            self.clock.run_due()
+            deadline = self.clock.next_deadline()
+            if deadline is None:
+                timeout = None
+            else:
+                timeout = max(0.0, deadline - self.clock.monotonic())
+            self.__stopped.wait(timeout)
+
+    def stop(self) -> None:
+        """Stop run(). This may be called from any thread."""
+        self.__stopped.set()
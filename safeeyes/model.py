@@ -20,9 +20,20 @@
 plugins.
 """
 
+import array
+import asyncio
+import bisect
+import collections
+import concurrent.futures
 import copy
+import functools
+import inspect
+import itertools
 import logging
 import random
+import threading
+import time
+import zlib
 from enum import Enum
 from dataclasses import dataclass
 from typing import Optional, Union
@@ -30,15 +41,13 @@ import typing
 
 from packaging.version import parse
 
-import gi
-
-gi.require_version("Gtk", "4.0")
-from gi.repository import Gtk
-
 from safeeyes import utility
 from safeeyes.translations import translate as _
 
 if typing.TYPE_CHECKING:
+    from gi.repository import Gtk
+
+    from safeeyes.catalog import Catalog, CatalogBreaks
     from safeeyes.context import Context
 
 
@@ -50,14 +59,23 @@ class BreakType(Enum):
 
 
 class Break:
-    """An entity class which represents a break."""
+    """An entity class which represents a break.
+
+    Breaks are immutable. BreakQueue builds them once per configuration and
+    keeps the remaining time until each break on its own, so the same Break
+    objects can be shared by any number of queues.
+    """
+
+    __slots__ = ("type", "name", "time", "duration", "image", "plugins")
 
     type: BreakType
     name: str
+    # configured interval in minutes
     time: int
     duration: int
     image: typing.Optional[str]  # path
-    plugins: dict
+    # ids of the plugins enabled for this break, or None for all plugins
+    plugins: typing.Optional[frozenset[str]]
 
     def __init__(
         self,
@@ -66,14 +84,25 @@ class Break:
         time: int,
         duration: int,
         image: typing.Optional[str],
-        plugins: dict,
+        plugins: typing.Optional[typing.Iterable[str]],
     ):
-        self.type = break_type
-        self.name = name
-        self.duration = duration
-        self.image = image
-        self.plugins = plugins
-        self.time = time
+        initialize = super().__setattr__
+        initialize("type", break_type)
+        initialize("name", name)
+        initialize("duration", duration)
+        initialize("image", image)
+        initialize("plugins", frozenset(plugins) if plugins else None)
+        initialize("time", time)
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise AttributeError("Break is immutable")
+
+    def __reduce__(self) -> tuple:
+        # copy and pickle through the constructor, as attributes can't be set
+        return (
+            Break,
+            (self.type, self.name, self.time, self.duration, self.image, self.plugins),
+        )
 
     def __str__(self) -> str:
         return 'Break: {{name: "{}", type: {}, duration: {}}}\n'.format(
@@ -99,107 +128,358 @@ class Break:
             return is_plugin_enabled
 
 
+@dataclass
+class TimelineEntry:
+    """A break in the timeline of upcoming breaks."""
+
+    break_obj: Break
+    # minutes to wait before this break, counted from the end of the previous one
+    wait: int
+    # seconds from the start of the timeline to the pre-break of this break
+    start: int
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(value: int) -> int:
+    """Scramble a 64 bit integer, using the finalizer of SplitMix64."""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+@functools.lru_cache(maxsize=16)
+def _build_breaks(
+    break_type: BreakType,
+    tier: int,
+    definitions: tuple[
+        tuple[str, int, int, typing.Optional[str], typing.Optional[tuple[str, ...]]],
+        ...,
+    ],
+) -> tuple[Break, ...]:
+    """Return the breaks of a tier for the given (name, interval, duration,
+    image, plugins) definitions.
+
+    Reloading an unchanged configuration, or starting a queue for another
+    session with the same configuration, reuses the same breaks. The tier is
+    part of the key, so that equal definitions in two tiers are still
+    different breaks.
+    """
+    return tuple(
+        Break(break_type, name, interval, duration, image, plugins)
+        for name, interval, duration, image, plugins in definitions
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _permute(key: int, size: int, index: int) -> int:
+    """Return the element at index of the permutation of range(size) selected
+    by the key, without computing the other elements.
+
+    A Feistel network permutes the smallest range of 4**n numbers holding
+    size. Results outside of range(size) are permuted again until they fall
+    into it, which takes less than four passes on average. The same few
+    positions are looked up again and again while stepping the timeline, so
+    the results are cached.
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    value = index
+    while True:
+        left = value >> half_bits
+        right = value & mask
+        for round_key in range(key, key + 8):
+            left, right = right, left ^ (_mix(round_key ^ (right << 32)) & mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+class _Tier:
+    """A level of breaks which repeat at their own interval, e.g. the short
+    breaks.
+    """
+
+    __slots__ = ("type", "interval", "breaks")
+
+    type: BreakType
+    # minutes between two breaks of the tier
+    interval: int
+    breaks: Union[tuple[Break, ...], "CatalogBreaks"]
+
+    def __init__(
+        self,
+        break_type: BreakType,
+        interval: int,
+        breaks: Union[tuple[Break, ...], "CatalogBreaks"],
+    ) -> None:
+        self.type = break_type
+        self.interval = interval
+        self.breaks = breaks
+
+
+class _QueueCursor:
+    """Position in the break queues after selecting a break.
+
+    Times are minutes of work, counted from the start of the queue without the
+    breaks. Stepping a copy of the cursor computes upcoming breaks without
+    touching the state of the BreakQueue.
+    """
+
+    __slots__ = ("now", "current", "index", "cycle", "due")
+
+    # end of the previous break
+    now: int
+    # tier of the selected break
+    current: int
+    # by tier: index of the next break in the current cycle
+    index: array.array
+    # by tier: number of passes through the breaks, which selects their order
+    # if they are shuffled
+    cycle: array.array
+    # by tier: time at which the next break is due
+    due: array.array
+
+    def __init__(self, tiers: int) -> None:
+        self.now = 0
+        self.current = 0
+        self.index = array.array("i", bytes(4 * tiers))
+        self.cycle = array.array("q", bytes(8 * tiers))
+        self.due = array.array("q", bytes(8 * tiers))
+
+    def copy(self) -> "_QueueCursor":
+        cursor = _QueueCursor(0)
+        cursor.now = self.now
+        cursor.current = self.current
+        cursor.index = self.index[:]
+        cursor.cycle = self.cycle[:]
+        cursor.due = self.due[:]
+        return cursor
+
+
 class BreakQueue:
-    __current_break: Break
-    __current_long: int = 0
-    __current_short: int = 0
-    __short_break_time: int
-    __long_break_time: int
-    __is_random_order: bool
-    __long_queue: typing.Optional[list[Break]]
-    __short_queue: typing.Optional[list[Break]]
+    """Queue of breaks in any number of tiers.
+
+    Short and long breaks are the default tiers, and more tiers can be added
+    with the break_tiers setting, e.g. micro breaks every 5 minutes. Every
+    tier keeps the time its next break is due, and the break due first is
+    taken next. A break resets the times of the tiers with shorter intervals,
+    so a long break also counts as a short break.
+
+    The queue keeps a timeline of the upcoming breaks, which is extended on
+    demand and advanced in place, so looking up the next break of a type does
+    not recompute the schedule.
+    """
+
+    # upper bound of breaks to look ahead for a break type
+    MAX_LOOKAHEAD = 10000
+
+    __pre_break_warning_time: int
+    # seed of the shuffled orders, or None if the breaks are not shuffled
+    __seed: typing.Optional[int]
+    # ordered by their interval
+    __tiers: tuple[_Tier, ...]
+    # the current break is the first entry
+    __timeline: collections.deque[tuple[TimelineEntry, _QueueCursor]]
+    __next_of_type: dict[BreakType, TimelineEntry]
+    # checksum of the configured breaks, saved with the cursor
+    __signature: str
     context: "Context"
 
     @classmethod
     def create(
         cls, config: "Config", context: "Context"
     ) -> typing.Optional["BreakQueue"]:
-        short_break_time = config.get("short_break_interval")
-        long_break_time = config.get("long_break_interval")
-        is_random_order = config.get("random_order")
-
-        short_queue = cls.__build_queue(
-            BreakType.SHORT_BREAK,
-            config.get("short_breaks"),
-            short_break_time,
-            config.get("short_break_duration"),
-            is_random_order,
-        )
-
-        long_queue = cls.__build_queue(
-            BreakType.LONG_BREAK,
-            config.get("long_breaks"),
-            long_break_time,
-            config.get("long_break_duration"),
-            is_random_order,
-        )
-
-        if short_queue is None and long_queue is None:
+        catalog = cls.__open_catalog(config.get("break_catalog"))
+        tier_configs = [
+            (
+                BreakType.SHORT_BREAK,
+                config.get("short_breaks") if catalog is None else catalog,
+                config.get("short_break_interval"),
+                config.get("short_break_duration"),
+            ),
+            (
+                BreakType.LONG_BREAK,
+                config.get("long_breaks") if catalog is None else catalog,
+                config.get("long_break_interval"),
+                config.get("long_break_duration"),
+            ),
+        ]
+        for tier_config in config.get("break_tiers") or []:
+            interval = tier_config.get("interval")
+            duration = tier_config.get("duration")
+            if not isinstance(interval, int) or interval <= 0:
+                logging.error("Invalid break tier interval in: " + str(tier_config))
+                continue
+            tier_configs.append(
+                (
+                    BreakType.LONG_BREAK
+                    if tier_config.get("type") == "long"
+                    else BreakType.SHORT_BREAK,
+                    tier_config.get("breaks", []),
+                    interval,
+                    duration,
+                )
+            )
+        # sorting is stable, short breaks come before long breaks with the
+        # same interval
+        tier_configs.sort(key=lambda tier_config: tier_config[2])
+
+        tiers: list[_Tier] = []
+        for break_type, break_configs, interval, duration in tier_configs:
+            breaks: Union[tuple[Break, ...], "CatalogBreaks", None]
+            if isinstance(break_configs, list):
+                breaks = cls.__build_queue(
+                    break_type, len(tiers), break_configs, interval, duration
+                )
+            else:
+                # the configured breaks stand in if the catalog can't be read
+                fallback = cls.__build_queue(
+                    break_type,
+                    len(tiers),
+                    config.get(
+                        "long_breaks"
+                        if break_type == BreakType.LONG_BREAK
+                        else "short_breaks"
+                    )
+                    or [],
+                    interval,
+                    duration,
+                )
+                breaks = break_configs.breaks(
+                    break_type, interval, duration, fallback or ()
+                )
+            if breaks is not None:
+                tiers.append(_Tier(break_type, interval, breaks))
+
+        if not tiers:
             return None
 
         return cls(
             context,
-            short_break_time,
-            long_break_time,
-            is_random_order,
-            short_queue,
-            long_queue,
+            tuple(tiers),
+            config.get("random_order"),
+            config.get("pre_break_warning_time") or 0,
         )
 
+    @staticmethod
+    def __open_catalog(path: typing.Optional[str]) -> typing.Optional["Catalog"]:
+        """Open the break catalog which replaces the short and long breaks."""
+        if not path:
+            return None
+        from safeeyes.catalog import open_catalog
+
+        try:
+            catalog = open_catalog(path)
+        except OSError as e:
+            logging.error(
+                "Can't read the break catalog, using the configured breaks: %s", e
+            )
+            return None
+        if catalog.errors:
+            logging.warning(
+                "Skipping %d invalid breaks in %s, the first one at %s",
+                len(catalog.errors),
+                catalog.path,
+                catalog.errors[0],
+            )
+        return catalog
+
     def __init__(
         self,
         context: "Context",
-        short_break_time: int,
-        long_break_time: int,
+        tiers: tuple[_Tier, ...],
         is_random_order: bool,
-        short_queue: typing.Optional[list[Break]],
-        long_queue: typing.Optional[list[Break]],
+        pre_break_warning_time: int = 0,
     ) -> None:
         """Constructor for BreakQueue. Do not call this directly.
 
         Instead, use BreakQueue.create() instead.
-        short_queue and long_queue must not both be None, and must not be an empty
-        list.
+        tiers must not be empty, must be ordered by their interval, and must
+        not have an empty tuple of breaks. The breaks are in the configured
+        order; the position in the queue is restored from the session, if it
+        was saved for the same breaks.
         """
         self.context = context
-        self.__short_break_time = short_break_time
-        self.__long_break_time = long_break_time
-        self.__is_random_order = is_random_order
-        self.__short_queue = short_queue
-        self.__long_queue = long_queue
-
-        # load first break
-        self.__set_next_break()
-
-        # Restore the last break from session
-        last_break = context.session.get("break")
-        if last_break is not None:
-            current_break = self.get_break()
-            if last_break != current_break.name:
-                brk = self.next()
-                while brk != current_break and brk.name != last_break:
-                    brk = self.next()
+        self.__pre_break_warning_time = pre_break_warning_time
+        self.__tiers = tiers
+        self.__signature = self.__sign()
+
+        self.__seed = None
+        if is_random_order:
+            # The seed is kept in the session, so the shuffled orders are the
+            # same after a restart, and can be reproduced from a session file
+            seed = context.session.get("shuffle_seed")
+            if not isinstance(seed, int):
+                seed = random.getrandbits(64)
+                context.session["shuffle_seed"] = seed
+            self.__seed = seed
+
+        restored = self.__restore(context.session)
+        if restored is not None:
+            brk, cursor = restored
+        else:
+            # load first break
+            cursor = self.__new_cursor()
+            brk = self.__select(cursor)
+        self.__set_current(brk, cursor, 0)
 
     def get_break(self) -> Break:
-        return self.__current_break
+        return self.__timeline[0][0].break_obj
+
+    def get_wait_time(self) -> int:
+        """Return the minutes to wait before the current break."""
+        return self.__timeline[0][0].wait
 
     def get_break_with_type(
         self, break_type: typing.Optional[BreakType] = None
     ) -> typing.Optional[Break]:
-        if break_type is None or self.__current_break.type == break_type:
-            return self.__current_break
+        entry = self.find_next(break_type)
+        if entry is None:
+            return None
+        return entry.break_obj
 
-        if break_type == BreakType.LONG_BREAK:
-            if self.__long_queue is None:
-                return None
-            return self.__long_queue[self.__current_long]
+    def find_next(
+        self, break_type: typing.Optional[BreakType] = None
+    ) -> typing.Optional[TimelineEntry]:
+        """Return the timeline entry of the next break with the given type."""
+        current = self.__timeline[0][0]
+        if break_type is None or current.break_obj.type == break_type:
+            return current
 
-        if self.__short_queue is None:
+        if self.is_empty(break_type):
             return None
-        return self.__short_queue[self.__current_short]
+
+        entry = self.__next_of_type.get(break_type)
+        if entry is not None:
+            return entry
+
+        for i in range(self.MAX_LOOKAHEAD):
+            if i >= len(self.__timeline):
+                self.__extend_timeline()
+            entry = self.__timeline[i][0]
+            if entry.break_obj.type == break_type:
+                self.__next_of_type[break_type] = entry
+                return entry
+
+        return None
+
+    def get_timeline(self, count: int) -> list[TimelineEntry]:
+        """Return the current break followed by the next count - 1 breaks."""
+        while len(self.__timeline) < count:
+            self.__extend_timeline()
+        return [entry for entry, _ in itertools.islice(self.__timeline, count)]
+
+    def seconds_until(self, entry: TimelineEntry) -> int:
+        """Return the seconds from the pre-break of the current break to the
+        pre-break of the given break in the timeline.
+        """
+        return entry.start - self.__timeline[0][0].start
 
     def is_long_break(self) -> bool:
-        return self.__current_break.type == BreakType.LONG_BREAK
+        return self.get_break().type == BreakType.LONG_BREAK
 
     def next(self, break_type: typing.Optional[BreakType] = None) -> Break:
         """Advance to the next break, and return that break.
@@ -208,130 +488,267 @@ class BreakQueue:
         If the last break in the queue is reached, this resets the internal index to
         the first break again, and shuffle if needed.
         """
-        shorts = self.__short_queue
-        longs = self.__long_queue
-        previous_break = self.__current_break
-
-        # Reset break that has just ended
-        if previous_break.is_long_break():
-            previous_break.time = self.__long_break_time
-            if self.__current_long == 0 and self.__is_random_order:
-                # Shuffle queue
-                if self.__long_queue is not None:
-                    random.shuffle(self.__long_queue)
-        else:
-            # Reduce the break time from the next long break (default)
-            if longs:
-                if shorts is None:
-                    raise Exception(
-                        "this may not happen, either short or long breaks must be"
-                        " defined"
-                    )
-                longs[self.__current_long].time -= shorts[self.__current_short].time
-            if self.__current_short == 0 and self.__is_random_order:
-                if self.__short_queue is not None:
-                    random.shuffle(self.__short_queue)
-
-        self.__set_next_break(break_type)
-
-        return self.__current_break
-
-    def __set_next_break(self, break_type: typing.Optional[BreakType] = None) -> None:
-        shorts = self.__short_queue
-        longs = self.__long_queue
-
-        if shorts is None:
-            break_obj = self.__next_long()
-        elif longs is None:
-            break_obj = self.__next_short()
-        elif (
-            break_type == BreakType.LONG_BREAK
-            or longs[self.__current_long].time <= shorts[self.__current_short].time
-        ):
-            break_obj = self.__next_long()
-        else:
-            break_obj = self.__next_short()
-
-        self.__current_break = break_obj
-        self.context.session["break"] = self.__current_break.name
+        if break_type is not None:
+            current, cursor = self.__timeline[0]
+            cursor = cursor.copy()
+            self.__advance(cursor)
+            brk = self.__select(cursor, break_type)
+            self.__set_current(
+                brk, cursor, self.__start_after(current, self.__wait(cursor))
+            )
+            return brk
+
+        if len(self.__timeline) == 1:
+            self.__extend_timeline()
+        self.__timeline.popleft()
+        self.__next_of_type.clear()
+        self.__update_session()
+
+        return self.get_break()
+
+    def skip_long_break(self, rested: typing.Optional[int] = None) -> None:
+        """Count the next long breaks as taken, after resting instead.
+
+        This restarts the intervals of all tiers but the first one. If rested
+        is given, only the tiers whose next break is shorter than rested
+        seconds are restarted.
+        """
+        current, cursor = self.__timeline[0]
+        cursor = cursor.copy()
 
-    def skip_long_break(self) -> None:
-        if not (self.__short_queue and self.__long_queue):
+        restarted = []
+        for tier in range(1, len(self.__tiers)):
+            if tier == cursor.current:
+                upcoming = current.break_obj
+            else:
+                upcoming = self.__peek(cursor, tier)
+            if rested is None or upcoming.duration < rested:
+                cursor.due[tier] = cursor.now + self.__peek(cursor, tier).time
+                restarted.append(tier)
+        if not restarted:
             return
 
-        for break_object in self.__short_queue:
-            break_object.time = self.__short_break_time
+        brk = current.break_obj
+        if cursor.current in restarted:
+            # Note: this skips the current break, meaning the following break
+            # of its tier won't be the current one, but the next one after
+            brk = self.__select(cursor)
 
-        for break_object in self.__long_queue:
-            break_object.time = self.__long_break_time
+        self.__set_current(brk, cursor, current.start)
 
-        if self.__current_break.type == BreakType.LONG_BREAK:
-            # Note: this skips the long break, meaning the following long break
-            # won't be the current one, but the next one after
-            # we could decrement the __current_long counter, but then we'd need to
-            # handle wraparound and possibly randomizing, which seems complicated
-            self.__current_break = self.__next_short()
-            self.context.session["break"] = self.__current_break.name
+    def set_pre_break_warning_time(self, seconds: int) -> None:
+        """Change the seconds between the pre-break warning and the break,
+        keeping the position in the queue.
+        """
+        self.__pre_break_warning_time = seconds
+        current, cursor = self.__timeline[0]
+        self.__set_current(current.break_obj, cursor, current.start)
 
     def is_empty(self, break_type: BreakType) -> bool:
         """Check if the given break type is empty or not."""
-        if break_type == BreakType.SHORT_BREAK:
-            return self.__short_queue is None
-        elif break_type == BreakType.LONG_BREAK:
-            return self.__long_queue is None
-        else:
-            typing.assert_never(break_type)
-
-    def __next_short(self) -> Break:
-        shorts = self.__short_queue
+        return not any(tier.type == break_type for tier in self.__tiers)
+
+    def __set_current(self, brk: Break, cursor: _QueueCursor, start: int) -> None:
+        """Replace the timeline with one starting at the given break."""
+        entry = TimelineEntry(brk, self.__wait(cursor), start)
+        self.__timeline = collections.deque([(entry, cursor)])
+        self.__next_of_type = {}
+        self.__update_session()
+
+    def __update_session(self) -> None:
+        entry, cursor = self.__timeline[0]
+        brk = entry.break_obj
+        self.context.ext["break_type"] = "long" if brk.is_long_break() else "short"
+        self.context.session["break"] = brk.name
+        self.context.session["break_queue"] = {
+            "signature": self.__signature,
+            "break": [cursor.current, self.__taken_position(cursor)],
+            "now": cursor.now,
+            "current": cursor.current,
+            "index": cursor.index.tolist(),
+            "cycle": cursor.cycle.tolist(),
+            "due": cursor.due.tolist(),
+        }
+
+    def __sign(self) -> str:
+        """Return a checksum of the configured breaks, to detect a changed
+        configuration when restoring the session.
+        """
+        signature = repr(
+            [
+                (
+                    tier.type.name,
+                    tier.interval,
+                    [(brk.name, brk.time, brk.duration) for brk in tier.breaks]
+                    if isinstance(tier.breaks, tuple)
+                    # catalogs are too large to be read for the checksum
+                    else tier.breaks.checksum,
+                )
+                for tier in self.__tiers
+            ]
+        )
+        return "{:08x}".format(zlib.crc32(signature.encode("utf-8")))
 
-        if shorts is None:
-            raise Exception("this may only be called when there are short breaks")
+    def __restore(self, session: dict) -> typing.Optional[tuple[Break, _QueueCursor]]:
+        """Return the current break and the cursor saved in the session.
 
-        break_obj = shorts[self.__current_short]
-        self.context.ext["break_type"] = "short"
+        Nothing is replayed, so restoring does not depend on the number of
+        breaks taken before. Returns None if there is nothing to restore.
+        """
+        state = session.get("break_queue")
+        if isinstance(state, dict) and state.get("signature") == self.__signature:
+            try:
+                cursor = self.__new_cursor()
+                cursor.now = int(state["now"])
+                cursor.current = int(state["current"])
+                for column in ("index", "cycle", "due"):
+                    values = array.array(
+                        getattr(cursor, column).typecode, state[column]
+                    )
+                    if len(values) != len(self.__tiers):
+                        raise ValueError("wrong number of tiers")
+                    setattr(cursor, column, values)
+                for tier, index in enumerate(cursor.index):
+                    if not 0 <= index < len(self.__tiers[tier].breaks):
+                        raise ValueError("index out of range")
+                tier, index = state["break"]
+                brk = self.__tiers[tier].breaks[index]
+                if tier != cursor.current:
+                    raise ValueError("the break is not in the current tier")
+                return brk, cursor
+            except (KeyError, IndexError, TypeError, ValueError, OverflowError):
+                logging.warning("Ignoring the invalid break queue in the session")
+
+        # Sessions of older versions only have the name of the last break
+        name = session.get("break")
+        if not isinstance(name, str):
+            return None
+        for tier, tier_obj in enumerate(self.__tiers):
+            for i in range(len(tier_obj.breaks)):
+                cursor = self.__new_cursor()
+                cursor.index[tier] = i
+                cursor.current = tier
+                brk = self.__take(cursor, tier)
+                if brk.name == name:
+                    return brk, cursor
+        return None
+
+    def __new_cursor(self) -> _QueueCursor:
+        cursor = _QueueCursor(len(self.__tiers))
+        for tier in range(len(self.__tiers)):
+            cursor.due[tier] = self.__peek(cursor, tier).time
+        return cursor
+
+    def __extend_timeline(self) -> None:
+        """Compute the break after the last one in the timeline."""
+        last, cursor = self.__timeline[-1]
+        cursor = cursor.copy()
+        self.__advance(cursor)
+        brk = self.__select(cursor)
+        wait = self.__wait(cursor)
+        entry = TimelineEntry(brk, wait, self.__start_after(last, wait))
+        self.__timeline.append((entry, cursor))
+
+    def __start_after(self, previous: TimelineEntry, wait: int) -> int:
+        return (
+            previous.start
+            + self.__pre_break_warning_time
+            + previous.break_obj.duration
+            + wait * 60
+        )
 
-        # Update the index to next
-        self.__current_short = (self.__current_short + 1) % len(shorts)
+    def __wait(self, cursor: _QueueCursor) -> int:
+        """Return the minutes to wait before the selected break."""
+        # A break of another type may have been taken early
+        return max(0, cursor.due[cursor.current] - cursor.now)
+
+    def __advance(self, cursor: _QueueCursor) -> None:
+        """Update the cursor after the selected break has ended."""
+        cursor.now = max(cursor.now, cursor.due[cursor.current])
+        # The break also counts as a break of the tiers with shorter intervals
+        for tier in range(cursor.current + 1):
+            cursor.due[tier] = cursor.now + self.__peek(cursor, tier).time
+
+    def __select(
+        self, cursor: _QueueCursor, break_type: typing.Optional[BreakType] = None
+    ) -> Break:
+        """Select the next break, and move the cursor past it.
+
+        The break due first is selected, or the break due first of the given
+        type. If two breaks are due at the same time, the one in the higher
+        tier is selected, as it replaces the other one.
+        """
+        selected = -1
+        if break_type is not None:
+            for tier, tier_obj in enumerate(self.__tiers):
+                if tier_obj.type == break_type and (
+                    selected < 0 or cursor.due[tier] <= cursor.due[selected]
+                ):
+                    selected = tier
+        if selected < 0:
+            selected = 0
+            for tier in range(1, len(self.__tiers)):
+                if cursor.due[tier] <= cursor.due[selected]:
+                    selected = tier
+
+        cursor.current = selected
+        return self.__take(cursor, selected)
+
+    def __peek(self, cursor: _QueueCursor, tier: int) -> Break:
+        """Return the next break of the tier."""
+        breaks = self.__tiers[tier].breaks
+        return breaks[
+            self.__position(tier, cursor.cycle[tier], len(breaks), cursor.index[tier])
+        ]
+
+    def __take(self, cursor: _QueueCursor, tier: int) -> Break:
+        break_obj = self.__peek(cursor, tier)
+
+        # Update the index to next, and start the next cycle after the last one
+        cursor.index[tier] += 1
+        if cursor.index[tier] == len(self.__tiers[tier].breaks):
+            cursor.index[tier] = 0
+            cursor.cycle[tier] += 1
 
         return break_obj
 
-    def __next_long(self) -> Break:
-        longs = self.__long_queue
-
-        if longs is None:
-            raise Exception("this may only be called when there are long breaks")
-
-        break_obj = longs[self.__current_long]
-        self.context.ext["break_type"] = "long"
-
-        # Update the index to next
-        self.__current_long = (self.__current_long + 1) % len(longs)
-
-        return break_obj
+    def __taken_position(self, cursor: _QueueCursor) -> int:
+        """Return the position in the configured breaks of the break taken
+        last by the cursor, in its current tier.
+        """
+        tier = cursor.current
+        size = len(self.__tiers[tier].breaks)
+        index = cursor.index[tier] - 1
+        cycle = cursor.cycle[tier]
+        if index < 0:
+            # the break was the last one of the previous cycle
+            index = size - 1
+            cycle -= 1
+        return self.__position(tier, cycle, size, index)
+
+    def __position(self, tier: int, cycle: int, size: int, index: int) -> int:
+        """Return the position in the configured breaks of the tier of the
+        break at index in the given cycle.
+
+        Shuffled orders are computed from the seed, the tier and the cycle, so
+        every cycle has its own order without building a shuffled list.
+        """
+        if self.__seed is None:
+            return index
+        key = _mix(_mix(self.__seed ^ tier) ^ cycle)
+        return _permute(key, size, index)
 
     @staticmethod
     def __build_queue(
         break_type: BreakType,
+        tier: int,
         break_configs: list[dict],
         break_time: int,
         break_duration: int,
-        is_random_order: bool,
-    ) -> typing.Optional[list[Break]]:
+    ) -> typing.Optional[tuple[Break, ...]]:
         """Build a queue of breaks."""
-        size = len(break_configs)
-
-        if 0 == size:
-            # No breaks
-            return None
-
-        if is_random_order:
-            breaks_order = random.sample(break_configs, size)
-        else:
-            breaks_order = break_configs
-
-        queue: list[Break] = []
-        for break_config in breaks_order:
+        definitions = []
+        for break_config in break_configs:
             name = _(break_config["name"])
             duration = break_config.get("duration", break_duration)
             image = break_config.get("image")
@@ -343,13 +760,15 @@ class BreakQueue:
                 logging.error("Invalid break duration in: " + str(break_config))
                 continue
 
-            break_obj = Break(break_type, name, interval, duration, image, plugins)
-            queue.append(break_obj)
+            definitions.append(
+                (name, interval, duration, image, tuple(plugins) if plugins else None)
+            )
 
-        if len(queue) == 0:
+        if len(definitions) == 0:
+            # No breaks
             return None
 
-        return queue
+        return _build_breaks(break_type, tier, tuple(definitions))
 
 
 class State(Enum):
@@ -364,43 +783,337 @@ class State(Enum):
     RESTING = 6  # Resting (natural break)
 
 
+@dataclass(slots=True)
+class HandlerStats:
+    """Calls and cumulative time of a handler of an EventHook."""
+
+    name: str
+    priority: int
+    background: bool
+    calls: int = 0
+    seconds: float = 0.0
+    # number of times the handler missed the deadline
+    timeouts: int = 0
+
+
+class _Handler:
+    __slots__ = ("callback", "is_async", "order", "stats")
+
+    def __init__(
+        self,
+        callback: typing.Callable,
+        priority: int,
+        background: bool,
+        order: int,
+    ) -> None:
+        self.callback = callback
+        self.is_async = inspect.iscoroutinefunction(callback)
+        # higher priorities first, then in the order of registration
+        self.order = (-priority, order)
+        self.stats = HandlerStats(
+            getattr(callback, "__qualname__", repr(callback)),
+            priority,
+            background or self.is_async,
+        )
+
+
 class EventHook:
-    """Hook to attach and detach listeners to system events."""
+    """Hook to attach and detach listeners to system events.
+
+    Handlers are called in the order of their priority, and in the order they
+    were added within the same priority. Firing stops at the first handler
+    returning a falsy value.
+
+    Handlers added with background=True, and coroutine functions, run on a
+    thread pool instead. They are started before the other handlers and run
+    concurrently with them; their results are gathered after the other
+    handlers returned, waiting at most deadline seconds from the start of
+    fire(). A background handler missing the deadline or raising is logged
+    and does not stop the event. When a foreground handler stops the event,
+    only the background handlers which did not start yet are cancelled; the
+    others may already have run.
+    """
 
-    def __init__(self):
+    name: str
+    # seconds to wait for background handlers, None waits for them to finish
+    deadline: Optional[float]
+
+    __handlers: list[_Handler]
+    # the handlers split by where they run, rebuilt when a handler is added
+    __foreground: tuple[_Handler, ...]
+    __background: tuple[_Handler, ...]
+    __executor: Optional[concurrent.futures.ThreadPoolExecutor]
+    __lock: threading.Lock
+
+    def __init__(self, name: str = "", deadline: Optional[float] = None):
+        self.name = name
+        self.deadline = deadline
         self.__handlers = []
+        self.__foreground = ()
+        self.__background = ()
+        self.__added = 0
+        self.__executor = None
+        self.__lock = threading.Lock()
 
     def __iadd__(self, handler):
-        self.__handlers.append(handler)
+        self.add(handler)
         return self
 
     def __isub__(self, handler):
-        self.__handlers.remove(handler)
+        self.remove(handler)
         return self
 
+    def __len__(self) -> int:
+        return len(self.__handlers)
+
+    def add(
+        self, handler: typing.Callable, priority: int = 0, background: bool = False
+    ) -> None:
+        """Add a handler. Handlers with a higher priority are called first."""
+        self.__added += 1
+        handlers = list(self.__handlers)
+        bisect.insort(
+            handlers,
+            _Handler(handler, priority, background, self.__added),
+            key=lambda entry: entry.order,
+        )
+        self.__set_handlers(handlers)
+
+    def remove(self, handler: typing.Callable) -> None:
+        """Remove a handler, raising ValueError if it was not added."""
+        for i, entry in enumerate(self.__handlers):
+            if entry.callback == handler:
+                self.__set_handlers(self.__handlers[:i] + self.__handlers[i + 1 :])
+                return
+        raise ValueError("{} is not a handler of {}".format(handler, self.name))
+
+    def stats(self) -> list[HandlerStats]:
+        """Return the calls and time spent in each handler, in the order they
+        are called.
+        """
+        with self.__lock:
+            return [copy.copy(entry.stats) for entry in self.__handlers]
+
+    def shutdown(self) -> None:
+        """Stop the threads of the background handlers."""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
     def fire(self, *args, **keywargs):
         """Fire all listeners attached with."""
-        for handler in self.__handlers:
-            if not handler(*args, **keywargs):
+        if self.__background:
+            return self.__fire_with_background(args, keywargs)
+        clock = time.perf_counter
+        for entry in self.__foreground:
+            start = clock()
+            result = entry.callback(*args, **keywargs)
+            self.__record(entry, clock() - start)
+            if not result:
                 return False
         return True
 
+    def __fire_with_background(self, args: tuple, keywargs: dict) -> bool:
+        fired = time.perf_counter()
+        pending = [
+            (entry, self.__submit(entry, args, keywargs)) for entry in self.__background
+        ]
+
+        proceed = True
+        for entry in self.__foreground:
+            start = time.perf_counter()
+            result = entry.callback(*args, **keywargs)
+            self.__record(entry, time.perf_counter() - start)
+            if not result:
+                proceed = False
+                break
+
+        for entry, future in pending:
+            if not proceed:
+                future.cancel()
+                continue
+            timeout = None
+            if self.deadline is not None:
+                timeout = max(0.0, self.deadline - (time.perf_counter() - fired))
+            try:
+                if not future.result(timeout):
+                    proceed = False
+            except concurrent.futures.TimeoutError:
+                with self.__lock:
+                    entry.stats.timeouts += 1
+                logging.warning(
+                    "%s of %s missed the deadline", entry.stats.name, self.name
+                )
+            except Exception:
+                logging.exception("Error in %s of %s", entry.stats.name, self.name)
+        return proceed
+
+    def __set_handlers(self, handlers: list[_Handler]) -> None:
+        # fire() may be iterating over the old handlers, so they are replaced
+        # instead of changed
+        self.__handlers = handlers
+        self.__foreground = tuple(
+            entry for entry in handlers if not entry.stats.background
+        )
+        self.__background = tuple(entry for entry in handlers if entry.stats.background)
+
+    def __submit(
+        self, entry: _Handler, args: tuple, keywargs: dict
+    ) -> concurrent.futures.Future:
+        if self.__executor is None:
+            self.__executor = concurrent.futures.ThreadPoolExecutor(
+                thread_name_prefix="EventHook {}".format(self.name)
+            )
+
+        def call() -> typing.Any:
+            start = time.perf_counter()
+            try:
+                if entry.is_async:
+                    return asyncio.run(entry.callback(*args, **keywargs))
+                return entry.callback(*args, **keywargs)
+            finally:
+                self.__record(entry, time.perf_counter() - start)
+
+        return self.__executor.submit(call)
+
+    def __record(self, entry: _Handler, seconds: float) -> None:
+        with self.__lock:
+            entry.stats.calls += 1
+            entry.stats.seconds += seconds
+
+
+def _migrate_6_1_0(
+    user_config: dict[str, typing.Any], system_config: dict[str, typing.Any]
+) -> None:
+    """Add the settings of the monotonic scheduler, the plugin hook watchdog,
+    the deadline of async and isolated plugin hooks, the break tiers and the
+    break catalog.
+    """
+    for key in (
+        "monotonic_scheduler",
+        "plugin_hook_budget",
+        "demote_slow_plugin_hooks",
+        "plugin_hook_deadline",
+        "break_tiers",
+        "break_catalog",
+    ):
+        user_config.setdefault(key, copy.deepcopy(system_config[key]))
+
+
+# The oldest user config version which can be migrated. Older ones are merged
+# into a copy of the system config instead.
+MIGRATIONS_SINCE = "6.0.4"
+
+# (version, migration) in the order of the versions. A migration changes the
+# user config of the previous version in place into the given version, and
+# only touches the keys which changed. Keys missing in the user config fall
+# back to the system config, so adding a key needs no migration unless the
+# key should show up in the saved file. To reset a key for everyone, delete
+# it from the user config in a migration.
+MIGRATIONS: list[
+    tuple[str, typing.Callable[[dict[str, typing.Any], dict[str, typing.Any]], None]]
+] = [
+    ("6.1.0", _migrate_6_1_0),
+]
+
+
+def _migrate(
+    user_config: dict[str, typing.Any], system_config: dict[str, typing.Any]
+) -> bool:
+    """Run the migrations from the version of the user config up to the
+    version of the system config.
+
+    Returns False if there is no migration path, i.e. if the user config is
+    older than MIGRATIONS_SINCE or newer than the system config.
+    """
+    version = parse(str(user_config["meta"].get("config_version", "0.0.0")))
+    target = parse(system_config["meta"]["config_version"])
+    if not parse(MIGRATIONS_SINCE) <= version <= target:
+        return False
+    for step_version, migration in MIGRATIONS:
+        if version < parse(step_version) <= target:
+            logging.info("Migrate the configuration to %s", step_version)
+            migration(user_config, system_config)
+    user_config["meta"] = copy.deepcopy(system_config["meta"])
+    return True
+
+
+def _type_check(default: typing.Any) -> typing.Callable[[typing.Any], bool]:
+    """Return a check whether a value has the type of the default value."""
+    if default is None:
+        return lambda value: True
+    if isinstance(default, bool):
+        return lambda value: isinstance(value, bool)
+    if isinstance(default, (int, float)):
+        return lambda value: isinstance(value, (int, float)) and not isinstance(
+            value, bool
+        )
+    expected = type(default)
+    return lambda value: isinstance(value, expected)
+
+
+def _compile_schema(
+    system_config: dict[str, typing.Any],
+) -> dict[str, typing.Callable[[typing.Any], bool]]:
+    """Compile the checks of the top-level keys from the system config, which
+    holds the default of every key.
+    """
+    return {
+        key: _type_check(default)
+        for key, default in system_config.items()
+        if key != "meta"
+    }
+
+
+def _validate(
+    user_config: dict[str, typing.Any], system_config: dict[str, typing.Any]
+) -> None:
+    """Replace values of the wrong type with their defaults."""
+    for key, check in _compile_schema(system_config).items():
+        if key in user_config and not check(user_config[key]):
+            logging.warning(
+                "Invalid value of %s in the configuration, using the default", key
+            )
+            user_config[key] = copy.deepcopy(system_config[key])
+
 
 class Config:
-    """The configuration of Safe Eyes."""
+    """The configuration of Safe Eyes.
+
+    Values are looked up in the runtime overrides, which are never saved,
+    then in the user configuration, and finally in the system defaults.
 
+    Values are returned as they are, and must not be changed in place: set a
+    changed copy, or get the value with edit() first.
+    """
+
+    # clones share their layers until there are more of them
+    MAX_LAYERS = 8
+
+    # values set by this configuration
     __user_config: dict[str, typing.Any]
+    # user configuration shared with clones, newest first, which is never
+    # changed
+    __layers: tuple[dict[str, typing.Any], ...]
     __system_config: dict[str, typing.Any]
+    __runtime: dict[str, typing.Any]
+    # number of times each key was set
+    __versions: dict[str, int]
+    __subscribers: dict[str, list[typing.Callable[[str, typing.Any], None]]]
 
     @classmethod
     def load(cls) -> "Config":
+        """Load the user config, merged with the system config and the
+        plugins.
+
+        Merging and validating is skipped if none of the files changed since
+        the last time, and the user config is only written if the merge
+        changed it.
+        """
+        stamp = utility.config_stamp()
         # Read the config files
         user_config = utility.load_json(utility.CONFIG_FILE_PATH)
         system_config = utility.load_json(utility.SYSTEM_CONFIG_FILE_PATH)
-        # If there any breaking changes in long_breaks, short_breaks or any other keys,
-        # use the force_upgrade_keys list
-        force_upgrade_keys: list[str] = []
-        # force_upgrade_keys = ['long_breaks', 'short_breaks']
 
         # if create_startup_entry finds a broken autostart symlink, it will repair
         # it
@@ -411,7 +1124,11 @@ class Config:
             cfg = cls(user_config, system_config)
             cfg.save()
             return cfg
+        elif stamp == utility.load_json(utility.CONFIG_STAMP_PATH):
+            # Merged and validated when it was written
+            return cls(user_config, system_config)
         else:
+            loaded_config = copy.deepcopy(user_config)
             system_config_version = system_config["meta"]["config_version"]
             meta_obj = user_config.get("meta", None)
             if meta_obj is None:
@@ -419,18 +1136,21 @@ class Config:
                 user_config = copy.deepcopy(system_config)
             else:
                 user_config_version = str(meta_obj.get("config_version", "0.0.0"))
-                if parse(user_config_version) != parse(system_config_version):
-                    # Update the user config
+                if parse(user_config_version) != parse(
+                    system_config_version
+                ) and not _migrate(user_config, system_config):
+                    # Too old or too new to migrate, start from the system config
                     new_user_config = copy.deepcopy(system_config)
-                    cls.__merge_dictionary(
-                        user_config, new_user_config, force_upgrade_keys
-                    )
+                    cls.__merge_dictionary(user_config, new_user_config)
                     user_config = new_user_config
 
+        _validate(user_config, system_config)
         utility.merge_plugins(user_config)
 
         cfg = cls(user_config, system_config)
-        cfg.save()
+        if user_config != loaded_config:
+            cfg.save()
+        utility.write_json(utility.CONFIG_STAMP_PATH, utility.config_stamp())
         return cfg
 
     def __init__(
@@ -438,14 +1158,18 @@ class Config:
         user_config: dict[str, typing.Any],
         system_config: dict[str, typing.Any],
     ):
-        self.__user_config = user_config
         self.__system_config = system_config
+        self.__layers = ()
+        self.__user_config = user_config
+        self.__runtime = {}
+        self.__versions = {}
+        self.__subscribers = {}
 
     @classmethod
-    def __merge_dictionary(cls, old_dict, new_dict, force_upgrade_keys: list[str]):
+    def __merge_dictionary(cls, old_dict, new_dict):
         """Merge the dictionaries."""
         for key in new_dict:
-            if key == "meta" or key in force_upgrade_keys:
+            if key == "meta":
                 continue
             if key in old_dict:
                 new_value = new_dict[key]
@@ -453,43 +1177,160 @@ class Config:
                 if type(new_value) is type(old_value):
                     # Both properties have same type
                     if isinstance(new_value, dict):
-                        cls.__merge_dictionary(old_value, new_value, force_upgrade_keys)
+                        cls.__merge_dictionary(old_value, new_value)
                     else:
                         new_dict[key] = old_value
 
     def clone(self) -> "Config":
-        config = Config(
-            user_config=copy.deepcopy(self.__user_config),
-            system_config=self.__system_config,
-        )
+        """Return a copy of the configuration, without copying any value.
+
+        The values set so far become a layer shared by both configurations,
+        and either side only sets values in a layer of its own. Subscriptions
+        are not copied.
+        """
+        if self.__user_config:
+            self.__layers = (self.__user_config,) + self.__layers
+            self.__user_config = {}
+            if len(self.__layers) > Config.MAX_LAYERS:
+                self.__layers = (self.__merged(),)
+        config = Config(user_config={}, system_config=self.__system_config)
+        config.__layers = self.__layers
+        config.__runtime = dict(self.__runtime)
+        config.__versions = dict(self.__versions)
         return config
 
     def save(self) -> None:
-        """Save the configuration to file."""
-        utility.write_json(utility.CONFIG_FILE_PATH, self.__user_config)
+        """Save the configuration to file, without the runtime overrides."""
+        utility.write_json(utility.CONFIG_FILE_PATH, self.__merged())
 
     def get(self, key, default_value=None):
         """Get the value."""
-        value = self.__user_config.get(key, default_value)
+        if self.__runtime and key in self.__runtime:
+            value = self.__runtime[key]
+        elif key in self.__user_config:
+            value = self.__user_config[key]
+        else:
+            value = default_value
+            for layer in self.__layers:
+                if key in layer:
+                    value = layer[key]
+                    break
         if value is None:
             value = self.__system_config.get(key, None)
         return value
 
+    def edit(self, key):
+        """Get the value of the key, which may be changed in place.
+
+        A value shared with other configurations is copied the first time.
+        """
+        if key not in self.__user_config:
+            value = self.__value(key, runtime=False)
+            if value is None:
+                value = self.__system_config.get(key, None)
+            self.__user_config[key] = copy.deepcopy(value)
+        return self.__user_config[key]
+
     def set(self, key, value):
         """Set the value."""
         self.__user_config[key] = value
+        self.__changed(key, value)
+
+    def override(self, key, value) -> None:
+        """Set the value until Safe Eyes quits, without saving it.
+
+        A value of None removes the override.
+        """
+        if value is None:
+            self.__runtime.pop(key, None)
+            value = self.get(key)
+        else:
+            self.__runtime[key] = value
+        self.__changed(key, value)
+
+    def version(self, key) -> int:
+        """Return the number of times the value was set, by this configuration
+        or the one it was cloned from.
+        """
+        return self.__versions.get(key, 0)
+
+    def subscribe(self, key, callback: typing.Callable[[str, typing.Any], None]):
+        """Call callback(key, value) whenever the value of the key is set."""
+        self.__subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, key, callback: typing.Callable[[str, typing.Any], None]):
+        self.__subscribers[key].remove(callback)
+
+    def take_over(self, config: "Config", changed_keys: typing.Iterable[str]) -> None:
+        """Take over the subscriptions of the configuration this one replaces,
+        and call them for the keys which changed.
+        """
+        if config is self:
+            return
+        for key, callbacks in config.__subscribers.items():
+            self.__subscribers.setdefault(key, []).extend(callbacks)
+        for key in changed_keys:
+            value = self.get(key)
+            for callback in list(self.__subscribers.get(key, ())):
+                callback(key, value)
+
+    def diff(self, config: "Config") -> frozenset[str]:
+        """Return the keys whose values differ from the given configuration.
+
+        Layers shared since cloning are not compared, so comparing a clone
+        with its origin only compares the values which either side set.
+        """
+        shared = 0
+        while (
+            shared < min(len(self.__layers), len(config.__layers))
+            and self.__layers[-1 - shared] is config.__layers[-1 - shared]
+        ):
+            shared += 1
+        keys = set(self.__user_config) | set(config.__user_config)
+        keys |= set(self.__runtime) | set(config.__runtime)
+        for layer in self.__layers[: len(self.__layers) - shared]:
+            keys |= set(layer)
+        for layer in config.__layers[: len(config.__layers) - shared]:
+            keys |= set(layer)
+        return frozenset(
+            key for key in keys if self.__value(key) != config.__value(key)
+        )
+
+    def __value(self, key, runtime: bool = True) -> typing.Any:
+        """Return the user value of the key."""
+        if runtime and key in self.__runtime:
+            return self.__runtime[key]
+        if key in self.__user_config:
+            return self.__user_config[key]
+        for layer in self.__layers:
+            if key in layer:
+                return layer[key]
+        return None
+
+    def __merged(self) -> dict[str, typing.Any]:
+        """Return the user configuration of all layers."""
+        merged: dict[str, typing.Any] = {}
+        for layer in reversed(self.__layers):
+            merged.update(layer)
+        merged.update(self.__user_config)
+        return merged
+
+    def __changed(self, key, value) -> None:
+        self.__versions[key] = self.__versions.get(key, 0) + 1
+        for callback in list(self.__subscribers.get(key, ())):
+            callback(key, value)
 
     def __eq__(self, config):
-        return self.__user_config == config.__user_config
+        return not self.diff(config)
 
     def __ne__(self, config):
-        return self.__user_config != config.__user_config
+        return bool(self.diff(config))
 
 
 class TrayAction:
     """Data object wrapping name, icon and action."""
 
-    __toolbar_buttons: list[Gtk.Button]
+    __toolbar_buttons: list["Gtk.Button"]
 
     def __init__(
         self,
@@ -506,7 +1347,9 @@ class TrayAction:
         self.__toolbar_buttons = []
         self.single_use = single_use
 
-    def get_icon(self) -> Gtk.Image:
+    def get_icon(self) -> "Gtk.Image":
+        from gi.repository import Gtk
+
         if not self.system_icon:
             image = utility.load_and_scale_image(self.__icon, 16, 16)
             if image is not None:
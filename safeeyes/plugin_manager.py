@@ -41,7 +41,8 @@ The plugin.py can have following lifecycle methods but all are optional:
  - on_stop_break()
     Executes when a break stops
  - on_countdown(countdown, seconds)
-    Executes every second throughout a break
+    Executes every second throughout a break, or every "countdown_interval"
+    seconds if the config.json sets it. It is always called for the last second
  - update_next_break(break_obj, break_time)
     Executes when the next break changes
  - enable()
@@ -62,13 +63,47 @@ The plugin.py can additionally have the following methods:
 This method is unused:
  - description()
     If a custom description has to be displayed, use this function
+
+If the config.json lists the implemented methods, except for init, enable and
+disable, in "hooks", plugin.py is only imported when one of them is called for
+the first time, and init is delayed until then. on_stop and on_exit do not
+import the plugin. Plugins without "hooks" and required plugins are imported
+when they are loaded.
+
+All methods run on the main loop. A method running longer than the
+"plugin_hook_budget" (in milliseconds) is logged. With
+"demote_slow_plugin_hooks", a lifecycle method whose return value is not used
+runs on a background thread of the plugin after it exceeded the budget
+SLOW_HOOK_LIMIT times; such plugins must not touch GTK from that method.
+
+A plugin whose entry in the "plugins" setting sets "isolation" to "thread" or
+"process" is hosted by a worker instead, see plugin_worker.
+
+The hooks, but not init, enable and disable, may be defined with "async def".
+Their coroutines are started on an event loop in a background thread before
+the other plugins are called, so that plugins waiting for I/O overlap. The
+results which are used are waited for at most "plugin_hook_deadline"
+milliseconds; late coroutines are cancelled and count as None. Like a plugin
+returning True from on_pre_break or on_start_break skips the remaining
+plugins, it cancels the remaining coroutines. The results of BACKGROUND_HOOKS
+are not waited for. Coroutines must not touch GTK.
 """
 
+import asyncio
+import concurrent.futures
+import copy
+import functools
 import importlib
+import inspect
+import itertools
 import logging
 import os
 import sys
+import threading
+import time
+import typing
 
+from safeeyes import plugin_worker
 from safeeyes import utility
 from safeeyes.model import Break, PluginDependency, RequiredPluginException, TrayAction
 
@@ -77,13 +112,300 @@ sys.path.append(os.path.abspath(utility.USER_PLUGINS_DIR))
 
 HORIZONTAL_LINE_LENGTH = 64
 
+# number of times a method may exceed the budget before it is demoted
+SLOW_HOOK_LIMIT = 3
+
+# milliseconds to wait for the results of async hooks if plugin_hook_deadline
+# is not set
+DEFAULT_HOOK_DEADLINE = 250
+
+# seconds to wait for running async hooks, e.g. on_exit, before quitting
+EXIT_TIMEOUT = 2
+
+# number of arguments of the methods a plugin may implement
+PLUGIN_METHODS = {
+    "init": 3,
+    "enable": 0,
+    "disable": 0,
+    "on_start": 0,
+    "on_stop": 0,
+    "on_exit": 0,
+    "on_pre_break": 1,
+    "on_start_break": 1,
+    "on_stop_break": 0,
+    "on_countdown": 2,
+    "update_next_break": 2,
+    "get_widget_title": 1,
+    "get_widget_content": 1,
+    "get_tray_action": 1,
+}
+
+# methods which are not hooks, and can't be declared in config.json
+LIFECYCLE_METHODS = {"init", "enable", "disable"}
+
+# hooks which do not import a plugin on demand, as there is nothing to clean up
+# before it was imported
+CLEANUP_HOOKS = {"on_stop", "on_exit"}
+
+# hooks which are also called for plugins enabled by the break itself
+BREAK_HOOKS = {
+    "on_pre_break",
+    "on_start_break",
+    "update_next_break",
+    "get_widget_title",
+    "get_widget_content",
+    "get_tray_action",
+}
+
+# hooks whose return value is used, so isolated plugins are waited for
+RESULT_HOOKS = {
+    "on_pre_break",
+    "on_start_break",
+    "get_widget_title",
+    "get_widget_content",
+    "get_tray_action",
+}
+
+# methods whose return value is not used, so they can run in the background
+BACKGROUND_HOOKS = {
+    "on_start",
+    "on_stop",
+    "on_stop_break",
+    "on_countdown",
+    "update_next_break",
+}
+
+
+class HookWatchdog:
+    """Measures the time plugin methods block the main loop.
+
+    Methods exceeding the budget are logged with the plugin and the method. If
+    demotion is enabled, repeat offenders from BACKGROUND_HOOKS are moved to a
+    single background thread per plugin, which keeps their calls in order.
+    """
+
+    budget: float
+    demote: bool
+
+    # (plugin id, method name) -> number of calls over the budget
+    __overruns: dict[tuple[str, str], int]
+    __demoted: set[tuple[str, str]]
+    __workers: dict[str, concurrent.futures.ThreadPoolExecutor]
+
+    def __init__(self, budget_ms: int, demote: bool = False) -> None:
+        self.budget = budget_ms / 1000
+        self.demote = demote
+        self.__overruns = {}
+        self.__demoted = set()
+        self.__workers = {}
+
+    def call(
+        self, plugin_id: str, method_name: str, method: typing.Callable, *args, **kwargs
+    ) -> typing.Any:
+        """Call the method of the plugin, and check how long it took."""
+        key = (plugin_id, method_name)
+        if key in self.__demoted:
+            self.__call_in_background(plugin_id, method_name, method, args, kwargs)
+            return None
+
+        start = time.monotonic()
+        result = method(*args, **kwargs)
+        duration = time.monotonic() - start
+
+        if self.budget > 0 and duration > self.budget:
+            self.__overrun(key, duration)
+        return result
+
+    def overruns(self, plugin_id: str, method_name: str) -> int:
+        """Return how often the method exceeded the budget."""
+        return self.__overruns.get((plugin_id, method_name), 0)
+
+    def is_demoted(self, plugin_id: str, method_name: str) -> bool:
+        return (plugin_id, method_name) in self.__demoted
+
+    def shutdown(self) -> None:
+        """Stop the background threads once their pending calls are done."""
+        for worker in self.__workers.values():
+            worker.shutdown(wait=False)
+        self.__workers.clear()
+        self.__demoted.clear()
+
+    def __overrun(self, key: tuple[str, str], duration: float) -> None:
+        (plugin_id, method_name) = key
+        count = self.__overruns.get(key, 0) + 1
+        self.__overruns[key] = count
+        logging.warning(
+            "Plugin %s blocked the main loop for %dms in %s (budget %dms)",
+            plugin_id,
+            duration * 1000,
+            method_name,
+            self.budget * 1000,
+        )
+        if self.demote and method_name in BACKGROUND_HOOKS and count >= SLOW_HOOK_LIMIT:
+            logging.warning(
+                "Running %s of plugin %s in the background from now on",
+                method_name,
+                plugin_id,
+            )
+            self.__demoted.add(key)
+
+    def __call_in_background(
+        self,
+        plugin_id: str,
+        method_name: str,
+        method: typing.Callable,
+        args: tuple,
+        kwargs: dict,
+    ) -> None:
+        worker = self.__workers.get(plugin_id)
+        if worker is None:
+            worker = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="Plugin " + plugin_id
+            )
+            self.__workers[plugin_id] = worker
+
+        def log_error(future: concurrent.futures.Future) -> None:
+            error = future.exception()
+            if error is not None:
+                logging.error(
+                    "Error in %s of plugin %s: %s", method_name, plugin_id, error
+                )
+
+        worker.submit(method, *args, **kwargs).add_done_callback(log_error)
+
+
+class CoroutineRunner:
+    """Runs the coroutines of async plugin methods concurrently, on an event
+    loop in a thread of its own which is started when it is first needed.
+    """
+
+    __loop: typing.Optional[asyncio.AbstractEventLoop] = None
+    # futures of the coroutines which did not finish yet
+    __pending: set[concurrent.futures.Future]
+    __lock: threading.Lock
+
+    def __init__(self) -> None:
+        self.__pending = set()
+        self.__lock = threading.Lock()
+
+    def submit(
+        self, plugin_id: str, method_name: str, coroutine: typing.Coroutine
+    ) -> concurrent.futures.Future:
+        """Start the coroutine, and return the future of its result.
+
+        Errors are logged.
+        """
+        if self.__loop is None:
+            self.__loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=self.__loop.run_forever, name="PluginLoop", daemon=True
+            ).start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.__loop)
+        with self.__lock:
+            self.__pending.add(future)
+        future.add_done_callback(self.__done)
+        future.add_done_callback(
+            functools.partial(self.__log_error, plugin_id, method_name)
+        )
+        return future
+
+    def completed(
+        self, futures: typing.Iterable[concurrent.futures.Future], timeout: float
+    ) -> typing.Iterator[concurrent.futures.Future]:
+        """Yield the futures which completed successfully within the timeout,
+        as they complete.
+
+        The other futures are cancelled once the timeout passed, or when the
+        caller stops early.
+        """
+        futures = list(futures)
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout):
+                if not future.cancelled() and future.exception() is None:
+                    yield future
+        except concurrent.futures.TimeoutError:
+            logging.warning(
+                "%d async plugin hooks did not return within %dms",
+                sum(not future.done() for future in futures),
+                timeout * 1000,
+            )
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def drain(self, timeout: float) -> None:
+        """Wait at most timeout seconds for the running coroutines to finish."""
+        with self.__lock:
+            pending = list(self.__pending)
+        if not pending:
+            return
+        _, not_done = concurrent.futures.wait(pending, timeout)
+        if not_done:
+            logging.warning(
+                "%d async plugin hooks did not finish within %ds",
+                len(not_done),
+                timeout,
+            )
+
+    def shutdown(self) -> None:
+        """Cancel the running coroutines and stop the event loop."""
+        if self.__loop is not None:
+            self.__loop.call_soon_threadsafe(self.__stop, self.__loop)
+            self.__loop = None
+
+    @staticmethod
+    def __stop(loop: asyncio.AbstractEventLoop) -> None:
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        # after the tasks handled the cancellation
+        loop.call_soon(loop.stop)
+
+    def __done(self, future: concurrent.futures.Future) -> None:
+        with self.__lock:
+            self.__pending.discard(future)
+
+    @staticmethod
+    def __log_error(
+        plugin_id: str, method_name: str, future: concurrent.futures.Future
+    ) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(
+                "Error in %s of plugin %s: %s",
+                method_name,
+                plugin_id,
+                future.exception(),
+            )
+
 
 class PluginManager:
     """Imports the Safe Eyes plugins and calls the methods defined in those plugins."""
 
+    # settings read by the PluginManager itself
+    CONFIG_KEYS = frozenset(
+        [
+            "plugins",
+            "plugin_hook_budget",
+            "demote_slow_plugin_hooks",
+            "plugin_hook_deadline",
+        ]
+    )
+
+    # hook name -> (plugin, method) of the plugins implementing the hook
+    __dispatch: dict[str, list[tuple["LoadedPlugin", typing.Callable]]]
+    # the same for the plugins implementing the hook with an async method
+    __async_dispatch: dict[str, list[tuple["LoadedPlugin", typing.Callable]]]
+    # seconds to wait for the results of async hooks
+    __deadline: float = DEFAULT_HOOK_DEADLINE / 1000
+
     def __init__(self):
         logging.info("Load all the plugins")
         self.__plugins = {}
+        # plugin id -> entry of the plugin in the settings, when it was loaded
+        self.__entries = {}
+        self.__dispatch = {}
+        self.__async_dispatch = {}
+        self.__watchdog = HookWatchdog(0)
+        self.__runner = CoroutineRunner()
         self.last_break = None
         self.horizontal_line = "─" * HORIZONTAL_LINE_LENGTH
 
@@ -91,28 +413,248 @@ class PluginManager:
         """Initialize all the plugins with init(context, safe_eyes_config,
         plugin_config) function.
         """
+        self.__watchdog.shutdown()
+        self.__watchdog = HookWatchdog(
+            config.get("plugin_hook_budget") or 0,
+            bool(config.get("demote_slow_plugin_hooks")),
+        )
+        self.__set_deadline(config)
         # Load the plugins
+        self.__check_dependencies(config.get("plugins"))
         for plugin in config.get("plugins"):
-            try:
-                loaded_plugin = LoadedPlugin(plugin)
-                self.__plugins[loaded_plugin.id] = loaded_plugin
-            except RequiredPluginException as e:
-                raise e
-            except BaseException as e:
-                traceback_wanted = (
-                    logging.getLogger().getEffectiveLevel() == logging.DEBUG
-                )
-                if traceback_wanted:
-                    import traceback
-
-                    traceback.print_exc()
-                logging.error("Error in loading the plugin %s: %s", plugin["id"], e)
-                continue
+            self.__load_plugin(plugin)
         # Initialize the plugins
         for plugin in self.__plugins.values():
+            plugin.watchdog = self.__watchdog
             plugin.init_plugin(context, config)
+        self.__update_dispatch()
         return True
 
+    def reload(self, context, config, changed_keys, running=False):
+        """Apply changed settings, touching only the affected plugins.
+
+        Plugins whose entry in the settings changed are reloaded and added
+        plugins are loaded; unchanged plugins are not imported again. If any
+        other setting changed, all plugins are initialized again, as they may
+        read any setting. If running is set, the affected plugins are stopped
+        before and started after.
+        """
+        if changed_keys & {"plugin_hook_budget", "demote_slow_plugin_hooks"}:
+            self.__watchdog.shutdown()
+            self.__watchdog = HookWatchdog(
+                config.get("plugin_hook_budget") or 0,
+                bool(config.get("demote_slow_plugin_hooks")),
+            )
+            for loaded_plugin in self.__plugins.values():
+                loaded_plugin.watchdog = self.__watchdog
+        if "plugin_hook_deadline" in changed_keys:
+            self.__set_deadline(config)
+
+        reinit_all = bool(changed_keys - self.CONFIG_KEYS)
+        if reinit_all and running:
+            self.stop()
+
+        affected = []
+        if "plugins" in changed_keys:
+            entries = {plugin["id"]: plugin for plugin in config.get("plugins")}
+            for plugin_id in list(self.__plugins):
+                if plugin_id not in entries:
+                    logging.info("Unload the plugin %s", plugin_id)
+                    loaded_plugin = self.__plugins.pop(plugin_id)
+                    del self.__entries[plugin_id]
+                    if running and not reinit_all:
+                        self.__call_plugin(loaded_plugin, "on_stop")
+                    loaded_plugin.disable()
+                    loaded_plugin.shutdown()
+            for plugin_id, plugin in entries.items():
+                loaded_plugin = self.__plugins.get(plugin_id)
+                if loaded_plugin is None:
+                    loaded_plugin = self.__load_plugin(plugin)
+                    if loaded_plugin is not None:
+                        loaded_plugin.watchdog = self.__watchdog
+                        affected.append(loaded_plugin)
+                elif self.__entries[plugin_id] != plugin:
+                    logging.info("Reload the plugin %s", plugin_id)
+                    if running and not reinit_all:
+                        self.__call_plugin(loaded_plugin, "on_stop")
+                    if loaded_plugin.isolation != plugin.get("isolation"):
+                        # the plugin moves to another worker, import it again
+                        loaded_plugin.disable()
+                        loaded_plugin.shutdown()
+                        del self.__plugins[plugin_id]
+                        del self.__entries[plugin_id]
+                        loaded_plugin = self.__load_plugin(plugin)
+                        if loaded_plugin is None:
+                            continue
+                        loaded_plugin.watchdog = self.__watchdog
+                    else:
+                        loaded_plugin.reload_config(plugin)
+                        self.__entries[plugin_id] = copy.deepcopy(plugin)
+                    affected.append(loaded_plugin)
+
+        if reinit_all:
+            affected = list(self.__plugins.values())
+        for loaded_plugin in affected:
+            loaded_plugin.init_plugin(context, config)
+        if running:
+            for loaded_plugin in affected:
+                self.__call_plugin(loaded_plugin, "on_start")
+        self.__update_dispatch()
+
+    def __set_deadline(self, config) -> None:
+        deadline = config.get("plugin_hook_deadline")
+        if deadline is None:
+            deadline = DEFAULT_HOOK_DEADLINE
+        self.__deadline = deadline / 1000
+
+    def __check_dependencies(self, plugins) -> None:
+        """Check the dependencies of the plugins concurrently, so that loading
+        them one by one finds the results in the cache.
+        """
+        checks = []
+        for plugin in plugins:
+            try:
+                (plugin_config, plugin_dir) = LoadedPlugin._load_config_json(
+                    plugin["id"]
+                )
+            except BaseException:
+                # reported when the plugin is loaded
+                continue
+            if plugin["enabled"] or plugin_config.get("break_override_allowed"):
+                checks.append(
+                    (
+                        plugin["id"],
+                        plugin_config,
+                        plugin.get("settings", {}),
+                        os.path.join(plugin_dir, plugin["id"]),
+                    )
+                )
+        try:
+            utility.check_plugins_dependencies(checks)
+        except BaseException:
+            # failed checks are not cached and fail again in LoadedPlugin
+            pass
+
+    def __load_plugin(self, plugin) -> typing.Optional["LoadedPlugin"]:
+        try:
+            loaded_plugin = LoadedPlugin(plugin)
+        except RequiredPluginException as e:
+            raise e
+        except BaseException as e:
+            traceback_wanted = logging.getLogger().getEffectiveLevel() == logging.DEBUG
+            if traceback_wanted:
+                import traceback
+
+                traceback.print_exc()
+            logging.error("Error in loading the plugin %s: %s", plugin["id"], e)
+            return None
+        loaded_plugin.on_import = self.__update_dispatch
+        self.__plugins[loaded_plugin.id] = loaded_plugin
+        self.__entries[loaded_plugin.id] = copy.deepcopy(plugin)
+        return loaded_plugin
+
+    def __update_dispatch(self) -> None:
+        """Collect the plugins implementing each hook, so that calling a hook
+        does not need to look at the other plugins.
+
+        This must be called whenever plugins are loaded, enabled, disabled or
+        reloaded.
+        """
+        dispatch: dict[str, list[tuple[LoadedPlugin, typing.Callable]]] = {}
+        async_dispatch: dict[str, list[tuple[LoadedPlugin, typing.Callable]]] = {}
+        for plugin in self.__plugins.values():
+            if plugin.errored:
+                continue
+            for method_name, method in plugin.methods.items():
+                if plugin.enabled or (
+                    plugin.break_override_allowed and method_name in BREAK_HOOKS
+                ):
+                    if inspect.iscoroutinefunction(method):
+                        table = async_dispatch
+                    else:
+                        table = dispatch
+                    table.setdefault(method_name, []).append((plugin, method))
+        self.__dispatch = dispatch
+        self.__async_dispatch = async_dispatch
+
+    def __call(self, method_name: str, *args) -> typing.Iterator[typing.Any]:
+        """Call the hook of every plugin implementing it, and yield the
+        results.
+        """
+        futures = [
+            self.__runner.submit(plugin.id, method_name, method(*args))
+            for plugin, method in self.__async_dispatch.get(method_name, ())
+        ]
+        watchdog = self.__watchdog
+        try:
+            for plugin, method in self.__dispatch.get(method_name, ()):
+                result = watchdog.call(plugin.id, method_name, method, *args)
+                if inspect.iscoroutine(result):
+                    result = self.__await(plugin, method_name, result)
+                yield result
+        except GeneratorExit:
+            # the hook was decided by a result
+            for future in futures:
+                future.cancel()
+            raise
+        # exit() waits for on_exit itself, longer than the deadline
+        if futures and method_name not in BACKGROUND_HOOKS and method_name != "on_exit":
+            for future in self.__runner.completed(futures, self.__deadline):
+                yield future.result()
+
+    def __call_break_obj(
+        self, method_name: str, break_obj: Break, *args
+    ) -> typing.Iterator[typing.Any]:
+        """Call the hook of every plugin implementing it and enabled for the
+        break, and yield the results.
+        """
+        futures = [
+            self.__runner.submit(plugin.id, method_name, method(break_obj, *args))
+            for plugin, method in self.__async_dispatch.get(method_name, ())
+            if not plugin.break_override_allowed
+            or break_obj.plugin_enabled(plugin.id, plugin.enabled)
+        ]
+        watchdog = self.__watchdog
+        try:
+            for plugin, method in self.__dispatch.get(method_name, ()):
+                if plugin.break_override_allowed and not break_obj.plugin_enabled(
+                    plugin.id, plugin.enabled
+                ):
+                    continue
+                result = watchdog.call(plugin.id, method_name, method, break_obj, *args)
+                if inspect.iscoroutine(result):
+                    result = self.__await(plugin, method_name, result)
+                yield result
+        except GeneratorExit:
+            # the hook was decided by a result
+            for future in futures:
+                future.cancel()
+            raise
+        if futures and method_name not in BACKGROUND_HOOKS:
+            for future in self.__runner.completed(futures, self.__deadline):
+                yield future.result()
+
+    def __await(
+        self, plugin, method_name: str, coroutine: typing.Coroutine
+    ) -> typing.Any:
+        """Return the result of an async method which was called through
+        _import_on_demand, before the dispatch knew that it is async.
+        """
+        future = self.__runner.submit(plugin.id, method_name, coroutine)
+        if method_name in BACKGROUND_HOOKS:
+            return None
+        for done in self.__runner.completed([future], self.__deadline):
+            return done.result()
+        return None
+
+    def __call_plugin(self, plugin, method_name: str) -> None:
+        """Call a method of a single plugin, without waiting for async
+        methods.
+        """
+        result = plugin.call_plugin_method(method_name)
+        if inspect.iscoroutine(result):
+            self.__runner.submit(plugin.id, method_name, result)
+
     def needs_retry(self):
         return self.get_retryable_error() is not None
 
@@ -137,57 +679,67 @@ class PluginManager:
                     and plugin.last_error.retryable
                 ):
                     plugin.reload_errored()
+        self.__update_dispatch()
 
     def start(self):
         """Execute the on_start() function of plugins."""
-        for plugin in self.__plugins.values():
-            plugin.call_plugin_method("on_start")
+        for _ in self.__call("on_start"):
+            pass
         return True
 
     def stop(self):
         """Execute the on_stop() function of plugins."""
-        for plugin in self.__plugins.values():
-            plugin.call_plugin_method("on_stop")
+        for _ in self.__call("on_stop"):
+            pass
         return True
 
     def exit(self):
         """Execute the on_exit() function of plugins."""
+        for _ in self.__call("on_exit"):
+            pass
+        self.__watchdog.shutdown()
+        # let the async on_stop and on_exit hooks clean up before they are
+        # cancelled
+        self.__runner.drain(EXIT_TIMEOUT)
+        self.__runner.shutdown()
         for plugin in self.__plugins.values():
-            plugin.call_plugin_method("on_exit")
+            plugin.shutdown()
         return True
 
     def pre_break(self, break_obj):
         """Execute the on_pre_break(break_obj) function of plugins."""
-        for plugin in self.__plugins.values():
-            if plugin.call_plugin_method_break_obj("on_pre_break", 1, break_obj):
-                return False
-        return True
+        return not any(self.__call_break_obj("on_pre_break", break_obj))
 
     def start_break(self, break_obj):
         """Execute the start_break(break_obj) function of plugins."""
         self.last_break = break_obj
-        for plugin in self.__plugins.values():
-            if plugin.call_plugin_method_break_obj("on_start_break", 1, break_obj):
-                return False
-
-        return True
+        return not any(self.__call_break_obj("on_start_break", break_obj))
 
     def stop_break(self):
         """Execute the stop_break() function of plugins."""
-        for plugin in self.__plugins.values():
-            plugin.call_plugin_method("on_stop_break")
+        for _ in self.__call("on_stop_break"):
+            pass
 
     def countdown(self, countdown, seconds):
         """Execute the on_countdown(countdown, seconds) function of plugins."""
-        for plugin in self.__plugins.values():
-            plugin.call_plugin_method("on_countdown", 2, countdown, seconds)
+        watchdog = self.__watchdog
+        for plugin, method in self.__dispatch.get("on_countdown", ()):
+            if countdown <= 1 or seconds % plugin.countdown_interval == 0:
+                result = watchdog.call(
+                    plugin.id, "on_countdown", method, countdown, seconds
+                )
+                if inspect.iscoroutine(result):
+                    self.__await(plugin, "on_countdown", result)
+        for plugin, method in self.__async_dispatch.get("on_countdown", ()):
+            if countdown <= 1 or seconds % plugin.countdown_interval == 0:
+                self.__runner.submit(
+                    plugin.id, "on_countdown", method(countdown, seconds)
+                )
 
     def update_next_break(self, break_obj, break_time):
         """Execute the update_next_break(break_time) function of plugins."""
-        for plugin in self.__plugins.values():
-            plugin.call_plugin_method_break_obj(
-                "update_next_break", 2, break_obj, break_time
-            )
+        for _ in self.__call_break_obj("update_next_break", break_obj, break_time):
+            pass
         return True
 
     def get_break_screen_widgets(self, break_obj):
@@ -196,36 +748,60 @@ class PluginManager:
         The widget is generated by calling the get_widget_title and
         get_widget_content functions of plugins.
         """
+        plugins = [
+            plugin
+            for plugin, _ in itertools.chain(
+                self.__dispatch.get("get_widget_title", ()),
+                self.__async_dispatch.get("get_widget_title", ()),
+            )
+        ]
+        titles = self.__call_each(plugins, "get_widget_title", break_obj)
+        plugins_with_title = [
+            (plugin, title)
+            for plugin, title in zip(plugins, titles)
+            if isinstance(title, str) and title != ""
+        ]
+        contents = self.__call_each(
+            [plugin for plugin, _ in plugins_with_title],
+            "get_widget_content",
+            break_obj,
+        )
         widget = ""
-        for plugin in self.__plugins.values():
-            try:
-                title = plugin.call_plugin_method_break_obj(
-                    "get_widget_title", 1, break_obj
-                )
-                if title is None or not isinstance(title, str) or title == "":
-                    continue
-                content = plugin.call_plugin_method_break_obj(
-                    "get_widget_content", 1, break_obj
-                )
-                if content is None or not isinstance(content, str) or content == "":
-                    continue
-                title = title.upper().strip()
-                if title == "":
-                    continue
-                widget += "<b>{}</b>\n{}\n{}\n\n\n".format(
-                    title, self.horizontal_line, content
-                )
-            except BaseException:
+        for (plugin, title), content in zip(plugins_with_title, contents):
+            if content is None or not isinstance(content, str) or content == "":
+                continue
+            title = title.upper().strip()
+            if title == "":
                 continue
+            widget += "<b>{}</b>\n{}\n{}\n\n\n".format(
+                title, self.horizontal_line, content
+            )
         return widget.strip()
 
+    def __call_each(self, plugins, method_name: str, break_obj) -> list[typing.Any]:
+        """Call the method of each plugin and return the results, awaiting the
+        async methods concurrently. Methods which failed return None.
+        """
+        results: list[typing.Any] = []
+        futures = {}
+        for plugin in plugins:
+            try:
+                result = plugin.call_plugin_method_break_obj(method_name, 1, break_obj)
+            except BaseException:
+                result = None
+            if inspect.iscoroutine(result):
+                future = self.__runner.submit(plugin.id, method_name, result)
+                futures[future] = len(results)
+                result = None
+            results.append(result)
+        for future in self.__runner.completed(futures, self.__deadline):
+            results[futures[future]] = future.result()
+        return results
+
     def get_break_screen_tray_actions(self, break_obj: Break) -> list[TrayAction]:
         """Return Tray Actions."""
         actions = []
-        for plugin in self.__plugins.values():
-            action = plugin.call_plugin_method_break_obj(
-                "get_tray_action", 1, break_obj
-            )
+        for action in self.__call_break_obj("get_tray_action", break_obj):
             if isinstance(action, TrayAction):
                 actions.append(action)
             elif isinstance(action, list):
@@ -242,6 +818,7 @@ class LoadedPlugin:
     break_override_allowed: bool = False
     errored: bool = False
     required_plugin: bool = False
+    countdown_interval: int = 1
 
     # misc data
     # FIXME: rename to plugin_config to plugin_json? plugin_config and config are easy
@@ -251,7 +828,20 @@ class LoadedPlugin:
     plugin_dir = None
     module = None
     last_error = None
-    id = None
+    id: str
+    watchdog: typing.Optional[HookWatchdog] = None
+    # name -> function of the PLUGIN_METHODS implemented by the module
+    methods: dict[str, typing.Callable] = {}
+    # hooks declared in config.json, the module is imported on demand
+    hooks: typing.Optional[list[str]] = None
+    # called after the module was imported on demand
+    on_import: typing.Optional[typing.Callable[[], None]] = None
+    # arguments of init(), until the module is imported
+    _pending_init: typing.Optional[tuple] = None
+    # "thread" or "process" if the plugin is hosted by a worker
+    isolation: typing.Optional[str] = None
+    hook_deadline: int = plugin_worker.DEFAULT_DEADLINE_MS
+    worker: typing.Optional[plugin_worker.PluginWorker] = None
 
     def __init__(self, plugin):
         (plugin_config, plugin_dir) = self._load_config_json(plugin["id"])
@@ -262,6 +852,19 @@ class LoadedPlugin:
         self.enabled = plugin["enabled"]
         self.break_override_allowed = plugin_config.get("break_override_allowed", False)
         self.required_plugin = plugin_config.get("required_plugin", False)
+        self.countdown_interval = max(
+            1, int(plugin_config.get("countdown_interval", 1))
+        )
+        self.hooks = plugin_config.get("hooks")
+        self.isolation = plugin.get("isolation")
+        if self.isolation not in (None,) + plugin_worker.ISOLATION_MODES:
+            logging.warning(
+                "Ignoring the isolation %s of the plugin %s", self.isolation, self.id
+            )
+            self.isolation = None
+        self.hook_deadline = plugin.get(
+            "hook_deadline", plugin_worker.DEFAULT_DEADLINE_MS
+        )
 
         self.config = dict(plugin.get("settings", {}))
         self.config["path"] = os.path.join(plugin_dir, plugin["id"])
@@ -283,20 +886,27 @@ class LoadedPlugin:
                     )
                 return
 
-            self._import_plugin()
+            self._prepare()
 
     def reload_config(self, plugin):
         if self.enabled and not plugin["enabled"]:
-            self.enabled = False
-            if not self.errored and utility.has_method(self.module, "disable"):
-                self.module.disable()
+            self.disable()
 
         if not self.enabled and plugin["enabled"]:
             self.enabled = True
+            # a full restart used to import the plugin again, which called
+            # enable(); it pairs with the disable() above
+            if not self.errored and "enable" in self.methods:
+                self.methods["enable"]()
 
         # Update the config
         self.config = dict(plugin.get("settings", {}))
         self.config["path"] = os.path.join(self.plugin_dir, plugin["id"])
+        self.hook_deadline = plugin.get(
+            "hook_deadline", plugin_worker.DEFAULT_DEADLINE_MS
+        )
+        if self.worker is not None:
+            self.worker.deadline = self.hook_deadline / 1000
 
         if self.enabled or self.break_override_allowed:
             plugin_path = os.path.join(self.plugin_dir, self.id)
@@ -313,7 +923,19 @@ class LoadedPlugin:
 
             if not self.errored and self.module is None:
                 # No longer errored, import the module now
-                self._import_plugin()
+                self._prepare()
+
+    def disable(self):
+        """Disable the plugin, e.g. before it is removed."""
+        if self.enabled:
+            self.enabled = False
+            if not self.errored and "disable" in self.methods:
+                self.methods["disable"]()
+
+    def shutdown(self):
+        """Stop the worker hosting the plugin, if any."""
+        if self.worker is not None:
+            self.worker.stop()
 
     def reload_errored(self):
         if not self.errored:
@@ -334,23 +956,124 @@ class LoadedPlugin:
 
             if not self.errored and self.module is None:
                 # No longer errored, import the module now
-                self._import_plugin()
+                self._prepare()
+
+    def load(self) -> None:
+        """Import the module of a plugin which declared its hooks, and
+        initialize it.
+        """
+        if self.module is not None or self.errored:
+            return
+        logging.info("Import the plugin %s on demand", self.id)
+        try:
+            self._import_plugin()
+        except BaseException as e:
+            logging.error("Error in loading the plugin %s: %s", self.id, e)
+            self.errored = True
+            self.last_error = str(e)
+        else:
+            if self._pending_init is not None:
+                context, safeeyes_config = self._pending_init
+                self._pending_init = None
+                self.init_plugin(context, safeeyes_config)
+        if self.on_import is not None:
+            self.on_import()
 
     def get_name(self):
         return self.plugin_config["meta"]["name"]
 
+    def _prepare(self):
+        """Import the plugin, or wait until one of the hooks declared in its
+        config.json is called.
+        """
+        if self.hooks is None or self.required_plugin:
+            # a required plugin, like the tray icon, may be all the UI there
+            # is, so it must not wait for a hook which might never be called
+            self._import_plugin()
+            return
+        self.methods = {
+            method_name: self._import_on_demand(method_name)
+            for method_name in self.hooks
+            if method_name in PLUGIN_METHODS and method_name not in LIFECYCLE_METHODS
+        }
+
+    def _import_on_demand(self, method_name: str) -> typing.Callable:
+        """Return a function which imports the plugin and calls its method."""
+
+        def call(*args, **kwargs):
+            if self.module is None:
+                if method_name in CLEANUP_HOOKS:
+                    return None
+                self.load()
+            method = self.methods.get(method_name)
+            if method is None or method is call:
+                return None
+            return method(*args, **kwargs)
+
+        return call
+
     def _import_plugin(self):
         if self.errored:
             # do not try to import errored plugin
             return
 
-        self.module = importlib.import_module((self.id + ".plugin"))
-        logging.info("Successfully loaded %s", str(self.module))
+        if self.isolation is not None:
+            self._start_worker()
+        else:
+            self.module = importlib.import_module((self.id + ".plugin"))
+            logging.info("Successfully loaded %s", str(self.module))
+            self.methods = self._find_methods(self.module)
 
-        if utility.has_method(self.module, "enable"):
-            self.module.enable()
+        if "enable" in self.methods:
+            self.methods["enable"]()
 
-    def _load_config_json(self, plugin_id):
+    def _start_worker(self):
+        """Import the plugin in a worker, and call its methods through the
+        worker.
+        """
+        assert self.isolation is not None
+        worker = plugin_worker.create(self.isolation, self.id, self.hook_deadline)
+        try:
+            method_names = worker.start(PLUGIN_METHODS)
+        except BaseException:
+            worker.stop()
+            raise
+        logging.info("Successfully loaded %s in a %s", self.id, self.isolation)
+        self.worker = worker
+        # the module lives in the worker
+        self.module = worker
+        self.methods = {
+            method_name: worker.method(method_name, method_name in RESULT_HOOKS)
+            for method_name in method_names
+        }
+
+    def _find_methods(self, module) -> dict[str, typing.Callable]:
+        """Return the PLUGIN_METHODS implemented by the module, checking the
+        number of arguments once.
+        """
+        methods = {}
+        for method_name, num_args in PLUGIN_METHODS.items():
+            if method_name in LIFECYCLE_METHODS and inspect.iscoroutinefunction(
+                getattr(module, method_name, None)
+            ):
+                logging.warning(
+                    "Ignoring %s of the plugin %s, it must not be async",
+                    method_name,
+                    self.id,
+                )
+            elif utility.has_method(module, method_name, num_args):
+                methods[method_name] = getattr(module, method_name)
+            elif hasattr(module, method_name):
+                logging.warning(
+                    "Ignoring %s of the plugin %s, it must take %d arguments",
+                    method_name,
+                    self.id,
+                    num_args,
+                )
+        return methods
+
+    @staticmethod
+    def _load_config_json(plugin_id):
         # Look for plugin.py
         if os.path.isfile(
             os.path.join(utility.SYSTEM_PLUGINS_DIR, plugin_id, "plugin.py")
@@ -377,8 +1100,12 @@ class LoadedPlugin:
         if self.errored:
             return
         if self.break_override_allowed or self.enabled:
-            if utility.has_method(self.module, "init", 3):
-                self.module.init(context, safeeyes_config, self.config)
+            if self.module is None and self.hooks is not None:
+                # initialized once the plugin is imported
+                self._pending_init = (context, safeeyes_config)
+                return
+            if "init" in self.methods:
+                self.methods["init"](context, safeeyes_config, self.config)
 
     def call_plugin_method_break_obj(
         self, method_name: str, num_args, break_obj, *args, **kwargs
@@ -413,7 +1140,9 @@ class LoadedPlugin:
     def _call_plugin_method_internal(
         self, method_name: str, num_args=0, *args, **kwargs
     ):
-        # FIXME: cache if method exists
-        if utility.has_method(self.module, method_name, num_args):
-            return getattr(self.module, method_name)(*args, **kwargs)
+        method = self.methods.get(method_name)
+        if method is not None:
+            if self.watchdog is None:
+                return method(*args, **kwargs)
+            return self.watchdog.call(self.id, method_name, method, *args, **kwargs)
         return None
@@ -0,0 +1,558 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Workers hosting a plugin outside of the main loop.
+
+A plugin is isolated by setting "isolation" in its entry of the "plugins"
+setting, optionally with a "hook_deadline" in milliseconds:
+
+    {"id": "myplugin", "enabled": true, "isolation": "process", "hook_deadline": 250}
+
+"thread" imports the plugin in a thread of its own, "process" in a process of
+its own. Its methods are called in order by that thread or process, and the
+main loop waits at most the deadline for the methods whose result is used.
+A method which did not return in time, raised an exception or whose worker is
+gone returns None, as if the plugin did not implement it, so a stuck plugin
+can't delay a break by more than the deadline. Isolated plugins must not touch
+GTK.
+
+A plugin hosted in a process gets a copy of the context, with translations of
+its own. Its API calls are forwarded to the main loop of Safe Eyes, but changes
+of the session are not seen by Safe Eyes, and results which can't be pickled,
+like a TrayAction, are dropped.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import importlib
+import inspect
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import typing
+from abc import ABC, abstractmethod
+
+from safeeyes import translations
+from safeeyes import utility
+from safeeyes.context import API, Context
+from safeeyes.model import BreakType
+
+ISOLATION_MODES = ("thread", "process")
+
+DEFAULT_DEADLINE_MS = 250
+# seconds to wait until the worker imported the plugin
+START_TIMEOUT = 30
+# seconds a stopped process may take to finish the pending calls
+STOP_TIMEOUT = 2
+# seconds a plugin in a process waits for the result of an API query
+API_TIMEOUT = 5
+
+# attributes of the context which change at runtime, sent with every call to a
+# process
+CONTEXT_STATE = (
+    "state",
+    "skipped",
+    "postponed",
+    "skip_button_disabled",
+    "postpone_button_disabled",
+)
+
+# API methods a plugin in a process may call, without and with a result
+API_ACTIONS = frozenset(
+    [
+        "show_settings",
+        "show_about",
+        "enable_safeeyes",
+        "disable_safeeyes",
+        "quit",
+        "take_break",
+        "postpone",
+    ]
+)
+API_QUERIES = frozenset(["status", "has_breaks", "get_break_time", "get_timeline"])
+
+# names of the calls which are not methods of the plugin
+_START = "__start__"
+_STOP = "__stop__"
+
+# kinds of messages between a process and Safe Eyes
+_REQUEST = 0
+_REPLY = 1
+
+
+class PluginWorkerError(Exception):
+    """A method of an isolated plugin failed, or its worker is gone."""
+
+
+class PluginWorker(ABC):
+    """Hosts a plugin and calls its methods with a deadline."""
+
+    plugin_id: str
+    # seconds to wait for a result
+    deadline: float
+
+    def __init__(self, plugin_id: str, deadline_ms: int) -> None:
+        self.plugin_id = plugin_id
+        self.deadline = deadline_ms / 1000
+
+    def start(self, methods: dict[str, int]) -> list[str]:
+        """Import the plugin, and return the names of the methods it
+        implements with the number of arguments given in methods.
+
+        Raises PluginWorkerError if the plugin could not be imported.
+        """
+        try:
+            return self._submit(_START, (methods,)).result(START_TIMEOUT)
+        except concurrent.futures.TimeoutError:
+            raise PluginWorkerError("importing the plugin timed out")
+
+    def method(self, method_name: str, wait: bool) -> typing.Callable:
+        """Return a function calling the method of the plugin.
+
+        If wait is not set, the function returns without waiting for the
+        method.
+        """
+
+        def call(*args):
+            return self.call(method_name, args, wait)
+
+        return call
+
+    def call(self, method_name: str, args: tuple, wait: bool = True) -> typing.Any:
+        """Call the method of the plugin, and return its result, or None if it
+        did not return within the deadline.
+        """
+        if not self.is_alive():
+            return None
+        future = self._submit(method_name, args)
+        log_error = functools.partial(self.__log_error, method_name)
+        if not wait:
+            future.add_done_callback(log_error)
+            return None
+        try:
+            return future.result(self.deadline)
+        except concurrent.futures.TimeoutError:
+            logging.warning(
+                "Plugin %s did not return from %s within %dms",
+                self.plugin_id,
+                method_name,
+                self.deadline * 1000,
+            )
+            future.add_done_callback(log_error)
+        except PluginWorkerError as e:
+            logging.error(
+                "Error in %s of plugin %s: %s", method_name, self.plugin_id, e
+            )
+        return None
+
+    @abstractmethod
+    def is_alive(self) -> bool:
+        """Return whether the worker still accepts calls."""
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Stop the worker once the pending calls are done."""
+        pass
+
+    @abstractmethod
+    def _submit(self, method_name: str, args: tuple) -> concurrent.futures.Future:
+        pass
+
+    def __log_error(self, method_name: str, future: concurrent.futures.Future) -> None:
+        error = future.exception()
+        if error is not None:
+            logging.error(
+                "Error in %s of plugin %s: %s", method_name, self.plugin_id, error
+            )
+
+
+class ThreadWorker(PluginWorker):
+    """Hosts a plugin in a thread of its own."""
+
+    __calls: queue.SimpleQueue
+    __stopped: bool = False
+
+    def __init__(self, plugin_id: str, deadline_ms: int) -> None:
+        super().__init__(plugin_id, deadline_ms)
+        self.__calls = queue.SimpleQueue()
+        threading.Thread(
+            target=_serve,
+            args=(self.__calls, _Host(plugin_id).call),
+            name="Plugin " + plugin_id,
+            daemon=True,
+        ).start()
+
+    def is_alive(self) -> bool:
+        return not self.__stopped
+
+    def stop(self) -> None:
+        if not self.__stopped:
+            self.__stopped = True
+            self.__calls.put(None)
+
+    def _submit(self, method_name: str, args: tuple) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self.__calls.put((functools.partial(_resolve, future), method_name, args))
+        return future
+
+
+class ProcessWorker(PluginWorker):
+    """Hosts a plugin in a process of its own."""
+
+    __process: multiprocessing.process.BaseProcess
+    __channel: "_Channel"
+    __context: typing.Optional[Context] = None
+    __stopped: bool = False
+
+    def __init__(self, plugin_id: str, deadline_ms: int) -> None:
+        super().__init__(plugin_id, deadline_ms)
+        # forking a process running GTK is not safe
+        mp_context = multiprocessing.get_context("spawn")
+        (connection, child_connection) = mp_context.Pipe()
+        self.__process = mp_context.Process(
+            target=_serve_process,
+            args=(child_connection, plugin_id),
+            name="Plugin " + plugin_id,
+            daemon=True,
+        )
+        self.__process.start()
+        child_connection.close()
+        self.__channel = _Channel(connection, self.__handle, "plugin " + plugin_id)
+        self.__channel.start()
+
+    def is_alive(self) -> bool:
+        return not self.__stopped and not self.__channel.closed
+
+    def stop(self) -> None:
+        if not self.is_alive():
+            return
+        self.__stopped = True
+        self.__channel.request(_STOP, ())
+        # don't block the main loop until the process finished
+        threading.Thread(target=self.__join, daemon=True).start()
+
+    def _submit(self, method_name: str, args: tuple) -> concurrent.futures.Future:
+        if method_name == "init":
+            self.__context = args[0]
+            args = (_context_copy(args[0]),) + args[1:]
+        state = None
+        if self.__context is not None:
+            state = tuple(getattr(self.__context, name) for name in CONTEXT_STATE)
+        return self.__channel.request(method_name, (args, state))
+
+    def __handle(self, call_id: int, method_name: str, args: tuple) -> None:
+        """Answer an API call of the plugin, on the thread reading the
+        replies.
+        """
+        api = self.__context.api if self.__context is not None else None
+        try:
+            if api is None:
+                raise PluginWorkerError("the plugin was not initialized")
+            if method_name in API_ACTIONS:
+                utility.execute_main_thread(getattr(api, method_name), *args)
+                result = None
+            elif method_name in API_QUERIES:
+                result = self.__query(getattr(api, method_name), args)
+            else:
+                raise PluginWorkerError("unknown API method " + method_name)
+        except BaseException as e:
+            self.__channel.reply(call_id, False, str(e))
+        else:
+            self.__channel.reply(call_id, True, result)
+
+    @staticmethod
+    def __query(method: typing.Callable, args: tuple) -> typing.Any:
+        """Call the API method on the main loop, which owns the state of the
+        core, and wait for its result.
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+
+        def query() -> None:
+            try:
+                future.set_result(method(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        utility.execute_main_thread(query)
+        return future.result(API_TIMEOUT)
+
+    def __join(self) -> None:
+        self.__process.join(STOP_TIMEOUT)
+        if self.__process.is_alive():
+            logging.warning("Terminating the process of plugin %s", self.plugin_id)
+            self.__process.terminate()
+
+
+def create(isolation: str, plugin_id: str, deadline_ms: int) -> PluginWorker:
+    """Return a worker for the isolation mode."""
+    if isolation == "process":
+        return ProcessWorker(plugin_id, deadline_ms)
+    return ThreadWorker(plugin_id, deadline_ms)
+
+
+class RemoteAPI(API):
+    """API of a plugin hosted in a process, forwarding the calls to Safe Eyes."""
+
+    _channel: "_Channel"
+
+    def __init__(self, channel: "_Channel") -> None:
+        self._channel = channel
+
+    def show_settings(self, activation_token: typing.Optional[str] = None) -> None:
+        self._channel.request("show_settings", (activation_token,))
+
+    def show_about(self, activation_token: typing.Optional[str] = None) -> None:
+        self._channel.request("show_about", (activation_token,))
+
+    def enable_safeeyes(self, next_break_time=-1) -> None:
+        self._channel.request("enable_safeeyes", (next_break_time,))
+
+    def disable_safeeyes(self, status=None, is_resting=False) -> None:
+        self._channel.request("disable_safeeyes", (status, is_resting))
+
+    def status(self) -> str:
+        return self.__query("status")
+
+    def quit(self) -> None:
+        self._channel.request("quit", ())
+
+    def take_break(self, break_type: typing.Optional[BreakType] = None) -> None:
+        self._channel.request("take_break", (break_type,))
+
+    def has_breaks(self, break_type=None) -> bool:
+        return self.__query("has_breaks", break_type)
+
+    def postpone(self, duration=-1) -> None:
+        self._channel.request("postpone", (duration,))
+
+    def get_break_time(self, break_type=None):
+        return self.__query("get_break_time", break_type)
+
+    def get_timeline(self, count: int):
+        return self.__query("get_timeline", count)
+
+    def __query(self, method_name: str, *args) -> typing.Any:
+        return self._channel.request(method_name, args).result(API_TIMEOUT)
+
+
+class _Host:
+    """The plugin, on the side of the worker."""
+
+    plugin_id: str
+    module = None
+
+    def __init__(self, plugin_id: str) -> None:
+        self.plugin_id = plugin_id
+
+    def call(self, method_name: str, args: tuple) -> typing.Any:
+        if method_name == _START:
+            self.module = importlib.import_module(self.plugin_id + ".plugin")
+            (methods,) = args
+            return [
+                name
+                for name, num_args in methods.items()
+                if utility.has_method(self.module, name, num_args)
+            ]
+        result = getattr(self.module, method_name)(*args)
+        if inspect.iscoroutine(result):
+            # the worker is not the main loop, async hooks may block it
+            result = asyncio.run(result)
+        return result
+
+
+class _ProcessHost(_Host):
+    """The plugin in its process, with a copy of the context."""
+
+    channel: "_Channel"
+    context: typing.Optional[Context] = None
+
+    def __init__(self, plugin_id: str, channel: "_Channel") -> None:
+        super().__init__(plugin_id)
+        self.channel = channel
+
+    def call(self, method_name: str, args: tuple) -> typing.Any:
+        (args, state) = args
+        if method_name == "init" and args[0] is not None:
+            self.context = Context(
+                api=RemoteAPI(self.channel), locale=translations.setup(), **args[0]
+            )
+            args = (self.context,) + args[1:]
+        if state is not None and self.context is not None:
+            for name, value in zip(CONTEXT_STATE, state):
+                setattr(self.context, name, value)
+        return super().call(method_name, args)
+
+
+class _Channel:
+    """Calls in both directions over a connection to another process.
+
+    Messages are (_REQUEST, call id, method name, args) and (_REPLY, call id,
+    ok, result or error message) tuples. A thread of its own reads them;
+    requests are passed to the handle function, which must reply.
+    """
+
+    closed: bool = False
+
+    __connection: typing.Any
+    __handle: typing.Callable[[int, str, tuple], None]
+    __name: str
+    __lock: threading.Lock
+    __ids: typing.Iterator[int]
+    __pending: dict[int, concurrent.futures.Future]
+
+    def __init__(
+        self,
+        connection: typing.Any,
+        handle: typing.Callable[[int, str, tuple], None],
+        name: str,
+        on_close: typing.Optional[typing.Callable[[], None]] = None,
+    ) -> None:
+        self.__connection = connection
+        self.__handle = handle
+        self.__name = name
+        self.__on_close = on_close
+        self.__lock = threading.Lock()
+        self.__ids = itertools.count(1)
+        self.__pending = {}
+
+    def start(self) -> None:
+        """Start reading the messages."""
+        threading.Thread(
+            target=self.__read, name="Channel " + self.__name, daemon=True
+        ).start()
+
+    def request(self, method_name: str, args: tuple) -> concurrent.futures.Future:
+        """Send a request, and return the future of its reply."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self.__lock:
+            if self.closed:
+                future.set_exception(PluginWorkerError(self.__name + " is gone"))
+                return future
+            call_id = next(self.__ids)
+            self.__pending[call_id] = future
+            try:
+                self.__connection.send((_REQUEST, call_id, method_name, args))
+            except Exception as e:
+                del self.__pending[call_id]
+                future.set_exception(PluginWorkerError(str(e)))
+        return future
+
+    def reply(self, call_id: int, ok: bool, result: typing.Any) -> None:
+        with self.__lock:
+            if self.closed:
+                return
+            try:
+                try:
+                    self.__connection.send((_REPLY, call_id, ok, result))
+                except OSError:
+                    raise
+                except Exception as e:
+                    # the result can't be pickled
+                    self.__connection.send((_REPLY, call_id, False, str(e)))
+            except OSError:
+                # the other process is gone, __read closes the channel
+                pass
+
+    def __read(self) -> None:
+        while True:
+            try:
+                (kind, call_id, first, second) = self.__connection.recv()
+            except (EOFError, OSError):
+                break
+            except Exception as e:
+                logging.error("Invalid message from %s: %s", self.__name, e)
+                continue
+            if kind == _REQUEST:
+                self.__handle(call_id, first, second)
+                continue
+            with self.__lock:
+                future = self.__pending.pop(call_id, None)
+            if future is None:
+                continue
+            if first:
+                future.set_result(second)
+            else:
+                future.set_exception(PluginWorkerError(second))
+
+        with self.__lock:
+            self.closed = True
+            pending = list(self.__pending.values())
+            self.__pending.clear()
+            self.__connection.close()
+        for future in pending:
+            future.set_exception(PluginWorkerError(self.__name + " is gone"))
+        if self.__on_close is not None:
+            self.__on_close()
+
+
+def _resolve(future: concurrent.futures.Future, ok: bool, result: typing.Any) -> None:
+    if ok:
+        future.set_result(result)
+    else:
+        future.set_exception(PluginWorkerError(result))
+
+
+def _serve(
+    calls: queue.SimpleQueue, call: typing.Callable[[str, tuple], typing.Any]
+) -> None:
+    """Make the calls from the queue in order, until None is taken."""
+    while True:
+        item = calls.get()
+        if item is None:
+            return
+        (done, method_name, args) = item
+        try:
+            result = call(method_name, args)
+        except BaseException as e:
+            done(False, "{}: {}".format(type(e).__name__, e))
+        else:
+            done(True, result)
+
+
+def _context_copy(context: typing.Optional[Context]) -> typing.Optional[dict]:
+    """Return the arguments to create a copy of the context in a process."""
+    if context is None:
+        return None
+    # the locale is a translations object which can't be pickled, the process
+    # sets up its own
+    return {
+        "version": context.version,
+        "session": context.session,
+        "desktop": context.desktop,
+        "is_wayland": context.is_wayland,
+    }
+
+
+def _serve_process(connection: typing.Any, plugin_id: str) -> None:
+    """Host the plugin in this process until Safe Eyes stops it or is gone."""
+    calls: queue.SimpleQueue = queue.SimpleQueue()
+
+    def handle(call_id: int, method_name: str, args: tuple) -> None:
+        if method_name == _STOP:
+            calls.put(None)
+        else:
+            calls.put((functools.partial(channel.reply, call_id), method_name, args))
+
+    channel = _Channel(
+        connection, handle, "Safe Eyes", on_close=lambda: calls.put(None)
+    )
+    channel.start()
+    _serve(calls, _ProcessHost(plugin_id, channel).call)
@@ -19,6 +19,8 @@
 from safeeyes import utility
 from safeeyes.translations import translate as _
 
+CACHEABLE = True
+
 
 def validate(plugin_config, plugin_settings):
     commands = ["ffplay", "pw-play"]
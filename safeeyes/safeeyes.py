@@ -85,6 +85,12 @@ class SafeEyes(Gtk.Application):
                 None,
                 _("print the status of running safeeyes instance and exit"),
             ),
+            # TODO: translate
+            (
+                "trace",
+                None,
+                "print the recent events of running safeeyes instance and exit",
+            ),
             # toggle
             ("debug", None, _("start safeeyes in debug mode")),
             # TODO: translate
@@ -148,7 +154,7 @@ class SafeEyes(Gtk.Application):
         if is_remote:
             logging.info("Remote instance")
 
-            if options.contains("status"):
+            if options.contains("status") or options.contains("trace"):
                 # fall through the default handling
                 # this will call do_command_line on the primary instance
                 # where we will handle this
@@ -188,6 +194,7 @@ class SafeEyes(Gtk.Application):
                 options.contains("enable")
                 or options.contains("disable")
                 or options.contains("status")
+                or options.contains("trace")
                 or options.contains("quit")
             ):
                 print(_("Safe Eyes is not running"))
@@ -208,6 +215,11 @@ class SafeEyes(Gtk.Application):
             command_line.print_literal(self.status())
             return 0
 
+        if cli.get("trace"):
+            # this is only invoked remotely, like status
+            command_line.print_literal(self.safe_eyes_core.dump_trace() + "\n")
+            return 0
+
         logging.info("Handle primary command line")
 
         self.activate()
@@ -273,7 +285,8 @@ class SafeEyes(Gtk.Application):
             self.active = True
             self.context.state = State.START
             self.plugins_manager.start()  # Call the start method of all plugins
-            self.safe_eyes_core.start()
+            # Continue where the previous instance stopped
+            self.safe_eyes_core.start(resume=True)
             self.handle_system_suspend()
 
     def do_activate(self):
@@ -350,7 +363,7 @@ class SafeEyes(Gtk.Application):
         """Temporarily disable plugin, and restart SafeEyes."""
         config = self.config.clone()
 
-        for plugin in config.get("plugins"):
+        for plugin in config.edit("plugins"):
             if plugin["id"] == plugin_id:
                 plugin["enabled"] = False
 
@@ -446,26 +459,65 @@ class SafeEyes(Gtk.Application):
         """
         self._settings_dialog = None
 
-        if self.config == config:
+        changed_keys = self.config.diff(config)
+        if not changed_keys:
             # Config is not modified
             return
 
         logging.info("Saving settings to safeeyes.json")
-        # Stop the Safe Eyes core
-        if self.active:
-            self.plugins_manager.stop()
-            self.safe_eyes_core.stop()
-
         # Write the configuration to file
         config.save()
         self.persist_session()
 
-        self.restart(config)
+        self.reload(config, changed_keys)
+
+    def reload(self, config, changed_keys):
+        """Apply the changed settings without restarting the unaffected
+        components.
+        """
+        logging.info("Apply the changed settings: %s", ", ".join(sorted(changed_keys)))
+        config.take_over(self.config, changed_keys)
+        self.config = config
+
+        # only new breaks restart the schedule, other settings of the core
+        # keep the countdown to the next break
+        restart_core = bool(changed_keys & SafeEyesCore.BREAK_KEYS)
+        # the plugins only run while the core has breaks to schedule
+        had_breaks = self.safe_eyes_core.has_breaks()
+        if restart_core:
+            if self.active:
+                self.safe_eyes_core.stop()
+            self.safe_eyes_core.initialize(config)
+        elif changed_keys & SafeEyesCore.CONFIG_KEYS:
+            self.safe_eyes_core.update(config)
+
+        if changed_keys & BreakScreen.CONFIG_KEYS:
+            self.break_screen.initialize(config)
+
+        has_breaks = self.safe_eyes_core.has_breaks()
+        running = self.active and had_breaks
+        if running and not has_breaks:
+            self.plugins_manager.stop()
+            running = False
+
+        try:
+            self.plugins_manager.reload(
+                self.context, config, changed_keys, running=running
+            )
+        except RequiredPluginException as e:
+            self.show_required_plugin_dialog(e)
+            return
+
+        if restart_core and self.active and has_breaks:
+            self.safe_eyes_core.start()
+            if not had_breaks:
+                self.plugins_manager.start()
 
     def restart(self, config, set_active=False):
         logging.info("Initialize SafeEyesCore with modified settings")
 
         # Restart the core and initialize the components
+        config.take_over(self.config, self.config.diff(config))
         self.config = config
         self.safe_eyes_core.initialize(config)
         self.break_screen.initialize(config)
@@ -503,6 +555,7 @@ class SafeEyes(Gtk.Application):
             if status is None:
                 status = _("Disabled until restart")
             self._status = status
+            self.__save_session()
 
     def on_start_break(self, break_obj):
         """Pass the break information to plugins."""
@@ -516,6 +569,7 @@ class SafeEyes(Gtk.Application):
         widget = self.plugins_manager.get_break_screen_widgets(break_obj)
         actions = self.plugins_manager.get_break_screen_tray_actions(break_obj)
         self.break_screen.show_message(break_obj, widget, actions)
+        self.__save_session()
 
     def countdown(self, countdown, seconds):
         """Pass the countdown to plugins and break screen."""
@@ -527,8 +581,7 @@ class SafeEyes(Gtk.Application):
         """Update the next break to plugins and save the session."""
         self.plugins_manager.update_next_break(break_obj, break_time)
         self._status = _("Next break at %s") % (utility.format_time(break_time))
-        if self.config.get("persist_state"):
-            utility.write_json(utility.SESSION_FILE_PATH, self.context["session"])
+        self.__save_session()
 
     def stop_break(self):
         """Stop the current break."""
@@ -544,6 +597,11 @@ class SafeEyes(Gtk.Application):
         """Return the status of Safe Eyes."""
         return self._status
 
+    def __save_session(self):
+        """Save the session, which holds the checkpoint of the core."""
+        if self.config.get("persist_state"):
+            utility.write_json(utility.SESSION_FILE_PATH, self.context["session"])
+
     def persist_session(self):
         """Save the session object to the session file."""
         if self.config.get("persist_state"):
@@ -0,0 +1,377 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks of SafeEyesCore, BreakQueue and the PluginManager.
+
+Every scenario runs thousands of break cycles in virtual time and reports the
+CPU time per wakeup of the core and per break, the time spent dispatching
+hooks, and the memory allocated while running. Results can be saved and
+compared against the results of another version:
+
+    python -m safeeyes.tests.benchmark --save before.json
+    python -m safeeyes.tests.benchmark --compare before.json
+
+Comparing exits with 1 if a metric regressed by more than the threshold.
+"""
+
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+
+from safeeyes import clock
+from safeeyes import context
+from safeeyes import core
+from safeeyes import model
+from safeeyes import plugin_manager
+from safeeyes import utility
+
+# metrics compared between runs, lower is better
+COMPARED_METRICS = ["cpu_per_wakeup_us", "cpu_per_break_us", "hook_us", "peak_kib"]
+
+PLUGIN_CONFIG = {
+    "meta": {"name": "Benchmark", "description": "", "version": "0.0.1"},
+    "dependencies": {
+        "python_modules": [],
+        "shell_commands": [],
+        "operating_systems": [],
+        "desktop_environments": [],
+        "resources": [],
+    },
+    "settings": [],
+}
+
+PLUGIN_SOURCE = """
+def on_pre_break(break_obj):
+    return False
+
+
+def on_start_break(break_obj):
+    return False
+
+
+def on_countdown(countdown, seconds):
+    pass
+
+
+def on_stop_break():
+    pass
+
+
+def update_next_break(break_obj, next_break_time):
+    pass
+"""
+
+
+@dataclasses.dataclass
+class Scenario:
+    name: str
+    config: dict[str, typing.Any] = dataclasses.field(default_factory=dict)
+    # postpone every n-th break
+    postpone_every: int = 0
+    # number of no-op plugins
+    plugins: int = 0
+
+
+SCENARIOS = [
+    Scenario("defaults"),
+    Scenario(
+        "many_short_breaks",
+        {
+            "short_breaks": [{"name": "break {}".format(i)} for i in range(500)],
+            "long_breaks": [],
+        },
+    ),
+    Scenario(
+        "random_order",
+        {
+            "random_order": True,
+            "short_breaks": [{"name": "break {}".format(i)} for i in range(50)],
+            "long_breaks": [{"name": "long break {}".format(i)} for i in range(10)],
+        },
+    ),
+    Scenario("postpone", postpone_every=3),
+    Scenario("long_breaks", {"short_break_interval": 5, "long_break_interval": 15}),
+    Scenario("plugins", plugins=10),
+]
+
+
+def base_config() -> dict[str, typing.Any]:
+    return {
+        "short_breaks": [{"name": "break {}".format(i)} for i in range(4)],
+        "long_breaks": [{"name": "long break {}".format(i)} for i in range(3)],
+        "short_break_interval": 15,
+        "long_break_interval": 75,
+        "long_break_duration": 60,
+        "short_break_duration": 15,
+        "pre_break_warning_time": 10,
+        "random_order": False,
+        "postpone_duration": 5,
+        "postpone_unit": "minutes",
+        "monotonic_scheduler": True,
+        "plugin_hook_budget": 100,
+        "plugins": [],
+    }
+
+
+def install_plugins(directory: str, count: int) -> list[dict[str, typing.Any]]:
+    """Write count no-op plugins into the directory."""
+    plugins = []
+    for i in range(count):
+        plugin_id = "benchmark_plugin_{}".format(i)
+        plugin_dir = os.path.join(directory, plugin_id)
+        os.mkdir(plugin_dir)
+        with open(os.path.join(plugin_dir, "config.json"), "w") as config_file:
+            json.dump(PLUGIN_CONFIG, config_file)
+        with open(os.path.join(plugin_dir, "plugin.py"), "w") as plugin_file:
+            plugin_file.write(PLUGIN_SOURCE)
+        plugins.append({"id": plugin_id, "enabled": True, "settings": {}})
+    return plugins
+
+
+class HookTimer:
+    """Wraps hook handlers to measure the time spent in them."""
+
+    calls: int = 0
+    seconds: float = 0.0
+
+    def wrap(self, handler: typing.Callable) -> typing.Callable:
+        def timed(*args):
+            start = time.perf_counter()
+            result = handler(*args)
+            self.seconds += time.perf_counter() - start
+            self.calls += 1
+            return result
+
+        return timed
+
+
+def run_scenario(
+    scenario: Scenario, breaks: int, trace_memory: bool = False
+) -> dict[str, float]:
+    """Run the scenario until the given number of breaks were shown."""
+    random.seed(0)
+    user_config = base_config()
+    user_config.update(scenario.config)
+
+    user_plugins_dir = utility.USER_PLUGINS_DIR
+    with tempfile.TemporaryDirectory() as plugins_dir:
+        if scenario.plugins:
+            user_config["plugins"] = install_plugins(plugins_dir, scenario.plugins)
+            sys.path.append(plugins_dir)
+            utility.USER_PLUGINS_DIR = plugins_dir
+        try:
+            return _run(scenario, user_config, breaks, trace_memory)
+        finally:
+            if scenario.plugins:
+                utility.USER_PLUGINS_DIR = user_plugins_dir
+                sys.path.remove(plugins_dir)
+                for plugin in user_config["plugins"]:
+                    for name in (plugin["id"], plugin["id"] + ".plugin"):
+                        sys.modules.pop(name, None)
+
+
+def _run(
+    scenario: Scenario,
+    user_config: dict[str, typing.Any],
+    breaks: int,
+    trace_memory: bool,
+) -> dict[str, float]:
+    config = model.Config(user_config=user_config, system_config={})
+    ctx = context.Context(
+        api=context.API(typing.cast(typing.Any, None)),
+        locale="en_US",
+        version="0.0.0",
+        session={"plugin": {}},
+        desktop="unknown",
+        is_wayland=False,
+    )
+    sim = clock.SimulatedClock(datetime.datetime(2024, 8, 25, 9, 0, 0))
+    safe_eyes_core = core.SafeEyesCore(ctx, sim)
+    hooks = HookTimer()
+    shown = 0
+
+    def start_break(break_obj: model.Break) -> bool:
+        nonlocal shown
+        shown += 1
+        if scenario.postpone_every and shown % scenario.postpone_every == 0:
+            sim.timeout_add_seconds(3, safe_eyes_core.postpone)
+        return True
+
+    def countdown(countdown: int, seconds: int) -> bool:
+        return True
+
+    def stop_break() -> bool:
+        return True
+
+    def update_next_break(
+        break_obj: model.Break, next_break_time: datetime.datetime
+    ) -> bool:
+        return True
+
+    safe_eyes_core.start_break += hooks.wrap(start_break)
+    safe_eyes_core.on_count_down += hooks.wrap(countdown)
+    safe_eyes_core.on_stop_break += hooks.wrap(stop_break)
+    safe_eyes_core.on_update_next_break += hooks.wrap(update_next_break)
+
+    if scenario.plugins:
+        manager = plugin_manager.PluginManager()
+        manager.init(ctx, config)
+
+        def plugins_countdown(countdown: int, seconds: int) -> bool:
+            manager.countdown(countdown, seconds)
+            return True
+
+        def plugins_stop_break() -> bool:
+            manager.stop_break()
+            return True
+
+        safe_eyes_core.on_pre_break += hooks.wrap(manager.pre_break)
+        safe_eyes_core.on_start_break += hooks.wrap(manager.start_break)
+        safe_eyes_core.on_count_down += hooks.wrap(plugins_countdown)
+        safe_eyes_core.on_stop_break += hooks.wrap(plugins_stop_break)
+        safe_eyes_core.on_update_next_break += hooks.wrap(manager.update_next_break)
+
+    before = 0
+    if trace_memory:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+
+    cpu_start = time.process_time()
+    safe_eyes_core.initialize(config)
+    safe_eyes_core.start()
+    wakeups = 0
+    while shown < breaks and sim.step():
+        wakeups += 1
+    safe_eyes_core.stop()
+    cpu = time.process_time() - cpu_start
+
+    result = {
+        "breaks": float(shown),
+        "wakeups": float(wakeups),
+        "cpu_per_wakeup_us": cpu / max(1, wakeups) * 1e6,
+        "cpu_per_break_us": cpu / max(1, shown) * 1e6,
+        "hook_us": hooks.seconds / max(1, hooks.calls) * 1e6,
+    }
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_kib"] = (peak - before) / 1024
+        result["retained_kib"] = (current - before) / 1024
+    return result
+
+
+def run(scenarios: list[Scenario], breaks: int) -> dict[str, dict[str, float]]:
+    results = {}
+    for scenario in scenarios:
+        result = run_scenario(scenario, breaks)
+        # allocations are measured in a second run, tracing slows down the first
+        memory = run_scenario(scenario, breaks, trace_memory=True)
+        result["peak_kib"] = memory["peak_kib"]
+        result["retained_kib"] = memory["retained_kib"]
+        results[scenario.name] = result
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Return the metrics which are worse than threshold times the baseline."""
+    regressions = []
+    for name, result in results.items():
+        for metric in COMPARED_METRICS:
+            old = baseline.get(name, {}).get(metric)
+            if not old or metric not in result:
+                continue
+            ratio = result[metric] / old
+            if ratio > threshold:
+                regressions.append(
+                    "{} {}: {:.2f} -> {:.2f} ({:.0%})".format(
+                        name, metric, old, result[metric], ratio
+                    )
+                )
+    return regressions
+
+
+def print_results(results: dict[str, dict[str, float]]) -> None:
+    columns = ["breaks", "wakeups"] + COMPARED_METRICS + ["retained_kib"]
+    print(("{:<20}" + "{:>18}" * len(columns)).format("scenario", *columns))
+    for name, result in results.items():
+        values = ["{:.2f}".format(result.get(column, 0)) for column in columns]
+        print(("{:<20}" + "{:>18}" * len(columns)).format(name, *values))
+
+
+def main(argv: typing.Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--breaks", type=int, default=2000)
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="run only the given scenarios",
+    )
+    parser.add_argument("--save", help="save the results as JSON to the file")
+    parser.add_argument("--compare", help="compare against results saved before")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.scenario or scenario.name in args.scenario
+    ]
+    results = run(scenarios, args.breaks)
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "date": datetime.datetime.now().isoformat(),
+                    "breaks": args.breaks,
+                    "results": results,
+                },
+                results_file,
+                indent=2,
+            )
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print("Regression:", regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
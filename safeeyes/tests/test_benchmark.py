@@ -0,0 +1,51 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+from safeeyes.tests import benchmark
+
+
+class TestBenchmark:
+    @pytest.mark.parametrize("scenario", benchmark.SCENARIOS, ids=lambda s: s.name)
+    def test_scenarios_run(self, scenario: benchmark.Scenario) -> None:
+        result = benchmark.run_scenario(scenario, 3, trace_memory=True)
+
+        assert result["breaks"] == 3
+        assert result["wakeups"] > 3
+        assert result["peak_kib"] > 0
+
+    def test_compare(self, tmp_path) -> None:
+        saved = tmp_path / "results.json"
+        assert (
+            benchmark.main(
+                ["--breaks", "2", "--scenario", "defaults", "--save", str(saved)]
+            )
+            == 0
+        )
+        baseline = json.loads(saved.read_text())["results"]
+
+        assert benchmark.compare(baseline, baseline, 1.25) == []
+
+        slower = {"defaults": dict(baseline["defaults"])}
+        slower["defaults"]["cpu_per_break_us"] *= 2
+        regressions = benchmark.compare(slower, baseline, 1.25)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("defaults cpu_per_break_us")
@@ -0,0 +1,195 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import pathlib
+import typing
+from unittest import mock
+
+import pytest
+
+from safeeyes import catalog
+from safeeyes import context
+from safeeyes import model
+
+
+def write_catalog(path: pathlib.Path, lines: list[typing.Any]) -> str:
+    with open(path, "w") as catalog_file:
+        for line in lines:
+            catalog_file.write(
+                (line if isinstance(line, str) else json.dumps(line)) + "\n"
+            )
+    return str(path)
+
+
+class TestCatalog:
+    def test_validate(self, tmp_path: pathlib.Path) -> None:
+        (tmp_path / "blink.png").write_bytes(b"")
+        path = write_catalog(
+            tmp_path / "breaks.jsonl",
+            [
+                {"name": "break 1", "image": "blink.png"},
+                "",
+                {"type": "long", "name": "long break 1", "duration": 120},
+                "{not json",
+                {"type": "medium", "name": "", "duration": 0, "colour": "red"},
+                {"name": "break 2", "image": "missing.png", "plugins": "all"},
+                ["break 3"],
+            ],
+        )
+
+        breaks = catalog.Catalog(path)
+
+        assert len(breaks) == 2
+        # every problem of every line is reported
+        assert [str(error) for error in breaks.errors] == [
+            "line 4: invalid JSON: Expecting property name enclosed in double "
+            "quotes: line 1 column 2 (char 1)",
+            "line 5: unknown keys: colour",
+            'line 5: type must be "short" or "long"',
+            "line 5: name is missing",
+            "line 5: duration must be a positive number",
+            "line 6: image not found: missing.png",
+            "line 6: plugins must be a list of plugin ids",
+            "line 7: a break must be an object",
+        ]
+
+        short_breaks = breaks.breaks(model.BreakType.SHORT_BREAK, 15, 20)
+        assert short_breaks is not None
+        assert len(short_breaks) == 1
+        assert short_breaks[0].name == "break 1"
+        assert short_breaks[0].duration == 20
+        assert short_breaks[0].image == str(tmp_path / "blink.png")
+        # parsed breaks are kept
+        assert short_breaks[0] is short_breaks[-1]
+
+        long_breaks = breaks.breaks(model.BreakType.LONG_BREAK, 75, 60)
+        assert long_breaks is not None
+        assert long_breaks[0].duration == 120
+        assert long_breaks[0].is_long_break()
+
+    def test_changed_file(self, tmp_path: pathlib.Path) -> None:
+        path = write_catalog(
+            tmp_path / "breaks.jsonl",
+            [{"name": "break {}".format(i)} for i in range(10)],
+        )
+        fallback = (
+            model.Break(model.BreakType.SHORT_BREAK, "configured", 15, 20, None, None),
+        )
+        short_breaks = catalog.Catalog(path).breaks(
+            model.BreakType.SHORT_BREAK, 15, 20, fallback
+        )
+        assert short_breaks is not None
+        assert short_breaks[1].name == "break 1"
+
+        # the offsets of the index are off by a few bytes in the new file
+        write_catalog(
+            tmp_path / "breaks.jsonl",
+            [{"name": "new break {}".format(i)} for i in range(3)],
+        )
+        # the queue may still be further on in the old file
+        assert short_breaks[5].name == "new break 2"
+        assert len(short_breaks) == 3
+        assert [brk.name for brk in short_breaks] == [
+            "new break 0",
+            "new break 1",
+            "new break 2",
+        ]
+
+        pathlib.Path(path).unlink()
+        # parsed breaks are still kept, others come from the configuration
+        assert short_breaks[0].name == "new break 0"
+        other_breaks = short_breaks.catalog.breaks(
+            model.BreakType.SHORT_BREAK, 15, 20, fallback
+        )
+        assert other_breaks is not None
+        assert other_breaks[0] is fallback[0]
+
+    def test_break_queue(
+        self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(model, "_", lambda message: message, raising=False)
+        path = write_catalog(
+            tmp_path / "breaks.jsonl",
+            [{"name": "break {}".format(i)} for i in range(1000)]
+            + [{"type": "long", "name": "long break"}],
+        )
+        config = model.Config(
+            user_config={
+                "short_breaks": [{"name": "configured break"}],
+                "long_breaks": [],
+                "break_catalog": path,
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 15,
+                "random_order": False,
+            },
+            system_config={},
+        )
+        session: dict[str, typing.Any] = {}
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API),
+            locale="en_US",
+            version="0.0.0",
+            session=session,
+        )
+
+        read = mock.create_autospec(
+            catalog.Catalog.read, side_effect=catalog.Catalog.read
+        )
+        monkeypatch.setattr(catalog.Catalog, "read", read)
+        bq = model.BreakQueue.create(config, ctx)
+        assert bq is not None
+
+        assert [entry.break_obj.name for entry in bq.get_timeline(6)] == [
+            "break 0",
+            "break 1",
+            "break 2",
+            "break 3",
+            "long break",
+            "break 4",
+        ]
+        # only the breaks which were reached are read
+        assert read.call_count < 10
+        assert session["break_queue"]["break"] == [0, 0]
+
+        bq.next()
+        # the position is restored without reading the whole catalog
+        restored = model.BreakQueue.create(config, ctx)
+        assert restored is not None
+        assert restored.get_break().name == "break 1"
+        assert read.call_count < 20
+
+    def test_export(self, tmp_path: pathlib.Path) -> None:
+        config = model.Config(
+            user_config={
+                "short_breaks": [{"name": "break 1"}, {"name": "break 2"}],
+                "long_breaks": [{"name": "long break 1", "duration": 120}],
+            },
+            system_config={},
+        )
+        path = str(tmp_path / "breaks.jsonl")
+
+        assert catalog.export_breaks(config, path) == 3
+
+        exported = catalog.Catalog(path)
+        assert exported.errors == []
+        long_breaks = exported.breaks(model.BreakType.LONG_BREAK, 75, 60)
+        assert long_breaks is not None
+        assert [brk.duration for brk in long_breaks] == [120]
@@ -0,0 +1,171 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import datetime
+import subprocess
+import sys
+
+import pytest
+
+from safeeyes import clock
+
+
+class TestClock:
+    def test_partial_clock(self) -> None:
+        class PartialClock(clock.Clock):
+            def now(self) -> datetime.datetime:
+                return datetime.datetime.now()
+
+        with pytest.raises(TypeError):
+            PartialClock()  # type: ignore[abstract]
+
+
+class TestSimulatedClock:
+    def get_clock(self) -> clock.SimulatedClock:
+        return clock.SimulatedClock(
+            datetime.datetime.fromisoformat("2024-08-25T13:00:00")
+        )
+
+    def test_time_only_passes_when_advanced(self) -> None:
+        sim = self.get_clock()
+
+        assert sim.monotonic() == 0
+        assert sim.now() == datetime.datetime.fromisoformat("2024-08-25T13:00:00")
+
+        assert sim.advance(90) == 0
+
+        assert sim.monotonic() == 90
+        assert sim.now() == datetime.datetime.fromisoformat("2024-08-25T13:01:30")
+
+        sim.sleep(0.5)
+
+        assert sim.monotonic() == 90.5
+
+    def test_timers_fire_in_order(self) -> None:
+        sim = self.get_clock()
+        fired: list[tuple[str, float]] = []
+
+        sim.timeout_add_seconds(10, lambda: fired.append(("b", sim.monotonic())))
+        sim.timeout_add(2500, lambda: fired.append(("a", sim.monotonic())))
+        sim.timeout_add_seconds(10, lambda: fired.append(("c", sim.monotonic())))
+        sim.timeout_add_seconds(20, lambda: fired.append(("d", sim.monotonic())))
+
+        assert sim.pending() == 4
+        assert sim.advance(10) == 3
+        assert fired == [("a", 2.5), ("b", 10), ("c", 10)]
+        assert sim.pending() == 1
+
+        assert sim.step()
+        assert fired[-1] == ("d", 20)
+        assert not sim.step()
+
+    def test_repeating_timer(self) -> None:
+        sim = self.get_clock()
+        ticks: list[float] = []
+
+        def tick() -> bool:
+            ticks.append(sim.monotonic())
+            return len(ticks) < 3
+
+        sim.timeout_add_seconds(1, tick)
+
+        assert sim.advance(60) == 3
+        assert ticks == [1, 2, 3]
+        assert sim.pending() == 0
+
+    def test_source_remove(self) -> None:
+        sim = self.get_clock()
+        fired: list[str] = []
+
+        source_id = sim.timeout_add_seconds(5, lambda: fired.append("removed"))
+        sim.timeout_add_seconds(10, lambda: fired.append("kept"))
+        sim.source_remove(source_id)
+
+        assert sim.advance(7) == 0
+        assert sim.advance(7) == 1
+        assert fired == ["kept"]
+
+    def test_timer_added_while_firing(self) -> None:
+        sim = self.get_clock()
+        fired: list[float] = []
+
+        def first() -> bool:
+            sim.timeout_add_seconds(0, lambda: fired.append(sim.monotonic()))
+            return False
+
+        sim.timeout_add_seconds(3, first)
+
+        assert sim.advance(3) == 2
+        assert fired == [3]
+
+
+class TestHeapClock:
+    def test_run_due(self) -> None:
+        heap_clock = clock.HeapClock()
+        fired: list[str] = []
+
+        heap_clock.timeout_add(0, lambda: fired.append("now"))
+        source_id = heap_clock.timeout_add(0, lambda: fired.append("removed"))
+        heap_clock.timeout_add_seconds(3600, lambda: fired.append("later"))
+        heap_clock.source_remove(source_id)
+
+        assert heap_clock.run_due() == 1
+        assert fired == ["now"]
+        assert heap_clock.pending() == 1
+
+        deadline = heap_clock.next_deadline()
+        assert deadline is not None
+        assert deadline > heap_clock.monotonic() + 3500
+
+
+class TestAsyncioClock:
+    def test_timers(self) -> None:
+        fired: list[str] = []
+
+        async def main() -> None:
+            loop_clock = clock.AsyncioClock()
+            ticks = 0
+
+            def tick() -> bool:
+                nonlocal ticks
+                ticks += 1
+                fired.append("tick")
+                return ticks < 3
+
+            loop_clock.timeout_add(1, tick)
+            loop_clock.timeout_add(30, lambda: fired.append("once"))
+            removed = loop_clock.timeout_add(0, lambda: fired.append("removed"))
+            loop_clock.source_remove(removed)
+
+            assert loop_clock.pending() == 2
+            await asyncio.sleep(0.1)
+            assert loop_clock.pending() == 0
+
+        asyncio.run(main())
+
+        assert fired == ["tick", "tick", "tick", "once"]
+
+    def test_no_gtk(self) -> None:
+        """The core runs without importing PyGObject."""
+        code = (
+            "import sys\n"
+            "import safeeyes.core, safeeyes.host\n"
+            "assert 'gi' not in sys.modules, 'gi was imported'\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
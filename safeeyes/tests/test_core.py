@@ -20,19 +20,25 @@ import datetime
 import pytest
 import typing
 
+from safeeyes import clock
 from safeeyes import context
 from safeeyes import core
 from safeeyes import model
+from safeeyes import trace
 
 from time_machine import TimeMachineFixture
 
 from unittest import mock
 
 
-class SafeEyesCoreHandle:
-    callback: typing.Optional[typing.Tuple[typing.Callable, int]] = None
+class SafeEyesCoreHandle(clock.Clock):
+    callback: typing.Optional[typing.Tuple[typing.Callable, float]] = None
     safe_eyes_core: core.SafeEyesCore
     time_machine: TimeMachineFixture
+    # fake monotonic time, advanced together with the time machine
+    monotonic_time: float = 1000.0
+    # number of timer sources created
+    sources: int = 0
 
     def __init__(
         self,
@@ -42,12 +48,27 @@ class SafeEyesCoreHandle:
         self.time_machine = time_machine
         self.safe_eyes_core = safe_eyes_core
 
-    def timeout_add_seconds(self, duration: int, callback: typing.Callable) -> int:
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    def monotonic(self) -> float:
+        return self.monotonic_time
+
+    def timeout_add_seconds(self, duration: float, callback: typing.Callable) -> int:
         if self.callback is not None:
             raise Exception("only one callback supported. need to make this smarter")
         self.callback = (callback, duration)
+        self.sources += 1
         return 1
 
+    def timeout_add(self, interval: int, callback: typing.Callable) -> int:
+        return self.timeout_add_seconds(interval / 1000, callback)
+
+    def sleep(self, duration: float) -> None:
+        """Let time pass without waking up, e.g. inside a slow hook."""
+        self.time_machine.shift(delta=datetime.timedelta(seconds=duration))
+        self.monotonic_time += duration
+
     def source_remove(self, source_id: int) -> None:
         if self.callback is None:
             raise Exception("no callback registered")
@@ -58,8 +79,10 @@ class SafeEyesCoreHandle:
 
         (callback, duration) = self.callback
         self.callback = None
-        self.time_machine.shift(delta=datetime.timedelta(seconds=duration))
-        callback()
+        self.sleep(duration)
+        if callback() and self.callback is None:
+            # the source keeps running, like GLib.SOURCE_CONTINUE
+            self.callback = (callback, duration)
 
 
 SequentialThreadingFixture: typing.TypeAlias = typing.Callable[
@@ -86,13 +109,12 @@ class TestSafeEyesCore:
     @pytest.fixture
     def sequential_threading(
         self,
-        monkeypatch: pytest.MonkeyPatch,
         time_machine: TimeMachineFixture,
     ) -> typing.Generator[SequentialThreadingFixture]:
         """This fixture allows stopping threads at any point.
 
         It is hard-coded for SafeEyesCore, the handle class returned by the fixture must
-        be initialized with a SafeEyesCore instance to be patched.
+        be initialized with a SafeEyesCore instance whose clock it replaces.
         With this, all sleeping/blocking/thread starting calls inside SafeEyesCore are
         intercepted, and paused.
         Additionally, all threads inside SafeEyesCore run sequentially.
@@ -105,19 +127,6 @@ class TestSafeEyesCore:
         # no need to switch threads, as we don't use any gtk things
         handle: typing.Optional["SafeEyesCoreHandle"] = None
 
-        def timeout_add_seconds(duration, callback) -> int:
-            if not handle:
-                raise Exception("handle must be initialized before first sleep call")
-            return handle.timeout_add_seconds(duration, callback)
-
-        def source_remove(source_id: int) -> None:
-            if not handle:
-                raise Exception("handle must be initialized before first call")
-            handle.source_remove(source_id)
-
-        monkeypatch.setattr(core.GLib, "timeout_add_seconds", timeout_add_seconds)
-        monkeypatch.setattr(core.GLib, "source_remove", source_remove)
-
         def create_handle(safe_eyes_core: core.SafeEyesCore) -> SafeEyesCoreHandle:
             nonlocal time_machine
             nonlocal handle
@@ -125,6 +134,7 @@ class TestSafeEyesCore:
                 raise Exception("only one handle is allowed per test call")
 
             handle = SafeEyesCoreHandle(safe_eyes_core, time_machine)
+            safe_eyes_core.clock = handle
 
             return handle
 
@@ -1044,3 +1054,523 @@ class TestSafeEyesCore:
         safe_eyes_core.stop()
 
         assert ctx["state"] == model.State.STOPPED
+
+    def test_monotonic_scheduler_absorbs_hook_time(
+        self,
+        sequential_threading: SequentialThreadingFixture,
+        time_machine: TimeMachineFixture,
+    ):
+        """Time spent in hooks must not push the following phases back."""
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API), locale="en_US", version="0.0.0", session={}
+        )
+        config = model.Config(
+            user_config={
+                "short_breaks": [
+                    {"name": "break 1"},
+                    {"name": "break 2"},
+                ],
+                "long_breaks": [],
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 15,
+                "pre_break_warning_time": 10,
+                "random_order": False,
+                "postpone_duration": 5,
+                "monotonic_scheduler": True,
+            },
+            system_config={},
+        )
+
+        self.assert_datetime("2024-08-25T13:00:00")
+
+        safe_eyes_core = core.SafeEyesCore(ctx)
+
+        sequential_threading_handle = sequential_threading(safe_eyes_core)
+
+        safe_eyes_core.initialize(config)
+
+        def slow_pre_break(break_obj):
+            # a plugin which blocks the main loop for 3 seconds
+            sequential_threading_handle.sleep(3)
+            return True
+
+        safe_eyes_core.on_pre_break += slow_pre_break
+
+        self.run_next_break(
+            sequential_threading_handle,
+            time_machine,
+            safe_eyes_core,
+            ctx,
+            15,
+            "translated!: break 1",
+            initial=True,
+        )
+
+        # 15min short_break_interval, 10 seconds pre_break_warning_time,
+        # 15 seconds short_break_duration - the slow hook is absorbed by the
+        # pre break warning time
+        self.assert_datetime("2024-08-25T13:15:25")
+
+        assert safe_eyes_core.drift.count > 0
+        assert safe_eyes_core.drift.worst == 0
+
+        safe_eyes_core.stop()
+
+        assert ctx["state"] == model.State.STOPPED
+
+    def test_countdown_uses_single_timer(
+        self,
+        sequential_threading: SequentialThreadingFixture,
+        time_machine: TimeMachineFixture,
+    ):
+        """The whole countdown of a break is driven by one timer source."""
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API), locale="en_US", version="0.0.0", session={}
+        )
+        config = model.Config(
+            user_config={
+                "short_breaks": [
+                    {"name": "break 1"},
+                    {"name": "break 2"},
+                ],
+                "long_breaks": [],
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 30,
+                "pre_break_warning_time": 10,
+                "random_order": False,
+                "postpone_duration": 5,
+            },
+            system_config={},
+        )
+
+        safe_eyes_core = core.SafeEyesCore(ctx)
+
+        sequential_threading_handle = sequential_threading(safe_eyes_core)
+
+        safe_eyes_core.initialize(config)
+
+        on_count_down = mock.Mock()
+        safe_eyes_core.on_count_down += on_count_down
+
+        safe_eyes_core.start()
+        # pre break
+        sequential_threading_handle.next()
+        # start of the break
+        sequential_threading_handle.next()
+
+        assert ctx["state"] == model.State.BREAK
+        sources = sequential_threading_handle.sources
+
+        for i in range(30):
+            sequential_threading_handle.next()
+
+        assert on_count_down.call_count == 30
+        assert on_count_down.call_args_list[0] == mock.call(30, 0)
+        assert on_count_down.call_args_list[-1] == mock.call(1, 29)
+        # the countdown source is reused, only the next break needs a new one
+        assert sequential_threading_handle.sources == sources + 1
+
+        safe_eyes_core.stop()
+
+        assert ctx["state"] == model.State.STOPPED
+
+    def test_simulated_day(self) -> None:
+        """Run a whole working day with skips, postpones and an idle pause in
+        virtual time.
+        """
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API), locale="en_US", version="0.0.0", session={}
+        )
+        config = model.Config(
+            user_config={
+                "short_breaks": [
+                    {"name": "break 1"},
+                    {"name": "break 2"},
+                    {"name": "break 3"},
+                    {"name": "break 4"},
+                ],
+                "long_breaks": [
+                    {"name": "long break 1"},
+                    {"name": "long break 2"},
+                    {"name": "long break 3"},
+                ],
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 15,
+                "pre_break_warning_time": 10,
+                "random_order": False,
+                "postpone_duration": 5,
+                "monotonic_scheduler": True,
+            },
+            system_config={},
+        )
+
+        sim = clock.SimulatedClock(
+            datetime.datetime.fromisoformat("2024-08-25T09:00:00")
+        )
+        safe_eyes_core = core.SafeEyesCore(ctx, sim)
+        safe_eyes_core.initialize(config)
+
+        breaks: list[tuple[str, str]] = []
+
+        def on_start_break(break_obj):
+            breaks.append((sim.now().time().isoformat(), break_obj.name))
+            if len(breaks) == 3:
+                # user skips after 3 seconds
+                sim.timeout_add_seconds(3, lambda: safe_eyes_core.skip())
+            elif len(breaks) == 5:
+                # user postpones after 3 seconds
+                sim.timeout_add_seconds(3, lambda: safe_eyes_core.postpone())
+            return True
+
+        safe_eyes_core.on_start_break += on_start_break
+
+        safe_eyes_core.start()
+        sim.advance(3 * 60 * 60)
+
+        # idle for an hour over lunch, simulate behaviour of smartpause plugin
+        safe_eyes_core.stop(is_resting=True)
+        assert ctx["state"] == model.State.RESTING
+        sim.advance(60 * 60)
+        safe_eyes_core.start()
+
+        sim.advance(4 * 60 * 60)
+        safe_eyes_core.stop()
+
+        assert ctx["state"] == model.State.STOPPED
+        assert sim.now() == datetime.datetime.fromisoformat("2024-08-25T17:00:00")
+        assert sim.pending() == 0
+
+        assert breaks[:7] == [
+            ("09:15:10", "translated!: break 1"),
+            ("09:30:35", "translated!: break 2"),
+            ("09:46:00", "translated!: break 3"),
+            # skipped after 3 seconds
+            ("10:01:13", "translated!: break 4"),
+            ("10:16:38", "translated!: long break 1"),
+            # postponed after 3 seconds, by 5 minutes
+            ("10:21:51", "translated!: long break 1"),
+            ("10:38:01", "translated!: break 1"),
+        ]
+
+        # no breaks while idle, and the pause replaced the next long break
+        assert breaks[11] == ("11:55:51", "translated!: break 1")
+        assert breaks[12:17] == [
+            ("13:15:10", "translated!: break 2"),
+            ("13:30:35", "translated!: break 3"),
+            ("13:46:00", "translated!: break 4"),
+            ("14:01:25", "translated!: break 1"),
+            ("14:16:50", "translated!: long break 3"),
+        ]
+        assert len(breaks) == 27
+
+        assert safe_eyes_core.drift.worst == 0
+
+    def test_get_break_time(
+        self,
+        sequential_threading: SequentialThreadingFixture,
+        time_machine: TimeMachineFixture,
+    ):
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API), locale="en_US", version="0.0.0", session={}
+        )
+        config = model.Config(
+            user_config={
+                "short_breaks": [
+                    {"name": "break 1"},
+                    {"name": "break 2"},
+                    {"name": "break 3"},
+                    {"name": "break 4"},
+                ],
+                "long_breaks": [
+                    {"name": "long break 1"},
+                    {"name": "long break 2"},
+                    {"name": "long break 3"},
+                ],
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 15,
+                "pre_break_warning_time": 10,
+                "random_order": False,
+                "postpone_duration": 5,
+            },
+            system_config={},
+        )
+
+        safe_eyes_core = core.SafeEyesCore(ctx)
+        sequential_threading(safe_eyes_core)
+        safe_eyes_core.initialize(config)
+
+        assert safe_eyes_core.get_break_time() is None
+
+        safe_eyes_core.start()
+
+        def at(time: str) -> datetime.datetime:
+            return datetime.datetime.fromisoformat(time)
+
+        assert safe_eyes_core.get_break_time() == at("2024-08-25T13:15:00")
+        # the same times test_full_run_with_defaults reaches the pre-breaks at
+        assert safe_eyes_core.get_break_time(model.BreakType.LONG_BREAK) == at(
+            "2024-08-25T14:16:40"
+        )
+        assert [
+            (break_obj.name, time) for break_obj, time in safe_eyes_core.get_timeline(3)
+        ] == [
+            ("translated!: break 1", at("2024-08-25T13:15:00")),
+            ("translated!: break 2", at("2024-08-25T13:30:25")),
+            ("translated!: break 3", at("2024-08-25T13:45:50")),
+        ]
+
+        safe_eyes_core.stop()
+
+    def test_trace(self) -> None:
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API), locale="en_US", version="0.0.0", session={}
+        )
+        config = model.Config(
+            user_config={
+                "short_breaks": [{"name": "break 1"}],
+                "long_breaks": [],
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 2,
+                "pre_break_warning_time": 10,
+                "random_order": False,
+                "postpone_duration": 5,
+                "monotonic_scheduler": True,
+            },
+            system_config={},
+        )
+
+        sim = clock.SimulatedClock(
+            datetime.datetime.fromisoformat("2024-08-25T09:00:00")
+        )
+        safe_eyes_core = core.SafeEyesCore(ctx, sim)
+        safe_eyes_core.initialize(config)
+
+        def on_pre_break(break_obj):
+            sim.sleep(0.5)
+            return True
+
+        safe_eyes_core.on_pre_break += on_pre_break
+
+        safe_eyes_core.start()
+        sim.advance(15 * 60 + 15)
+        safe_eyes_core.stop()
+
+        T = trace.TraceEvent
+        assert safe_eyes_core.trace.entries() == [
+            (0, T.STATE, "WAITING", 0),
+            (0, T.STATE, "WAITING", 0),
+            (0, T.HOOK, "on_update_next_break", 0),
+            (0, T.ARM, "__do_pre_break", 900),
+            (900, T.FIRE, "__do_pre_break", 900),
+            (900, T.STATE, "PRE_BREAK", 0),
+            # the hook took half a second
+            (900, T.HOOK, "on_pre_break", 0.5),
+            (900.5, T.ARM, "__do_start_break", 910),
+            (910, T.FIRE, "__do_start_break", 910),
+            (910, T.HOOK, "on_start_break", 0),
+            (910, T.STATE, "BREAK", 0),
+            (910, T.HOOK, "start_break", 0),
+            (910, T.HOOK, "on_count_down", 0),
+            (910, T.ARM, "__cycle_break_countdown", 911),
+            (911, T.FIRE, "__cycle_break_countdown", 911),
+            (911, T.HOOK, "on_count_down", 0),
+            (912, T.FIRE, "__cycle_break_countdown", 912),
+            (912, T.HOOK, "on_stop_break", 0),
+            (912, T.ARM, "__scheduler_job", 912),
+            (912, T.FIRE, "__scheduler_job", 912),
+            (912, T.STATE, "WAITING", 0),
+            (912, T.HOOK, "on_update_next_break", 0),
+            (912, T.ARM, "__do_pre_break", 1812),
+            (915, T.STATE, "STOPPED", 0),
+        ]
+
+    def run_until_restart(
+        self,
+        session: dict,
+        seconds: float,
+        downtime: float,
+        checkpoint_keys: typing.Iterable[str] = (),
+    ) -> tuple[core.SafeEyesCore, clock.SimulatedClock, list[tuple[str, str]]]:
+        """Run a core for the given seconds, then start a new core on the same
+        session after the downtime, without the given keys of the checkpoint.
+
+        Returns the new core, its clock and the breaks it showed.
+        """
+        config = model.Config(
+            user_config={
+                "short_breaks": [{"name": "break 1"}, {"name": "break 2"}],
+                "long_breaks": [{"name": "long break 1"}],
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 15,
+                "pre_break_warning_time": 10,
+                "random_order": False,
+                "postpone_duration": 5,
+                "monotonic_scheduler": True,
+            },
+            system_config={},
+        )
+        start = datetime.datetime.fromisoformat("2024-08-25T09:00:00")
+
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API),
+            locale="en_US",
+            version="0.0.0",
+            session=session,
+        )
+        sim = clock.SimulatedClock(start)
+        crashed = core.SafeEyesCore(ctx, sim)
+        crashed.initialize(config)
+        crashed.start(resume=True)
+        sim.advance(seconds)
+        # crash without stopping
+        for key in checkpoint_keys:
+            del session["checkpoint"][key]
+
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API),
+            locale="en_US",
+            version="0.0.0",
+            session=session,
+        )
+        sim = clock.SimulatedClock(
+            start + datetime.timedelta(seconds=seconds + downtime)
+        )
+        safe_eyes_core = core.SafeEyesCore(ctx, sim)
+        safe_eyes_core.initialize(config)
+        breaks: list[tuple[str, str]] = []
+
+        def start_break(break_obj):
+            breaks.append((sim.now().time().isoformat(), break_obj.name))
+            return True
+
+        def stop_break():
+            breaks.append((sim.now().time().isoformat(), "stop"))
+            return True
+
+        safe_eyes_core.start_break += start_break
+        safe_eyes_core.on_stop_break += stop_break
+        safe_eyes_core.start(resume=True)
+        return safe_eyes_core, sim, breaks
+
+    def test_update_keeps_schedule(self) -> None:
+        session: dict = {}
+        safe_eyes_core, sim, breaks = self.run_until_restart(session, 5 * 60, 0)
+        sim.advance(5 * 60)
+
+        safe_eyes_core.update(
+            model.Config(
+                user_config={
+                    "pre_break_warning_time": 20,
+                    "postpone_duration": 10,
+                    "postpone_unit": "seconds",
+                    "monotonic_scheduler": False,
+                },
+                system_config={},
+            )
+        )
+
+        assert safe_eyes_core.default_postpone_duration == 10
+        assert safe_eyes_core.get_break_time() == datetime.datetime.fromisoformat(
+            "2024-08-25T09:15:00"
+        )
+        # the timeline counts the new warning time from the current break on
+        assert [time for _, time in safe_eyes_core.get_timeline(2)] == [
+            datetime.datetime.fromisoformat("2024-08-25T09:15:00"),
+            datetime.datetime.fromisoformat("2024-08-25T09:30:35"),
+        ]
+
+        sim.advance(10 * 60)
+
+        assert breaks == [
+            ("09:15:20", "translated!: break 1"),
+            ("09:15:35", "stop"),
+        ]
+
+    def test_resume_waiting(self) -> None:
+        session: dict = {}
+        safe_eyes_core, sim, breaks = self.run_until_restart(session, 10 * 60, 60)
+
+        assert session["checkpoint"]["state"] == "WAITING"
+        # the break keeps its time instead of waiting a full interval again
+        assert safe_eyes_core.get_break_time() == datetime.datetime.fromisoformat(
+            "2024-08-25T09:15:00"
+        )
+
+        sim.advance(10 * 60)
+
+        assert breaks == [
+            ("09:15:10", "translated!: break 1"),
+            ("09:15:25", "stop"),
+        ]
+
+    def test_resume_break(self) -> None:
+        session: dict = {}
+        safe_eyes_core, sim, breaks = self.run_until_restart(session, 15 * 60 + 15, 5)
+
+        assert session["checkpoint"]["state"] == "BREAK"
+        assert safe_eyes_core.context.state == model.State.BREAK
+        assert safe_eyes_core.get_break_time() == datetime.datetime.fromisoformat(
+            "2024-08-25T09:15:00"
+        )
+
+        sim.advance(20 * 60)
+
+        # the break continues and ends on time
+        assert breaks == [
+            ("09:15:20", "translated!: break 1"),
+            ("09:15:25", "stop"),
+            ("09:30:35", "translated!: break 2"),
+            ("09:30:50", "stop"),
+        ]
+
+    def test_resume_break_of_old_checkpoint(self) -> None:
+        session: dict = {}
+        safe_eyes_core, sim, breaks = self.run_until_restart(
+            session, 15 * 60 + 15, 5, checkpoint_keys=["next_break"]
+        )
+
+        # the time of the break is derived from its end
+        assert safe_eyes_core.get_break_time() == datetime.datetime.fromisoformat(
+            "2024-08-25T09:15:00"
+        )
+
+    def test_resume_after_break_ended(self) -> None:
+        session: dict = {}
+        safe_eyes_core, sim, breaks = self.run_until_restart(session, 15 * 60 + 15, 60)
+
+        sim.advance(20 * 60)
+
+        # the next break keeps its time
+        assert breaks == [
+            ("09:30:35", "translated!: break 2"),
+            ("09:30:50", "stop"),
+        ]
+
+    def test_resume_after_long_downtime(self) -> None:
+        session: dict = {}
+        safe_eyes_core, sim, breaks = self.run_until_restart(session, 10 * 60, 60 * 60)
+
+        # missed break 1 by far more than its duration, which counts as rest
+        assert safe_eyes_core.context.state == model.State.WAITING
+        assert safe_eyes_core.get_break_time() == datetime.datetime.fromisoformat(
+            "2024-08-25T10:25:00"
+        )
+
+        sim.advance(20 * 60)
+
+        assert breaks == [
+            ("10:25:10", "translated!: break 1"),
+            ("10:25:25", "stop"),
+        ]
@@ -0,0 +1,180 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import pytest
+
+from safeeyes import clock
+from safeeyes import core
+from safeeyes import host
+from safeeyes import model
+
+
+class RecordingPresenter(host.Presenter):
+    def __init__(self, sim: clock.SimulatedClock) -> None:
+        self.sim = sim
+        self.events: list[tuple[str, str, str]] = []
+
+    def start_break(self, session_id: str, break_obj: model.Break) -> None:
+        self.events.append((session_id, self.time(), break_obj.name))
+
+    def stop_break(self, session_id: str) -> None:
+        self.events.append((session_id, self.time(), "stop"))
+
+    def time(self) -> str:
+        return self.sim.now().time().isoformat()
+
+
+class TestSchedulerHost:
+    @pytest.fixture(autouse=True)
+    def monkeypatch_translations(self, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setattr(core, "_", lambda message: message, raising=False)
+        monkeypatch.setattr(model, "_", lambda message: message, raising=False)
+
+    def get_config(self) -> model.Config:
+        return model.Config(
+            user_config={
+                "short_breaks": [{"name": "break 1"}, {"name": "break 2"}],
+                "long_breaks": [{"name": "long break 1"}],
+                "short_break_interval": 15,
+                "long_break_interval": 75,
+                "long_break_duration": 60,
+                "short_break_duration": 15,
+                "pre_break_warning_time": 10,
+                "random_order": False,
+                "postpone_duration": 5,
+                "monotonic_scheduler": True,
+            },
+            system_config={},
+        )
+
+    def get_host(self) -> tuple[host.SchedulerHost, RecordingPresenter]:
+        sim = clock.SimulatedClock(
+            datetime.datetime.fromisoformat("2024-08-25T09:00:00")
+        )
+        presenter = RecordingPresenter(sim)
+        return host.SchedulerHost(presenter, sim, version="0.0.0"), presenter
+
+    def test_many_sessions(self) -> None:
+        scheduler_host, presenter = self.get_host()
+        sim = scheduler_host.clock
+        assert isinstance(sim, clock.SimulatedClock)
+        config = self.get_config()
+
+        for i in range(500):
+            scheduler_host.add_session("user{}".format(i), config)
+            sim.advance(1)
+
+        assert len(scheduler_host) == 500
+        # one pending wakeup per session
+        assert sim.pending() == 500
+
+        sim.advance(31 * 60)
+
+        for i in (0, 1, 499):
+            events = [event[1:] for event in presenter.events if event[0] == f"user{i}"]
+            start = datetime.datetime.fromisoformat("2024-08-25T09:00:00")
+            start += datetime.timedelta(seconds=i)
+
+            def at(seconds: int) -> str:
+                return (start + datetime.timedelta(seconds=seconds)).time().isoformat()
+
+            assert events == [
+                (at(910), "break 1"),
+                (at(925), "stop"),
+                (at(1835), "break 2"),
+                (at(1850), "stop"),
+            ]
+
+        assert len(presenter.events) == 4 * 500
+
+    def test_remove_session(self) -> None:
+        scheduler_host, presenter = self.get_host()
+        sim = scheduler_host.clock
+        assert isinstance(sim, clock.SimulatedClock)
+
+        session = scheduler_host.add_session("a", self.get_config())
+        scheduler_host.add_session("b", self.get_config())
+        assert session.status == "Next break at 09:15"
+
+        scheduler_host.remove_session("a")
+
+        assert "a" not in scheduler_host
+        assert session.context.state == model.State.QUIT
+        assert sim.pending() == 1
+
+        sim.advance(16 * 60)
+
+        assert [event[0] for event in presenter.events] == ["b", "b"]
+
+    def test_session_dict(self) -> None:
+        scheduler_host, presenter = self.get_host()
+        session: dict = {}
+
+        scheduler_host.add_session("a", self.get_config(), session)
+
+        # the state is saved into the dict of the caller, even an empty one
+        assert "checkpoint" in session
+        assert "break_queue" in session
+
+    def test_session_api(self) -> None:
+        scheduler_host, presenter = self.get_host()
+        sim = scheduler_host.clock
+        assert isinstance(sim, clock.SimulatedClock)
+
+        session = scheduler_host.add_session("a", self.get_config())
+        api = session.context.api
+
+        sim.advance(60)
+        api.take_break(model.BreakType.LONG_BREAK)
+        sim.advance(15)
+
+        assert presenter.events == [("a", "09:01:00", "long break 1")]
+
+        api.disable_safeeyes("Paused")
+        sim.advance(0)
+
+        assert api.status() == "Paused"
+        assert sim.pending() == 0
+
+        api.enable_safeeyes()
+        api.quit()
+        sim.advance(0)
+
+        assert "a" not in scheduler_host
+        assert sim.pending() == 0
+
+    def test_run_until_stopped(self) -> None:
+        scheduler_host = host.SchedulerHost(host.Presenter())
+        fired: list[str] = []
+
+        def first() -> bool:
+            fired.append("first")
+            return False
+
+        def second() -> bool:
+            fired.append("second")
+            scheduler_host.stop()
+            return False
+
+        scheduler_host.clock.timeout_add(20, second)
+        scheduler_host.clock.timeout_add(10, first)
+        scheduler_host.run()
+
+        assert fired == ["first", "second"]
+        assert scheduler_host.clock.next_deadline() is None
@@ -16,8 +16,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import copy
+import os
 import pytest
+import pickle
 import random
+import threading
 import typing
 from unittest import mock
 from safeeyes import context, model
@@ -50,6 +55,24 @@ class TestBreak:
         assert not b.is_short_break()
         assert b.is_long_break()
 
+    def test_break_immutable(self) -> None:
+        b = model.Break(
+            break_type=model.BreakType.SHORT_BREAK,
+            name="test break",
+            time=15,
+            duration=15,
+            image=None,
+            plugins=["audiblealert"],
+        )
+
+        with pytest.raises(AttributeError):
+            b.time = 10
+
+        copied = pickle.loads(pickle.dumps(b))
+        assert copied.name == "test break"
+        assert copied.plugin_enabled("audiblealert", False)
+        assert not copied.plugin_enabled("trayicon", True)
+
 
 class TestBreakQueue:
     def test_create_empty(self) -> None:
@@ -149,7 +172,10 @@ class TestBreakQueue:
         return bq
 
     def get_bq_full(
-        self, monkeypatch: pytest.MonkeyPatch, random_seed: typing.Optional[int] = None
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        random_seed: typing.Optional[int] = None,
+        session: typing.Optional[dict] = None,
     ) -> model.BreakQueue:
         if random_seed is not None:
             random.seed(random_seed)
@@ -181,7 +207,10 @@ class TestBreakQueue:
         )
 
         ctx = context.Context(
-            api=mock.Mock(spec=context.API), locale="en_US", version="0.0.0", session={}
+            api=mock.Mock(spec=context.API),
+            locale="en_US",
+            version="0.0.0",
+            session=session if session is not None else {},
         )
 
         bq = model.BreakQueue.create(config, ctx)
@@ -227,7 +256,7 @@ class TestBreakQueue:
     def test_only_short_next_break_random(
         self, monkeypatch: pytest.MonkeyPatch
     ) -> None:
-        random_seed = 5
+        random_seed = 3
         bq = self.get_bq_only_short(monkeypatch, random_seed)
 
         breaks = []
@@ -293,7 +322,7 @@ class TestBreakQueue:
         assert bq.next().name == "translated!: long break 3"
 
     def test_only_long_next_break_random(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        random_seed = 5
+        random_seed = 3
         bq = self.get_bq_only_long(monkeypatch, random_seed)
 
         breaks = []
@@ -448,7 +477,7 @@ class TestBreakQueue:
         assert bq.next().name == "translated!: long break 3"
 
     def test_full_next_break_random(self, monkeypatch: pytest.MonkeyPatch) -> None:
-        random_seed = 5
+        random_seed = 3
         bq = self.get_bq_full(monkeypatch, random_seed)
 
         first = True
@@ -503,3 +532,577 @@ class TestBreakQueue:
                 return True
 
         return False
+
+    def test_timeline_matches_next(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch)
+
+        timeline = [entry.break_obj.name for entry in bq.get_timeline(12)]
+
+        breaks = [bq.get_break().name]
+        for i in range(11):
+            breaks.append(bq.next().name)
+
+        assert timeline == breaks
+        assert timeline[4] == "translated!: long break 1"
+
+    def test_timeline_matches_next_random(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        bq = self.get_bq_full(monkeypatch, random_seed=5)
+
+        timeline = [entry.break_obj.name for entry in bq.get_timeline(40)]
+
+        breaks = [bq.get_break().name]
+        for i in range(39):
+            breaks.append(bq.next().name)
+
+        assert timeline == breaks
+
+    def test_restore_from_session(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch, random_seed=5)
+        for i in range(17):
+            bq.next()
+        bq.skip_long_break()
+        bq.next()
+
+        # the order is restored rather than shuffled again
+        restored = self.get_bq_full(
+            monkeypatch, random_seed=0, session=bq.context.session
+        )
+
+        random.seed(1)
+        expected = [(entry.break_obj.name, entry.wait) for entry in bq.get_timeline(40)]
+        random.seed(1)
+        timeline = restored.get_timeline(40)
+        assert [(entry.break_obj.name, entry.wait) for entry in timeline] == expected
+
+    def test_breaks_shared(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch)
+        other = self.get_bq_full(monkeypatch)
+
+        # queues with the same configuration share the breaks, but not the
+        # position in the queue
+        assert bq.get_break() is other.get_break()
+        bq.next()
+        assert bq.get_break() is not other.get_break()
+        assert other.next() is bq.get_break()
+
+    def test_shuffle_seed(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch, random_seed=5)
+        seed = bq.context.session["shuffle_seed"]
+
+        # the same seed gives the same order, whatever the random state
+        other = self.get_bq_full(
+            monkeypatch, random_seed=6, session={"shuffle_seed": seed}
+        )
+
+        assert [entry.break_obj.name for entry in bq.get_timeline(60)] == [
+            entry.break_obj.name for entry in other.get_timeline(60)
+        ]
+
+    def test_permute(self) -> None:
+        for size in (1, 2, 3, 7, 64, 500):
+            for key in (0, 1, 12345):
+                order = [model._permute(key, size, i) for i in range(size)]
+                assert sorted(order) == list(range(size))
+
+    def test_restore_changed_config(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch)
+        bq.next()
+        bq.next()
+        session = bq.context.session
+        session["break_queue"]["signature"] = "changed"
+
+        # falls back to the name of the last break
+        restored = self.get_bq_full(monkeypatch, session=session)
+
+        assert restored.get_break().name == "translated!: break 3"
+        assert restored.next().name == "translated!: break 4"
+
+    def test_restore_invalid_session(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch)
+        bq.next()
+        session = bq.context.session
+        session["break_queue"]["index"] = [10, 0]
+        session["break"] = "removed break"
+
+        restored = self.get_bq_full(monkeypatch, session=session)
+
+        assert restored.get_break().name == "translated!: break 1"
+
+    def test_timeline_start(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch)
+
+        timeline = bq.get_timeline(6)
+
+        assert [entry.wait for entry in timeline] == [15, 15, 15, 15, 15, 15]
+        # 15 minutes interval and 15 seconds break, 60 seconds for the long break
+        assert [bq.seconds_until(entry) for entry in timeline] == [
+            0,
+            915,
+            1830,
+            2745,
+            3660,
+            4620,
+        ]
+
+        long_break = bq.find_next(model.BreakType.LONG_BREAK)
+        assert long_break is timeline[4]
+
+        bq.next()
+
+        assert bq.find_next() is timeline[1]
+        assert bq.find_next(model.BreakType.LONG_BREAK) is timeline[4]
+        assert bq.seconds_until(timeline[4]) == 2745
+
+    def test_timeline_skip_long_break(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_full(monkeypatch)
+
+        assert bq.next().name == "translated!: break 2"
+        assert bq.next().name == "translated!: break 3"
+
+        long_break = bq.find_next(model.BreakType.LONG_BREAK)
+        assert long_break is not None
+        assert long_break.break_obj.name == "translated!: long break 1"
+        assert bq.seconds_until(long_break) == 1830
+
+        bq.skip_long_break()
+
+        long_break = bq.find_next(model.BreakType.LONG_BREAK)
+        assert long_break is not None
+        assert long_break.break_obj.name == "translated!: long break 1"
+        # break 3, break 4, break 1, break 2, then the long break
+        assert bq.seconds_until(long_break) == 4 * 915
+        assert [entry.break_obj.name for entry in bq.get_timeline(5)] == [
+            "translated!: break 3",
+            "translated!: break 4",
+            "translated!: break 1",
+            "translated!: break 2",
+            "translated!: long break 1",
+        ]
+
+    def get_bq_tiers(self, monkeypatch: pytest.MonkeyPatch) -> model.BreakQueue:
+        monkeypatch.setattr(model, "_", lambda message: message, raising=False)
+
+        config = model.Config(
+            user_config={
+                "short_breaks": [{"name": "short"}],
+                "long_breaks": [{"name": "long"}],
+                "break_tiers": [
+                    {
+                        "type": "long",
+                        "interval": 240,
+                        "duration": 900,
+                        "breaks": [{"name": "extra long"}],
+                    },
+                    {
+                        "type": "short",
+                        "interval": 5,
+                        "duration": 10,
+                        "breaks": [{"name": "micro"}],
+                    },
+                ],
+                "short_break_interval": 20,
+                "long_break_interval": 60,
+                "long_break_duration": 60,
+                "short_break_duration": 15,
+                "random_order": False,
+            },
+            system_config={},
+        )
+
+        ctx = context.Context(
+            api=mock.Mock(spec=context.API), locale="en_US", version="0.0.0", session={}
+        )
+
+        bq = model.BreakQueue.create(config, ctx)
+
+        assert bq is not None
+
+        return bq
+
+    def test_tiers(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_tiers(monkeypatch)
+
+        timeline = bq.get_timeline(48)
+
+        hour = ["micro"] * 3 + ["short"] + ["micro"] * 3 + ["short"]
+        hour += ["micro"] * 3 + ["long"]
+        assert [entry.break_obj.name for entry in timeline] == (
+            hour * 3 + hour[:-1] + ["extra long"]
+        )
+        # every break is due 5 minutes after the previous one
+        assert {entry.wait for entry in timeline} == {5}
+
+        long_break = bq.find_next(model.BreakType.LONG_BREAK)
+        assert long_break is timeline[11]
+        assert bq.next(model.BreakType.LONG_BREAK).name == "long"
+
+    def test_tiers_skip_long_break(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_tiers(monkeypatch)
+        for i in range(30):
+            bq.next()
+        assert bq.get_break().name == "micro"
+
+        # resting for 2 minutes restarts the long break, but not the extra
+        # long break
+        bq.skip_long_break(120)
+
+        names = [entry.break_obj.name for entry in bq.get_timeline(30)]
+        assert names.index("long") == 11
+        assert names.index("extra long") == 17
+
+    def test_find_next_missing_type(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        bq = self.get_bq_only_short(monkeypatch)
+
+        assert bq.find_next(model.BreakType.LONG_BREAK) is None
+        assert bq.get_break_with_type(model.BreakType.LONG_BREAK) is None
+
+
+class TestEventHook:
+    def test_priority(self) -> None:
+        hook = model.EventHook("test")
+        calls: list[str] = []
+
+        def handler(name: str, result: bool = True) -> typing.Callable:
+            def call(value: int) -> bool:
+                calls.append("{} {}".format(name, value))
+                return result
+
+            call.__qualname__ = name
+            return call
+
+        hook += handler("default")
+        hook.add(handler("late"), priority=-1)
+        hook.add(handler("first"), priority=10)
+        hook += handler("default 2")
+
+        assert hook.fire(1)
+        assert calls == ["first 1", "default 1", "default 2 1", "late 1"]
+
+        calls.clear()
+        hook.add(handler("stop", False), priority=5)
+        assert not hook.fire(2)
+        assert calls == ["first 2", "stop 2"]
+
+        stats = {stats.name: stats for stats in hook.stats()}
+        assert [stats.name for stats in hook.stats()] == [
+            "first",
+            "stop",
+            "default",
+            "default 2",
+            "late",
+        ]
+        assert stats["first"].calls == 2
+        assert stats["stop"].calls == 1
+        assert stats["late"].calls == 1
+        assert stats["first"].seconds >= 0
+
+    def test_remove_while_firing(self) -> None:
+        hook = model.EventHook("test")
+        calls: list[str] = []
+
+        def first() -> bool:
+            calls.append("first")
+            hook.remove(first)
+            return True
+
+        def second() -> bool:
+            calls.append("second")
+            return True
+
+        hook += first
+        hook += second
+
+        assert hook.fire()
+        assert hook.fire()
+        assert calls == ["first", "second", "second"]
+
+        with pytest.raises(ValueError):
+            hook -= first
+
+    def test_background(self) -> None:
+        hook = model.EventHook("test", deadline=5)
+        threads: list[str] = []
+
+        def threaded(value: int) -> bool:
+            threads.append(threading.current_thread().name)
+            return value > 0
+
+        async def coroutine(value: int) -> bool:
+            await asyncio.sleep(0)
+            return True
+
+        hook.add(threaded, background=True)
+        hook += coroutine
+
+        assert hook.fire(1)
+        assert hook.fire(1)
+        assert threads[0].startswith("EventHook test")
+        assert all(stats.background for stats in hook.stats())
+        assert [stats.calls for stats in hook.stats()] == [2, 2]
+        # the coroutine may be cancelled before it started
+        assert not hook.fire(0)
+        hook.shutdown()
+
+    def test_background_deadline(self) -> None:
+        hook = model.EventHook("test", deadline=0.01)
+        release = threading.Event()
+
+        def slow() -> bool:
+            release.wait(5)
+            return False
+
+        hook.add(slow, background=True)
+
+        # the event is not held up by a handler missing the deadline
+        assert hook.fire()
+        assert hook.stats()[0].timeouts == 1
+        release.set()
+        hook.shutdown()
+
+
+class TestConfig:
+    def get_config(self) -> model.Config:
+        return model.Config(
+            user_config={
+                "short_break_interval": 15,
+                "short_breaks": [{"name": "break 1"}],
+                "strict_break": None,
+            },
+            system_config={"strict_break": False, "long_break_interval": 75},
+        )
+
+    def test_get(self) -> None:
+        config = self.get_config()
+
+        assert config.get("short_break_interval") == 15
+        # None and missing values fall back to the system config
+        assert config.get("strict_break") is False
+        assert config.get("long_break_interval") == 75
+        assert config.get("missing", 5) == 5
+
+    def test_clone_copy_on_write(self) -> None:
+        config = self.get_config()
+        clone = config.clone()
+
+        assert clone == config
+        # values are shared until they are edited
+        assert clone.get("short_breaks") is config.get("short_breaks")
+
+        clone.edit("short_breaks").append({"name": "break 2"})
+        clone.set("short_break_interval", 20)
+
+        assert config.get("short_breaks") == [{"name": "break 1"}]
+        assert config.get("short_break_interval") == 15
+        assert clone != config
+        assert config.diff(clone) == {"short_breaks", "short_break_interval"}
+
+        # changing a list in place and back compares equal again
+        clone.get("short_breaks").pop()
+        clone.set("short_break_interval", 15)
+        assert clone == config
+
+    def test_clone_layers(self) -> None:
+        config = self.get_config()
+        clones = [config]
+        for interval in range(2 * model.Config.MAX_LAYERS):
+            clones.append(clones[-1].clone())
+            clones[-1].set("long_break_interval", interval)
+
+        assert clones[-1].get("short_breaks") is config.get("short_breaks")
+        assert clones[-1].get("long_break_interval") == 2 * model.Config.MAX_LAYERS - 1
+        assert clones[-1].diff(clones[-2]) == {"long_break_interval"}
+        assert clones[-1].diff(config) == {"long_break_interval"}
+
+    def test_save(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        saved = []
+        monkeypatch.setattr(
+            model.utility, "write_json", lambda path, value: saved.append(value)
+        )
+        config = self.get_config()
+        clone = config.clone()
+        clone.set("short_break_interval", 20)
+        clone.override("strict_break", True)
+
+        clone.save()
+
+        assert clone.get("strict_break") is True
+        assert saved == [
+            {
+                "short_break_interval": 20,
+                "short_breaks": [{"name": "break 1"}],
+                "strict_break": None,
+            }
+        ]
+
+    def test_subscribe(self) -> None:
+        config = self.get_config()
+        changes: list[tuple[str, typing.Any]] = []
+
+        def callback(key: str, value: typing.Any) -> None:
+            changes.append((key, value))
+
+        config.subscribe("short_break_interval", callback)
+        config.set("short_break_interval", 20)
+        config.set("long_break_interval", 60)
+        config.override("short_break_interval", 5)
+        config.override("short_break_interval", None)
+        config.unsubscribe("short_break_interval", callback)
+        config.set("short_break_interval", 25)
+
+        assert changes == [
+            ("short_break_interval", 20),
+            ("short_break_interval", 5),
+            ("short_break_interval", 20),
+        ]
+        assert config.version("short_break_interval") == 4
+        assert config.version("long_break_interval") == 1
+        assert config.version("short_breaks") == 0
+
+    def test_take_over(self) -> None:
+        config = self.get_config()
+        changes = []
+        config.subscribe("short_break_interval", lambda *change: changes.append(change))
+        new_config = config.clone()
+        new_config.set("short_break_interval", 20)
+        new_config.set("strict_break", True)
+
+        new_config.take_over(config, config.diff(new_config))
+
+        assert changes == [("short_break_interval", 20)]
+        new_config.set("short_break_interval", 25)
+        assert changes == [("short_break_interval", 20), ("short_break_interval", 25)]
+
+    def test_load(self, tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+        config_path = str(tmp_path / "safeeyes.json")
+        monkeypatch.setattr(model.utility, "CONFIG_FILE_PATH", config_path)
+        monkeypatch.setattr(
+            model.utility, "CONFIG_STAMP_PATH", str(tmp_path / "config_stamp.json")
+        )
+        monkeypatch.setattr(
+            model.utility, "USER_PLUGINS_DIR", str(tmp_path / "plugins")
+        )
+        monkeypatch.setattr(model.utility, "create_startup_entry", mock.Mock())
+        save = model.Config.save
+        saved: list[model.Config] = []
+
+        def counting_save(config: model.Config) -> None:
+            saved.append(config)
+            save(config)
+
+        monkeypatch.setattr(model.Config, "save", counting_save)
+        merge_plugins = mock.Mock(wraps=model.utility.merge_plugins)
+        monkeypatch.setattr(model.utility, "merge_plugins", merge_plugins)
+
+        system_config = model.utility.load_json(model.utility.SYSTEM_CONFIG_FILE_PATH)
+        user_config = dict(system_config, short_break_interval="20", strict_break=True)
+        model.utility.write_json(config_path, user_config)
+
+        config = model.Config.load()
+
+        # values of the wrong type are replaced with the defaults
+        assert (
+            config.get("short_break_interval")
+            == (system_config["short_break_interval"])
+        )
+        assert config.get("strict_break") is True
+        assert config.get("plugins")
+        assert len(saved) == 1
+        assert merge_plugins.call_count == 1
+
+        # nothing changed, so nothing is merged or written
+        assert model.Config.load() == config
+        assert merge_plugins.call_count == 1
+        assert len(saved) == 1
+
+        # the file was touched but is still valid, so it is not written back
+        os.utime(config_path, ns=(0, 0))
+        assert model.Config.load() == config
+        assert merge_plugins.call_count == 2
+        assert len(saved) == 1
+        assert model.Config.load() == config
+        assert merge_plugins.call_count == 2
+
+        # upgrading a plugin rewrites its config.json, not its directory
+        plugin_dir = tmp_path / "plugins" / "myplugin"
+        plugin_dir.mkdir(parents=True)
+        (plugin_dir / "config.json").write_text("{}")
+        assert model.Config.load() == config
+        assert merge_plugins.call_count == 3
+        os.utime(tmp_path / "plugins", ns=(0, 0))
+        assert model.Config.load() == config
+        assert merge_plugins.call_count == 4
+        (plugin_dir / "config.json").write_text('{"settings": []}')
+        os.utime(tmp_path / "plugins", ns=(0, 0))
+        assert model.Config.load() == config
+        assert merge_plugins.call_count == 5
+
+    def test_migrate(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        steps: list[str] = []
+
+        def step(version: str) -> tuple[str, typing.Callable]:
+            def migration(user_config: dict, system_config: dict) -> None:
+                steps.append(version)
+                user_config[version] = True
+
+            return (version, migration)
+
+        monkeypatch.setattr(model, "MIGRATIONS_SINCE", "1.0.0")
+        monkeypatch.setattr(
+            model, "MIGRATIONS", [step("1.1.0"), step("1.2.0"), step("2.0.0")]
+        )
+        system_config = {"meta": {"config_version": "1.2.0"}, "strict_break": False}
+
+        user_config = {"meta": {"config_version": "1.0.0"}, "strict_break": True}
+        assert model._migrate(user_config, system_config)
+        # only the steps up to the version of the system config run
+        assert steps == ["1.1.0", "1.2.0"]
+        assert user_config == {
+            "meta": {"config_version": "1.2.0"},
+            "strict_break": True,
+            "1.1.0": True,
+            "1.2.0": True,
+        }
+
+        steps.clear()
+        user_config = {"meta": {"config_version": "1.1.0"}}
+        assert model._migrate(user_config, system_config)
+        assert steps == ["1.2.0"]
+
+        # no migration path, too old or newer than the system config
+        assert not model._migrate({"meta": {"config_version": "0.9.0"}}, system_config)
+        assert not model._migrate({"meta": {"config_version": "1.3.0"}}, system_config)
+        assert steps == ["1.2.0"]
+
+    def test_migrate_shipped_config(self) -> None:
+        system_config = model.utility.load_json(model.utility.SYSTEM_CONFIG_FILE_PATH)
+        # the settings of the oldest config which can be migrated
+        user_config = {
+            key: copy.deepcopy(system_config[key])
+            for key in (
+                "allow_postpone",
+                "long_break_duration",
+                "long_break_interval",
+                "long_breaks",
+                "persist_state",
+                "plugins",
+                "postpone_duration",
+                "postpone_unit",
+                "pre_break_warning_time",
+                "random_order",
+                "short_break_duration",
+                "short_break_interval",
+                "short_breaks",
+                "shortcut_disable_time",
+                "shortcut_postpone",
+                "shortcut_skip",
+                "strict_break",
+            )
+        }
+        user_config["meta"] = {"config_version": model.MIGRATIONS_SINCE}
+
+        assert model._migrate(user_config, system_config)
+
+        # every key added since then is in the saved file
+        assert user_config == system_config
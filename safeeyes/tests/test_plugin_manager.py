@@ -0,0 +1,466 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import sys
+import threading
+import time
+import typing
+from unittest import mock
+
+import pytest
+
+from safeeyes import model
+from safeeyes import plugin_manager
+from safeeyes import translations
+from safeeyes import utility
+from safeeyes.tests import benchmark
+
+PLUGIN_SOURCE = """
+calls = []
+
+
+def init(ctx, safeeyes_config, plugin_config):
+    calls.append(("init", plugin_config.get("value")))
+
+
+def enable():
+    calls.append(("enable", None))
+
+
+def disable():
+    calls.append(("disable", None))
+
+
+def on_start():
+    calls.append(("on_start", None))
+
+
+def on_stop():
+    calls.append(("on_stop", None))
+
+
+def on_pre_break(break_obj):
+    calls.append(("on_pre_break", break_obj.name))
+    return False
+
+
+def on_countdown(countdown, seconds):
+    calls.append(("on_countdown", seconds))
+
+
+def on_start_break():
+    # wrong number of arguments, never called
+    calls.append(("on_start_break", None))
+"""
+
+
+class TestHookWatchdog:
+    now: float = 0.0
+
+    @pytest.fixture(autouse=True)
+    def fake_monotonic(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(plugin_manager.time, "monotonic", lambda: self.now)
+
+    def slow(self, duration: float, result: object = True) -> object:
+        self.now += duration
+        return result
+
+    def test_slow_hooks_are_counted(self) -> None:
+        watchdog = plugin_manager.HookWatchdog(100)
+
+        assert watchdog.call("dnd", "on_pre_break", self.slow, 0.05) is True
+        assert watchdog.overruns("dnd", "on_pre_break") == 0
+
+        for _ in range(5):
+            assert watchdog.call("dnd", "on_pre_break", self.slow, 0.2) is True
+
+        assert watchdog.overruns("dnd", "on_pre_break") == 5
+        assert watchdog.overruns("dnd", "on_start_break") == 0
+        # demotion is disabled
+        assert not watchdog.is_demoted("dnd", "on_pre_break")
+
+    def test_zero_budget_disables_the_watchdog(self) -> None:
+        watchdog = plugin_manager.HookWatchdog(0, demote=True)
+
+        for _ in range(5):
+            watchdog.call("media", "on_stop_break", self.slow, 10)
+
+        assert watchdog.overruns("media", "on_stop_break") == 0
+
+    def test_repeat_offenders_are_demoted(self) -> None:
+        watchdog = plugin_manager.HookWatchdog(100, demote=True)
+
+        for _ in range(plugin_manager.SLOW_HOOK_LIMIT):
+            assert not watchdog.is_demoted("media", "on_stop_break")
+            watchdog.call("media", "on_stop_break", self.slow, 0.2)
+            # the result of these decides whether the break happens
+            watchdog.call("media", "on_pre_break", self.slow, 0.2)
+
+        assert watchdog.is_demoted("media", "on_stop_break")
+        assert not watchdog.is_demoted("media", "on_pre_break")
+
+        called = threading.Event()
+        threads: list[str] = []
+
+        def on_stop_break() -> bool:
+            threads.append(threading.current_thread().name)
+            called.set()
+            return True
+
+        assert watchdog.call("media", "on_stop_break", on_stop_break) is None
+        assert called.wait(5)
+        assert threads[0].startswith("Plugin media")
+        assert threads[0] != threading.current_thread().name
+
+        watchdog.shutdown()
+        assert not watchdog.is_demoted("media", "on_stop_break")
+
+
+ASYNC_PLUGIN_SOURCE = """
+import asyncio
+
+calls = []
+
+
+async def enable():
+    # must not be async, never called
+    calls.append(("enable", None))
+
+
+async def on_pre_break(break_obj):
+    try:
+        # the break duration is the time to wait, in milliseconds
+        await asyncio.sleep(break_obj.duration / 1000)
+    except asyncio.CancelledError:
+        calls.append(("cancelled", break_obj.name))
+        raise
+    calls.append(("on_pre_break", break_obj.name))
+    return break_obj.name == "skip"
+
+
+async def on_countdown(countdown, seconds):
+    calls.append(("on_countdown", seconds))
+
+
+async def get_widget_title(break_obj):
+    await asyncio.sleep(0.01)
+    return "title"
+
+
+async def get_widget_content(break_obj):
+    return "content"
+
+
+async def on_exit():
+    # longer than the deadline of the hooks
+    await asyncio.sleep(1.2)
+    calls.append(("on_exit", None))
+"""
+
+PLUGIN_IDS = ("reload_a", "reload_b", "reload_c", "reload_lazy", "reload_required")
+ASYNC_PLUGIN_IDS = ("async_a", "async_b")
+
+
+class TestPluginManager:
+    @pytest.fixture(autouse=True)
+    def plugins_dir(self, tmp_path, monkeypatch: pytest.MonkeyPatch):
+        for plugin_id in PLUGIN_IDS + ASYNC_PLUGIN_IDS:
+            plugin_config = dict(benchmark.PLUGIN_CONFIG)
+            if plugin_id in ("reload_lazy", "reload_required"):
+                plugin_config["hooks"] = ["on_pre_break", "on_stop"]
+            if plugin_id == "reload_required":
+                plugin_config["required_plugin"] = True
+            plugin_dir = tmp_path / plugin_id
+            plugin_dir.mkdir()
+            (plugin_dir / "plugin.py").write_text(
+                ASYNC_PLUGIN_SOURCE if plugin_id in ASYNC_PLUGIN_IDS else PLUGIN_SOURCE
+            )
+            (plugin_dir / "config.json").write_text(json.dumps(plugin_config))
+        monkeypatch.setattr(utility, "USER_PLUGINS_DIR", str(tmp_path))
+        monkeypatch.syspath_prepend(str(tmp_path))
+        yield
+        for plugin_id in PLUGIN_IDS + ASYNC_PLUGIN_IDS:
+            sys.modules.pop(plugin_id, None)
+            sys.modules.pop(plugin_id + ".plugin", None)
+            sys.modules.pop(plugin_id + ".dependency_checker", None)
+
+    def calls(self, plugin_id: str) -> list[tuple[str, typing.Any]]:
+        module = sys.modules[plugin_id + ".plugin"]
+        calls = list(module.calls)
+        module.calls.clear()
+        return calls
+
+    def get_config(self) -> model.Config:
+        return model.Config(
+            user_config={
+                "short_break_interval": 15,
+                "plugins": [
+                    {"id": "reload_a", "enabled": True, "settings": {"value": 1}},
+                    {"id": "reload_b", "enabled": True, "settings": {"value": 1}},
+                ],
+            },
+            system_config={},
+        )
+
+    def test_reload_changed_plugin(self) -> None:
+        manager = plugin_manager.PluginManager()
+        config = self.get_config()
+        manager.init(None, config)
+        manager.start()
+        module_a = sys.modules["reload_a.plugin"]
+        assert self.calls("reload_a") == [
+            ("enable", None),
+            ("init", 1),
+            ("on_start", None),
+        ]
+        self.calls("reload_b")
+
+        new_config = config.clone()
+        plugins = new_config.edit("plugins")
+        plugins[0]["settings"]["value"] = 2
+        plugins[1]["enabled"] = False
+        plugins.append({"id": "reload_c", "enabled": True, "settings": {}})
+        new_config.set("plugins", plugins)
+        manager.reload(None, new_config, config.diff(new_config), running=True)
+
+        # the module is reused
+        assert sys.modules["reload_a.plugin"] is module_a
+        assert self.calls("reload_a") == [
+            ("on_stop", None),
+            ("init", 2),
+            ("on_start", None),
+        ]
+        assert self.calls("reload_b") == [("on_stop", None), ("disable", None)]
+        assert self.calls("reload_c") == [
+            ("enable", None),
+            ("init", None),
+            ("on_start", None),
+        ]
+
+        plugins = new_config.clone().edit("plugins")
+        plugins[1]["enabled"] = True
+        del plugins[2]
+        newer_config = new_config.clone()
+        newer_config.set("plugins", plugins)
+        manager.reload(None, newer_config, new_config.diff(newer_config))
+
+        assert self.calls("reload_a") == []
+        assert self.calls("reload_b") == [("enable", None), ("init", 1)]
+        assert self.calls("reload_c") == [("disable", None)]
+
+    def test_reload_other_setting(self) -> None:
+        manager = plugin_manager.PluginManager()
+        config = self.get_config()
+        manager.init(None, config)
+        self.calls("reload_a")
+        self.calls("reload_b")
+
+        new_config = config.clone()
+        new_config.set("short_break_interval", 20)
+        manager.reload(None, new_config, config.diff(new_config), running=True)
+
+        # plugins may read any setting, so all of them are initialized again
+        for plugin_id in ("reload_a", "reload_b"):
+            assert self.calls(plugin_id) == [
+                ("on_stop", None),
+                ("init", 1),
+                ("on_start", None),
+            ]
+
+    def test_dispatch(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        manager = plugin_manager.PluginManager()
+        config = self.get_config()
+        manager.init(None, config)
+        self.calls("reload_a")
+        self.calls("reload_b")
+        # the methods are looked up once, when the plugin is imported
+        monkeypatch.setattr(utility, "has_method", mock.Mock(side_effect=Exception))
+
+        break_obj = model.Break(
+            model.BreakType.SHORT_BREAK, "break", 15, 15, None, None
+        )
+        assert manager.pre_break(break_obj)
+        assert manager.start_break(break_obj)
+        manager.countdown(10, 5)
+        for plugin_id in ("reload_a", "reload_b"):
+            assert self.calls(plugin_id) == [
+                ("on_pre_break", "break"),
+                ("on_countdown", 5),
+            ]
+
+        new_config = config.clone()
+        plugins = new_config.edit("plugins")
+        plugins[1]["enabled"] = False
+        new_config.set("plugins", plugins)
+        manager.reload(None, new_config, config.diff(new_config))
+        self.calls("reload_b")
+
+        assert manager.pre_break(break_obj)
+        assert self.calls("reload_a") == [("on_pre_break", "break")]
+        assert self.calls("reload_b") == []
+
+    def test_import_on_demand(self) -> None:
+        manager = plugin_manager.PluginManager()
+        config = self.get_config()
+        plugins = config.get("plugins")
+        plugins.append({"id": "reload_lazy", "enabled": True, "settings": {}})
+        plugins.append({"id": "reload_required", "enabled": True, "settings": {}})
+        config.set("plugins", plugins)
+        manager.init(None, config)
+        # required plugins are imported anyway, even if no hook is called
+        assert self.calls("reload_required") == [("enable", None), ("init", None)]
+        manager.start()
+        manager.stop()
+
+        assert "reload_lazy.plugin" not in sys.modules
+
+        break_obj = model.Break(
+            model.BreakType.SHORT_BREAK, "break", 15, 15, None, None
+        )
+        assert manager.pre_break(break_obj)
+        assert self.calls("reload_lazy") == [
+            ("enable", None),
+            ("init", None),
+            ("on_pre_break", "break"),
+        ]
+
+        # hooks which were not declared are found once the plugin is imported
+        manager.countdown(10, 5)
+        assert manager.pre_break(break_obj)
+        assert self.calls("reload_lazy") == [
+            ("on_countdown", 5),
+            ("on_pre_break", "break"),
+        ]
+
+    def test_dependency_cache(self, tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+        bin_dir = tmp_path / "bin"
+        bin_dir.mkdir()
+        monkeypatch.setenv("PATH", str(bin_dir))
+        which = mock.Mock(side_effect=utility.shutil.which)
+        monkeypatch.setattr(utility.shutil, "which", which)
+        plugin_config = json.loads(json.dumps(benchmark.PLUGIN_CONFIG))
+        plugin_config["dependencies"]["shell_commands"] = ["safeeyes-test-tool"]
+        checks = [
+            (plugin_id, plugin_config, {"value": 1}, str(tmp_path / plugin_id))
+            for plugin_id in PLUGIN_IDS
+        ]
+
+        results = utility.check_plugins_dependencies(checks)
+        assert results == [
+            "Please install the command-line tool 'safeeyes-test-tool'"
+        ] * len(PLUGIN_IDS)
+        assert which.call_count == len(PLUGIN_IDS)
+
+        # unchanged plugins are not checked again
+        assert utility.check_plugins_dependencies(checks) == results
+        assert which.call_count == len(PLUGIN_IDS)
+
+        # other settings are checked again
+        assert utility.check_plugin_dependencies(*checks[0][:2], {}, checks[0][3])
+        assert which.call_count == len(PLUGIN_IDS) + 1
+
+        # the results are translated to the current language
+        monkeypatch.setattr(translations, "_language", "de_DE")
+        assert utility.check_plugins_dependencies(checks) == results
+        assert which.call_count == len(PLUGIN_IDS) * 2 + 1
+
+        # installing the command changes the directory in PATH
+        tool = bin_dir / "safeeyes-test-tool"
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+        assert utility.check_plugins_dependencies(checks) == [None] * len(PLUGIN_IDS)
+
+    def test_dependency_checker_cache(self, tmp_path) -> None:
+        for plugin_id, cacheable in (("reload_a", False), ("reload_b", True)):
+            (tmp_path / plugin_id / "dependency_checker.py").write_text(
+                "CACHEABLE = {}\n"
+                "calls = []\n"
+                "def validate(plugin_config, plugin_settings):\n"
+                "    calls.append(None)\n".format(cacheable)
+            )
+        checks: list[tuple[str, dict, dict, str]] = [
+            (plugin_id, benchmark.PLUGIN_CONFIG, {}, str(tmp_path / plugin_id))
+            for plugin_id in ("reload_a", "reload_b")
+        ]
+
+        for _ in range(3):
+            assert utility.check_plugins_dependencies(checks) == [None, None]
+
+        # a checker may check anything, so it runs again unless it is cacheable
+        assert len(sys.modules["reload_a.dependency_checker"].calls) == 3
+        assert len(sys.modules["reload_b.dependency_checker"].calls) == 1
+
+    def test_async_hooks(self) -> None:
+        config = model.Config(
+            user_config={
+                "plugin_hook_deadline": 1000,
+                "plugins": [
+                    {"id": plugin_id, "enabled": True, "settings": {}}
+                    for plugin_id in ASYNC_PLUGIN_IDS + ("reload_a",)
+                ],
+            },
+            system_config={},
+        )
+        manager = plugin_manager.PluginManager()
+        manager.init(None, config)
+        self.calls("reload_a")
+
+        def get_break(name: str, wait_ms: int) -> model.Break:
+            return model.Break(
+                model.BreakType.SHORT_BREAK, name, 15, wait_ms, None, None
+            )
+
+        try:
+            start = time.monotonic()
+            assert manager.pre_break(get_break("break", 300))
+            # the coroutines overlap, and with the other plugins
+            assert time.monotonic() - start < 0.55
+            assert self.calls("reload_a") == [("on_pre_break", "break")]
+            for plugin_id in ASYNC_PLUGIN_IDS:
+                assert self.calls(plugin_id) == [("on_pre_break", "break")]
+
+            assert not manager.pre_break(get_break("skip", 0))
+            time.sleep(0.1)
+            for plugin_id in ASYNC_PLUGIN_IDS:
+                self.calls(plugin_id)
+
+            # late coroutines are cancelled at the deadline
+            start = time.monotonic()
+            assert manager.pre_break(get_break("late", 5000))
+            assert 1 <= time.monotonic() - start < 2
+            time.sleep(0.1)
+            for plugin_id in ASYNC_PLUGIN_IDS:
+                assert self.calls(plugin_id) == [("cancelled", "late")]
+
+            # not waited for
+            manager.countdown(10, 5)
+            time.sleep(0.1)
+            for plugin_id in ASYNC_PLUGIN_IDS:
+                assert self.calls(plugin_id) == [("on_countdown", 5)]
+
+            widget = "<b>TITLE</b>\n{}\ncontent".format(manager.horizontal_line)
+            assert manager.get_break_screen_widgets(get_break("break", 0)) == (
+                widget + "\n\n\n" + widget
+            )
+        finally:
+            manager.exit()
+
+        # exit waits for the async on_exit hooks
+        for plugin_id in ASYNC_PLUGIN_IDS:
+            assert self.calls(plugin_id) == [("on_exit", None)]
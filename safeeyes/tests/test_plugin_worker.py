@@ -0,0 +1,209 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import concurrent.futures
+import gettext
+import io
+import json
+import struct
+import sys
+import threading
+import time
+import typing
+from unittest import mock
+
+import pytest
+
+from safeeyes import context
+from safeeyes import model
+from safeeyes import plugin_manager
+from safeeyes import plugin_worker
+from safeeyes import utility
+from safeeyes.tests import benchmark
+
+PLUGIN_ID = "isolated_plugin"
+
+PLUGIN_SOURCE = """
+import time
+
+context = None
+
+
+def init(ctx, safeeyes_config, plugin_config):
+    global context
+    context = ctx
+
+
+def on_pre_break(break_obj):
+    # the break duration is the time to block, in milliseconds
+    time.sleep(break_obj.duration / 1000)
+    return break_obj.name == "skip"
+
+
+def on_start_break(break_obj):
+    return [context.api.has_breaks(), context.skipped, break_obj.name]
+
+
+def get_widget_title(break_obj):
+    raise ValueError("no title")
+
+
+def get_widget_content(break_obj):
+    return context.locale.gettext(break_obj.name)
+
+
+def get_tray_action(break_obj):
+    # can't be pickled
+    return lambda: None
+"""
+
+
+def get_break(name: str, block_ms: int = 0) -> model.Break:
+    return model.Break(model.BreakType.SHORT_BREAK, name, 15, block_ms, None, None)
+
+
+class TestPluginWorker:
+    @pytest.fixture(autouse=True)
+    def plugins_dir(self, tmp_path, monkeypatch: pytest.MonkeyPatch):
+        plugin_dir = tmp_path / PLUGIN_ID
+        plugin_dir.mkdir()
+        (plugin_dir / "plugin.py").write_text(PLUGIN_SOURCE)
+        (plugin_dir / "config.json").write_text(json.dumps(benchmark.PLUGIN_CONFIG))
+        monkeypatch.setattr(utility, "USER_PLUGINS_DIR", str(tmp_path))
+        monkeypatch.syspath_prepend(str(tmp_path))
+        yield
+        sys.modules.pop(PLUGIN_ID, None)
+        sys.modules.pop(PLUGIN_ID + ".plugin", None)
+
+    @pytest.fixture(autouse=True)
+    def main_loop(self, monkeypatch: pytest.MonkeyPatch):
+        main_loop = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="MainLoop"
+        )
+        monkeypatch.setattr(
+            utility,
+            "execute_main_thread",
+            lambda function, *args: main_loop.submit(function, *args),
+        )
+        yield
+        main_loop.shutdown()
+
+    def get_context(self) -> context.Context:
+        api = mock.Mock(spec=context.API)
+        self.api_threads: list[str] = []
+
+        def has_breaks(break_type=None) -> bool:
+            self.api_threads.append(threading.current_thread().name)
+            return True
+
+        api.has_breaks.side_effect = has_breaks
+        # an empty catalog, like the translations of a language without .mo
+        # files; unlike the NullTranslations, it can't be pickled
+        mo_file = struct.pack("<7I", 0x950412DE, 0, 0, 28, 28, 0, 28)
+        return context.Context(
+            api=api,
+            # the locale given by Safe Eyes is a translations object
+            locale=typing.cast(str, gettext.GNUTranslations(io.BytesIO(mo_file))),
+            version="0.0.0",
+            session={},
+            desktop="unknown",
+            is_wayland=False,
+        )
+
+    @pytest.mark.parametrize("isolation", plugin_worker.ISOLATION_MODES)
+    def test_deadline(self, isolation: str) -> None:
+        worker = plugin_worker.create(isolation, PLUGIN_ID, 200)
+        try:
+            assert set(worker.start(plugin_manager.PLUGIN_METHODS)) == {
+                "init",
+                "on_pre_break",
+                "on_start_break",
+                "get_widget_title",
+                "get_widget_content",
+                "get_tray_action",
+            }
+            ctx = self.get_context()
+            worker.call(
+                "init",
+                (ctx, model.Config(user_config={}, system_config={}), {}),
+                wait=False,
+            )
+
+            assert worker.call("on_pre_break", (get_break("skip"),)) is True
+
+            start = time.monotonic()
+            assert worker.call("on_pre_break", (get_break("skip", 1000),)) is None
+            assert time.monotonic() - start < 0.5
+
+            # later calls wait for the stuck one, and are bounded as well
+            assert worker.call("on_pre_break", (get_break("skip"),)) is None
+            time.sleep(1)
+            assert worker.call("on_pre_break", (get_break("skip"),)) is True
+
+            ctx.skipped = True
+            assert worker.call("on_start_break", (get_break("break"),)) == [
+                True,
+                True,
+                "break",
+            ]
+            assert worker.call("get_widget_title", (get_break("break"),)) is None
+            # init reached the plugin, with working translations
+            assert worker.call("get_widget_content", (get_break("break"),)) == "break"
+            if isolation == "process":
+                # queries of the process are answered by the main loop
+                assert self.api_threads[0].startswith("MainLoop")
+        finally:
+            worker.stop()
+
+        assert not worker.is_alive()
+        assert worker.call("on_pre_break", (get_break("skip"),)) is None
+
+    def test_unpicklable_result(self) -> None:
+        worker = plugin_worker.create("process", PLUGIN_ID, 5000)
+        try:
+            worker.start(plugin_manager.PLUGIN_METHODS)
+            assert worker.call("get_tray_action", (get_break("break"),)) is None
+            # the process is still working
+            assert worker.call("on_pre_break", (get_break("skip"),)) is True
+        finally:
+            worker.stop()
+
+    def test_plugin_manager(self) -> None:
+        config = model.Config(
+            user_config={
+                "plugins": [
+                    {
+                        "id": PLUGIN_ID,
+                        "enabled": True,
+                        "isolation": "thread",
+                        "hook_deadline": 100,
+                    }
+                ],
+            },
+            system_config={},
+        )
+        manager = plugin_manager.PluginManager()
+        manager.init(self.get_context(), config)
+        try:
+            assert not manager.pre_break(get_break("skip"))
+
+            start = time.monotonic()
+            assert manager.pre_break(get_break("skip", 1000))
+            assert time.monotonic() - start < 0.5
+        finally:
+            manager.exit()
@@ -0,0 +1,82 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import tracemalloc
+
+from safeeyes.model import State
+from safeeyes.trace import Trace, TraceEvent
+
+
+class TestTrace:
+    def test_ring_buffer_keeps_newest(self) -> None:
+        trace = Trace(capacity=3)
+
+        assert len(trace) == 0
+        assert trace.entries() == []
+
+        trace.state(1, State.WAITING)
+        trace.arm(2, "do_pre_break", 12)
+        trace.fire(12.5, "do_pre_break", 12)
+        trace.hook(13, "on_pre_break", 0.25)
+
+        assert len(trace) == 3
+        assert trace.count == 4
+        assert trace.entries() == [
+            (2, TraceEvent.ARM, "do_pre_break", 12),
+            (12.5, TraceEvent.FIRE, "do_pre_break", 12),
+            (13, TraceEvent.HOOK, "on_pre_break", 0.25),
+        ]
+
+    def test_dump(self) -> None:
+        trace = Trace(capacity=3)
+        trace.state(1, State.WAITING)
+        trace.arm(2, "do_pre_break", 12)
+        trace.fire(12.5, "do_pre_break", 12)
+        trace.hook(13, "on_pre_break", 0.25)
+
+        dump = trace.dump(datetime.datetime.fromisoformat("2024-08-25T13:00:00"), 20)
+
+        assert dump.splitlines() == [
+            "1 older events were dropped",
+            "2024-08-25 12:59:42.000 arm   do_pre_break due at 2024-08-25 12:59:52.000",
+            "2024-08-25 12:59:52.500 fire  do_pre_break +0.500s after the deadline",
+            "2024-08-25 12:59:53.000 hook  on_pre_break took 0.250s",
+        ]
+
+    def test_grows_on_demand(self) -> None:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            trace = Trace()
+            # nothing is allocated for the 1024 events up front
+            assert tracemalloc.get_traced_memory()[0] - before < 1024
+        finally:
+            tracemalloc.stop()
+
+        trace.state(1, State.WAITING)
+        assert trace.entries() == [(1, TraceEvent.STATE, "WAITING", 0)]
+
+    def test_disabled(self) -> None:
+        trace = Trace(capacity=0)
+        trace.state(1, State.WAITING)
+        trace.hook(13, "on_pre_break", 0.25)
+
+        assert len(trace) == 0
+        assert trace.entries() == []
+        assert trace.dump(datetime.datetime.now(), 20) == "The trace is disabled"
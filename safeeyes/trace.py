@@ -0,0 +1,152 @@
+# Safe Eyes is a utility to remind you to take break frequently
+# to protect your eyes from eye strain.
+
+# Copyright (C) 2025  Gobinath
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Trace of the recent state changes, hook calls and timers of the core.
+
+The trace is printed by `safeeyes --trace` to find out why a break was late.
+"""
+
+import array
+import datetime
+import typing
+from enum import Enum
+
+from safeeyes.model import State
+
+# number of events kept by the trace of the application
+DEFAULT_CAPACITY = 1024
+
+
+class TraceEvent(Enum):
+    """Kinds of events in the trace."""
+
+    STATE = "state"
+    HOOK = "hook"
+    ARM = "arm"
+    FIRE = "fire"
+
+
+class Trace:
+    """Ring buffer holding the last events of SafeEyesCore.
+
+    The columns grow with the recorded events until they hold capacity
+    events, from then on recording an event only overwrites the oldest slot,
+    so the trace is always on but costs nothing until something happens. A
+    capacity of 0 turns the trace off. Times are clock.monotonic() values;
+    they are converted to wall-clock time when the trace is dumped.
+    """
+
+    capacity: int
+    # total number of events recorded, including the overwritten ones
+    count: int
+
+    # time of the event
+    __times: array.array
+    # duration of a hook, or the deadline of a timer
+    __values: array.array
+    __events: list[typing.Optional[TraceEvent]]
+    # state, hook or callback name
+    __labels: list[str]
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        if capacity < 0:
+            raise ValueError("capacity must not be negative")
+        self.capacity = capacity
+        self.count = 0
+        self.__times = array.array("d")
+        self.__values = array.array("d")
+        self.__events = []
+        self.__labels = []
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def state(self, time: float, state: State) -> None:
+        """Record a change of the state."""
+        self.__record(time, TraceEvent.STATE, state.name, 0.0)
+
+    def hook(self, time: float, name: str, duration: float) -> None:
+        """Record a hook which started at time and ran for duration seconds."""
+        self.__record(time, TraceEvent.HOOK, name, duration)
+
+    def arm(self, time: float, name: str, deadline: float) -> None:
+        """Record a timer which calls name at the deadline."""
+        self.__record(time, TraceEvent.ARM, name, deadline)
+
+    def fire(self, time: float, name: str, deadline: float) -> None:
+        """Record a timer which was due at the deadline and fired at time."""
+        self.__record(time, TraceEvent.FIRE, name, deadline)
+
+    def entries(self) -> list[tuple[float, TraceEvent, str, float]]:
+        """Return the recorded (time, event, label, value) tuples, oldest
+        first.
+        """
+        start = self.count - len(self)
+        result = []
+        for i in range(start, self.count):
+            slot = i % self.capacity
+            event = self.__events[slot]
+            assert event is not None
+            result.append(
+                (self.__times[slot], event, self.__labels[slot], self.__values[slot])
+            )
+        return result
+
+    def dump(self, now: datetime.datetime, monotonic: float) -> str:
+        """Format the trace, given the current wall-clock and monotonic time."""
+        lines = []
+        if self.capacity == 0:
+            lines.append("The trace is disabled")
+        elif self.count > self.capacity:
+            lines.append(
+                "{} older events were dropped".format(self.count - self.capacity)
+            )
+
+        def wall(time: float) -> str:
+            return (now + datetime.timedelta(seconds=time - monotonic)).isoformat(
+                sep=" ", timespec="milliseconds"
+            )
+
+        for time, event, label, value in self.entries():
+            if event == TraceEvent.HOOK:
+                detail = "{} took {:.3f}s".format(label, value)
+            elif event == TraceEvent.ARM:
+                detail = "{} due at {}".format(label, wall(value))
+            elif event == TraceEvent.FIRE:
+                detail = "{} {:+.3f}s after the deadline".format(label, time - value)
+            else:
+                detail = label
+            lines.append("{} {:<5} {}".format(wall(time), event.value, detail))
+        return "\n".join(lines)
+
+    def __record(
+        self, time: float, event: TraceEvent, label: str, value: float
+    ) -> None:
+        if self.count < self.capacity:
+            self.__times.append(time)
+            self.__values.append(value)
+            self.__events.append(event)
+            self.__labels.append(label)
+        elif self.capacity:
+            slot = self.count % self.capacity
+            self.__times[slot] = time
+            self.__values[slot] = value
+            self.__events[slot] = event
+            self.__labels[slot] = label
+        else:
+            return
+        self.count += 1
@@ -21,17 +21,20 @@
 import locale
 import gettext
 import sys
+import typing
 from safeeyes import utility
 
 _translations = gettext.NullTranslations()
+_language: typing.Optional[str] = None
 
 
 def setup():
-    global _translations
+    global _translations, _language
+    _language = utility.system_locale()
     _translations = gettext.translation(
         "safeeyes",
         localedir=utility.LOCALE_PATH,
-        languages=[utility.system_locale(), "en_US"],
+        languages=[_language, "en_US"],
         fallback=True,
     )
     try:
@@ -50,3 +53,8 @@ def setup():
 def translate(message: str) -> str:
     """Translate the message using the current translator."""
     return _translations.gettext(message)
+
+
+def language() -> typing.Optional[str]:
+    """Return the locale of the current translator, or None before setup."""
+    return _language
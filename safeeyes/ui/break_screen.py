@@ -45,6 +45,17 @@ class BreakScreen:
     This class creates and manages the fullscreen windows for every monitor.
     """
 
+    # settings read by initialize()
+    CONFIG_KEYS = frozenset(
+        [
+            "allow_postpone",
+            "shortcut_postpone",
+            "shortcut_skip",
+            "shortcut_disable_time",
+            "strict_break",
+        ]
+    )
+
     windows: list["BreakScreenWindow"]
 
     def __init__(
@@ -108,11 +108,13 @@ class SettingsDialog(Gtk.ApplicationWindow):
     def __initialize(self, config: Config) -> None:
         # Don't show infobar for changes made internally
         self.infobar_long_break_shown = True
-        for short_break in config.get("short_breaks"):
+        for short_break in config.edit("short_breaks"):
             self.__create_break_item(short_break, True)
-        for long_break in config.get("long_breaks"):
+        for long_break in config.edit("long_breaks"):
             self.__create_break_item(long_break, False)
 
+        # the plugin items change the settings of the plugins in place
+        config.edit("plugins")
         for plugin_config in utility.load_plugins_config(config):
             self.box_plugins.append(self.__create_plugin_item(plugin_config))
 
@@ -206,9 +208,9 @@ class SettingsDialog(Gtk.ApplicationWindow):
             response_id = dialog.choose_finish(result)
             if response_id == 1:
                 if is_short:
-                    self.config.get("short_breaks").remove(break_config)
+                    self.config.edit("short_breaks").remove(break_config)
                 else:
-                    self.config.get("long_breaks").remove(break_config)
+                    self.config.edit("long_breaks").remove(break_config)
                 on_remove()
 
         messagedialog = Gtk.AlertDialog()
@@ -357,7 +359,7 @@ class SettingsDialog(Gtk.ApplicationWindow):
         self.config.set("random_order", self.switch_random_order.get_active())
         self.config.set("allow_postpone", self.switch_postpone.get_active())
         self.config.set("persist_state", self.switch_persist.get_active())
-        for plugin in self.config.get("plugins"):
+        for plugin in self.config.edit("plugins"):
             if plugin["id"] in self.plugin_items:
                 plugin["enabled"] = self.plugin_items[plugin["id"]].is_enabled()
 
@@ -737,14 +739,14 @@ class BreakSettingsDialog(Gtk.Window):
 
         if self.is_short and self.cmb_type.get_active() == 1:
             # Changed from short to long
-            self.parent_config.get("short_breaks").remove(self.break_config)
-            self.parent_config.get("long_breaks").append(self.break_config)
+            self.parent_config.edit("short_breaks").remove(self.break_config)
+            self.parent_config.edit("long_breaks").append(self.break_config)
             self.on_remove()
             self.on_add(not self.is_short, self.break_config)
         elif not self.is_short and self.cmb_type.get_active() == 0:
             # Changed from long to short
-            self.parent_config.get("long_breaks").remove(self.break_config)
-            self.parent_config.get("short_breaks").append(self.break_config)
+            self.parent_config.edit("long_breaks").remove(self.break_config)
+            self.parent_config.edit("short_breaks").append(self.break_config)
             self.on_remove()
             self.on_add(not self.is_short, self.break_config)
         else:
@@ -787,10 +789,10 @@ class NewBreakDialog(Gtk.Window):
         break_config = {"name": self.txt_break.get_text().strip()}
 
         if self.cmb_type.get_active() == 0:
-            self.parent_config.get("short_breaks").append(break_config)
+            self.parent_config.edit("short_breaks").append(break_config)
             self.on_add(True, break_config)
         else:
-            self.parent_config.get("long_breaks").append(break_config)
+            self.parent_config.edit("long_breaks").append(break_config)
             self.on_add(False, break_config)
         self.destroy()
 
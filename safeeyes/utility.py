@@ -18,6 +18,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """This module contains utility functions for Safe Eyes and its plugins."""
 
+import concurrent.futures
 import errno
 import hashlib
 import inspect
@@ -37,17 +38,11 @@ from pathlib import Path
 
 import babel.core
 import babel.dates
-import gi
-
-gi.require_version("Gtk", "4.0")
-gi.require_version("Gdk", "4.0")
-
-from gi.repository import Gdk
-from gi.repository import Gtk
-from gi.repository import GLib
-from gi.repository import GdkPixbuf
 from packaging.version import parse
 
+if typing.TYPE_CHECKING:
+    from gi.repository import Gtk
+
 BIN_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
 HOME_DIRECTORY = os.environ.get("HOME") or os.path.expanduser("~")
 CONFIG_DIRECTORY = os.path.join(
@@ -58,6 +53,8 @@ STYLE_SHEET_DIRECTORY = os.path.join(CONFIG_DIRECTORY, "style")
 CONFIG_FILE_PATH = os.path.join(CONFIG_DIRECTORY, "safeeyes.json")
 CONFIG_RESOURCE = os.path.join(CONFIG_DIRECTORY, "resource")
 SESSION_FILE_PATH = os.path.join(CONFIG_DIRECTORY, "session.json")
+# modification times of the files the user config was last merged from
+CONFIG_STAMP_PATH = os.path.join(CONFIG_DIRECTORY, "config_stamp.json")
 OLD_STYLE_SHEET_PATH = os.path.join(STYLE_SHEET_DIRECTORY, "safeeyes_style.css")
 CUSTOM_STYLE_SHEET_PATH = os.path.join(
     STYLE_SHEET_DIRECTORY, "safeeyes_custom_style.css"
@@ -74,6 +71,11 @@ SYSTEM_DESKTOP_FILE = os.path.join(
 SYSTEM_ICONS = os.path.join(BIN_DIRECTORY, "platform/icons")
 DESKTOP_ENVIRONMENT = None
 IS_WAYLAND = False
+# threads checking the dependencies of plugins
+DEPENDENCY_CHECK_WORKERS = 8
+
+_dependency_cache: dict[tuple, typing.Any] = {}
+_dependency_lock = threading.Lock()
 
 
 def get_resource_path(resource_name):
@@ -108,6 +110,8 @@ def start_thread(target_function, **args):
 
 def execute_main_thread(target_function, *args, **kwargs):
     """Execute the given function in main thread."""
+    from gi.repository import GLib
+
     GLib.idle_add(lambda: target_function(*args, **kwargs))
 
 
@@ -171,6 +175,44 @@ def write_json(json_path, json_obj):
         pass
 
 
+def config_stamp():
+    """Return the modification times and sizes of the user config, the system
+    config, the plugin directories and the config.json of every plugin.
+
+    The user config needs no merging while the stamp stays the same. Adding,
+    removing or upgrading a plugin changes the stamp.
+    """
+
+    def file_stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    stamp = [
+        file_stamp(path)
+        for path in (
+            CONFIG_FILE_PATH,
+            SYSTEM_CONFIG_FILE_PATH,
+            SYSTEM_PLUGINS_DIR,
+            USER_PLUGINS_DIR,
+        )
+    ]
+    for plugins_dir in (SYSTEM_PLUGINS_DIR, USER_PLUGINS_DIR):
+        try:
+            plugin_ids = sorted(os.listdir(plugins_dir))
+        except OSError:
+            continue
+        for plugin_id in plugin_ids:
+            plugin_stamp = file_stamp(
+                os.path.join(plugins_dir, plugin_id, "config.json")
+            )
+            if plugin_stamp is not None:
+                stamp.append([plugin_id] + plugin_stamp)
+    return stamp
+
+
 def delete(file_path):
     """Delete the given file or directory."""
     try:
@@ -179,8 +221,87 @@ def delete(file_path):
         pass
 
 
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def dependency_key(plugin_id, plugin_config, plugin_settings, plugin_path):
+    """Return the key of the result of check_plugin_dependencies.
+
+    Installing a command or a Python module, adding a resource or changing the
+    plugin changes the modification time of a directory in the key. The
+    results are translated, so the key also holds the language.
+    """
+    from safeeyes import translations
+
+    search_path = os.environ.get("PATH", "")
+    directories = (
+        search_path.split(os.pathsep) + sys.path + [CONFIG_RESOURCE, plugin_path]
+    )
+    return (
+        plugin_id,
+        plugin_path,
+        search_path,
+        tuple(_mtime(directory) for directory in directories),
+        _mtime(os.path.join(plugin_path, "dependency_checker.py")),
+        DESKTOP_ENVIRONMENT,
+        IS_WAYLAND,
+        translations.language(),
+        json.dumps(plugin_config["dependencies"], sort_keys=True),
+        json.dumps(plugin_settings, sort_keys=True, default=str),
+    )
+
+
 def check_plugin_dependencies(plugin_id, plugin_config, plugin_settings, plugin_path):
-    """Check the plugin dependencies."""
+    """Check the plugin dependencies.
+
+    Results are cached until the key returned by dependency_key changes. The
+    results of a dependency_checker.py are only cached if it sets CACHEABLE,
+    as it may check anything, like a service on D-Bus which starts later. A
+    checker may only set it if its result depends on nothing but what the key
+    covers: the installed commands, modules and resources, the desktop
+    environment, whether it runs on Wayland, and the plugin settings.
+    Retryable errors are never cached.
+    """
+    key = dependency_key(plugin_id, plugin_config, plugin_settings, plugin_path)
+    with _dependency_lock:
+        if key in _dependency_cache:
+            return _dependency_cache[key]
+    result, cacheable = _check_plugin_dependencies(
+        plugin_id, plugin_config, plugin_settings, plugin_path
+    )
+    if cacheable and not getattr(result, "retryable", False):
+        with _dependency_lock:
+            _dependency_cache[key] = result
+    return result
+
+
+def check_plugins_dependencies(checks):
+    """Check the dependencies of many plugins concurrently.
+
+    checks is a list of the arguments of check_plugin_dependencies. Returns
+    the results in the same order. The first exception raised by a check is
+    raised once all checks are done.
+    """
+    if len(checks) < 2:
+        return [check_plugin_dependencies(*check) for check in checks]
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(len(checks), DEPENDENCY_CHECK_WORKERS),
+        thread_name_prefix="DependencyCheck",
+    ) as executor:
+        futures = [
+            executor.submit(check_plugin_dependencies, *check) for check in checks
+        ]
+    return [future.result() for future in futures]
+
+
+def _check_plugin_dependencies(plugin_id, plugin_config, plugin_settings, plugin_path):
+    """Return the error of the first missing dependency, or None, and whether
+    the result depends only on what dependency_key covers.
+    """
     from safeeyes.translations import translate as _
 
     # Check the desktop environment
@@ -192,18 +313,19 @@ def check_plugin_dependencies(plugin_id, plugin_config, plugin_settings, plugin_
         ):
             return (
                 _("Plugin does not support %s desktop environment")
-                % DESKTOP_ENVIRONMENT
+                % DESKTOP_ENVIRONMENT,
+                True,
             )
 
     # Check the Python modules
     for module in plugin_config["dependencies"]["python_modules"]:
         if not module_exist(module):
-            return _("Please install the Python module '%s'") % module
+            return _("Please install the Python module '%s'") % module, True
 
     # Check the shell commands
     for command in plugin_config["dependencies"]["shell_commands"]:
         if not command_exist(command):
-            return _("Please install the command-line tool '%s'") % command
+            return _("Please install the command-line tool '%s'") % command, True
 
     # Check the resources
     for resource in plugin_config["dependencies"]["resources"]:
@@ -213,7 +335,7 @@ def check_plugin_dependencies(plugin_id, plugin_config, plugin_settings, plugin_
             ) % {
                 "resource": resource,
                 "config_resource": CONFIG_RESOURCE,
-            }
+            }, True
 
     plugin_dependency_checker = os.path.join(plugin_path, "dependency_checker.py")
     if os.path.isfile(plugin_dependency_checker):
@@ -221,14 +343,18 @@ def check_plugin_dependencies(plugin_id, plugin_config, plugin_settings, plugin_
             (plugin_id + ".dependency_checker")
         )
         if dependency_checker and hasattr(dependency_checker, "validate"):
-            return dependency_checker.validate(plugin_config, plugin_settings)
+            return (
+                dependency_checker.validate(plugin_config, plugin_settings),
+                getattr(dependency_checker, "CACHEABLE", False),
+            )
 
-    return None
+    return None, True
 
 
 def load_plugins_config(safeeyes_config):
     """Load all the plugins from the given directory."""
     configs = []
+    checks = []
     for plugin in safeeyes_config.get("plugins"):
         plugin_path = os.path.join(SYSTEM_PLUGINS_DIR, plugin["id"])
         if not os.path.isdir(plugin_path):
@@ -247,21 +373,23 @@ def load_plugins_config(safeeyes_config):
         config = load_json(plugin_config_path)
         if config is None:
             continue
-        dependency_description = check_plugin_dependencies(
-            plugin["id"], config, plugin.get("settings", {}), plugin_path
-        )
-        if dependency_description:
-            config["error"] = True
-            config["meta"]["dependency_description"] = dependency_description
-            icon = get_resource_path("ic_warning.png")
-        else:
-            config["error"] = False
         config["id"] = plugin["id"]
         config["icon"] = icon
         config["enabled"] = plugin["enabled"]
         config["active_plugin_config"] = plugin.get("settings")
 
         configs.append(config)
+        checks.append((plugin["id"], config, plugin.get("settings", {}), plugin_path))
+
+    for config, dependency_description in zip(
+        configs, check_plugins_dependencies(checks)
+    ):
+        if dependency_description:
+            config["error"] = True
+            config["meta"]["dependency_description"] = dependency_description
+            config["icon"] = get_resource_path("ic_warning.png")
+        else:
+            config["error"] = False
     return configs
 
 
@@ -397,6 +525,12 @@ def load_css_file(style_sheet_path, priority, required=True):
             logging.warning("Failed loading required stylesheet")
         return
 
+    import gi
+
+    gi.require_version("Gtk", "4.0")
+    gi.require_version("Gdk", "4.0")
+    from gi.repository import Gdk, Gtk
+
     css_provider = Gtk.CssProvider()
     css_provider.load_from_path(style_sheet_path)
 
@@ -715,9 +849,15 @@ def open_session():
 
 def load_and_scale_image(
     path: str, width: int, height: int
-) -> typing.Optional[Gtk.Image]:
+) -> typing.Optional["Gtk.Image"]:
     if not os.path.isfile(path):
         return None
+
+    import gi
+
+    gi.require_version("Gtk", "4.0")
+    from gi.repository import GdkPixbuf, Gtk
+
     pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(
         filename=path, width=width, height=height, preserve_aspect_ratio=True
     )